@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import argparse
+import random
+from threading import Thread
+
+from ycyc.base.adapter import main_entry
+from ycyc.tools.stopwatch import Stopwatch, timeit
+from ycyc.ycollections.heap import (
+    Heap, KeyHeap, HeapIsEmpty, ThreadSafetyHeap, ConcurrentHeap, ShardedHeap,
+)
+
+
+class Task(object):
+    def __init__(self, priority):
+        self.priority = priority
+
+
+def push_and_pop(heap_cls, values, **kwargs):
+    heap = heap_cls(**kwargs)
+    for value in values:
+        heap.push(value)
+    return [heap.pop() for _ in values]
+
+
+def bench_single_thread(args):
+    rand = random.Random(args.seed)
+    numbers = [rand.random() for _ in range(args.size)]
+    tasks = [Task(i) for i in numbers]
+    print("values: %d" % args.size)
+
+    for heap_cls in [Heap, KeyHeap]:
+        name = heap_cls.__name__
+        timeit("%s numbers" % name, push_and_pop, heap_cls, numbers)
+        timeit(
+            "%s numbers, reverse" % name,
+            push_and_pop, heap_cls, numbers, reverse=True,
+        )
+        timeit(
+            "%s cmp_attrs" % name,
+            push_and_pop, heap_cls, tasks, cmp_attrs=["priority"],
+        )
+
+
+def run_threads(heap, producers, consumers, per_producer, batch_size):
+    def produce(start):
+        values = list(range(start, start + per_producer))
+        if batch_size <= 1:
+            for value in values:
+                heap.push(value)
+            return
+        for i in range(0, per_producer, batch_size):
+            heap.push_many(values[i:i + batch_size])
+
+    def consume(quota):
+        popped = 0
+        while popped < quota:
+            if batch_size > 1:
+                popped += len(heap.pop_many(min(batch_size, quota - popped)))
+            elif isinstance(heap, ThreadSafetyHeap):
+                try:
+                    heap.pop()
+                    popped += 1
+                except HeapIsEmpty:
+                    continue
+            else:
+                heap.pop()
+                popped += 1
+
+    total = producers * per_producer
+    quotas = [total // consumers] * consumers
+    quotas[0] += total - sum(quotas)
+    threads = [
+        Thread(target=produce, args=(i * per_producer,))
+        for i in range(producers)
+    ]
+    threads.extend(Thread(target=consume, args=(i,)) for i in quotas)
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return total
+
+
+def bench_threads(args):
+    print(
+        "producers: %d, consumers: %d, values per producer: %d" % (
+            args.producers, args.consumers, args.per_producer,
+        )
+    )
+    cases = [
+        ("ThreadSafetyHeap", ThreadSafetyHeap, 1),
+        ("ConcurrentHeap", ConcurrentHeap, 1),
+        ("ConcurrentHeap, batch %d" % args.batch, ConcurrentHeap, args.batch),
+        ("ShardedHeap", lambda: ShardedHeap(args.shards), 1),
+        ("ShardedHeap, batch %d" % args.batch,
+         lambda: ShardedHeap(args.shards), args.batch),
+    ]
+    for name, factory, batch_size in cases:
+        with Stopwatch() as stopwatch:
+            total = run_threads(
+                factory(), args.producers, args.consumers,
+                args.per_producer, batch_size,
+            )
+        print("%-40s %10.0f values/s" % (name, total / stopwatch.duration))
+
+
+@main_entry
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="compare Heap with the key tuple based KeyHeap, "
+        "and the throughput of thread safety heaps",
+    )
+    parser.add_argument("-n", "--size", type=int, default=100000)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--consumers", type=int, default=4)
+    parser.add_argument("--per-producer", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--shards", type=int, default=4)
+    args = parser.parse_args(argv[1:])
+    bench_single_thread(args)
+    bench_threads(args)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import argparse
+import random
+
+from ycyc.base.adapter import main_entry
+from ycyc.libs.mathutils.matrix import Matrix, DenseMatrix, blocked_multiply
+from ycyc.tools.stopwatch import timeit
+
+
+def random_table(row_n, col_n):
+    return [[random.random() for _ in range(col_n)] for _ in range(row_n)]
+
+
+@main_entry
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="compare the naive Matrix multiplication with "
+        "DenseMatrix and blocked_multiply",
+    )
+    parser.add_argument("-n", "--size", type=int, default=300)
+    parser.add_argument("-b", "--block-size", type=int, default=64)
+    parser.add_argument("-p", "--processes", type=int, default=None)
+    parser.add_argument(
+        "--naive-limit", type=int, default=300,
+        help="skip the naive loop when size is larger than this",
+    )
+    args = parser.parse_args(argv[1:])
+
+    left_table = random_table(args.size, args.size)
+    right_table = random_table(args.size, args.size)
+    print("size: %dx%d" % (args.size, args.size))
+
+    if args.size <= args.naive_limit:
+        timeit(
+            "Matrix (naive loop)",
+            Matrix.__mul__,
+            Matrix.from_table(left_table), Matrix.from_table(right_table),
+        )
+
+    left = DenseMatrix.from_table(left_table)
+    right = DenseMatrix.from_table(right_table)
+    backends = [False, True] if DenseMatrix.use_numpy else [False]
+    try:
+        for use_numpy in backends:
+            DenseMatrix.use_numpy = use_numpy
+            backend = "numpy" if use_numpy else "python"
+            timeit(
+                "DenseMatrix (%s)" % backend, DenseMatrix.__mul__, left, right,
+            )
+            timeit(
+                "blocked_multiply (%s, 1 process)" % backend,
+                blocked_multiply, left, right, args.block_size, 1,
+            )
+            timeit(
+                "blocked_multiply (%s, pool)" % backend,
+                blocked_multiply, left, right, args.block_size, args.processes,
+            )
+    finally:
+        DenseMatrix.use_numpy = backends[-1]
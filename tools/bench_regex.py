@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import argparse
+import random
+import re
+
+from ycyc.base.adapter import main_entry
+from ycyc.base.resources import Regex, RegexRegistry
+from ycyc.tools.stopwatch import timeit
+
+NAMES = ["email_addr", "simple_url_pattern", "ipv4", "date"]
+
+
+def random_line(rand):
+    words = ["GET", "POST", "user", "login", "failed", "ok", "from", "at"]
+    fields = [
+        "%s@example.com" % rand.choice(["lyc", "root", "admin"]),
+        "http://example.com/path/%d?id=%d" % (
+            rand.randint(0, 99), rand.randint(0, 9999),
+        ),
+        ".".join(str(rand.randint(0, 255)) for _ in range(4)),
+        "20%02d-%02d-%02d" % (
+            rand.randint(0, 99), rand.randint(1, 12), rand.randint(1, 28),
+        ),
+    ]
+    parts = [rand.choice(words) for _ in range(8)]
+    parts.extend(rand.sample(fields, rand.randint(0, len(fields))))
+    rand.shuffle(parts)
+    return " ".join(parts)
+
+
+def separate_patterns(lines):
+    count = 0
+    for line in lines:
+        for name in NAMES:
+            rex = re.compile(getattr(Regex, name)())
+            count += sum(1 for _ in rex.finditer(line))
+    return count
+
+
+def separate_compiled(lines, registry):
+    rexes = [registry.compile(i) for i in NAMES]
+    count = 0
+    for line in lines:
+        for rex in rexes:
+            count += sum(1 for _ in rex.finditer(line))
+    return count
+
+
+def combined_scanner(lines, registry):
+    scanner = registry.scanner(NAMES)
+    count = 0
+    for line in lines:
+        count += sum(1 for _ in scanner.finditer(line))
+    return count
+
+
+@main_entry
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="compare building patterns on every call with "
+        "RegexRegistry and the combined RegexScanner",
+    )
+    parser.add_argument("-n", "--lines", type=int, default=20000)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args(argv[1:])
+
+    rand = random.Random(args.seed)
+    lines = [random_line(rand) for _ in range(args.lines)]
+    registry = RegexRegistry()
+    print("lines: %d" % len(lines))
+
+    results = [
+        timeit("Regex + re.compile per call", separate_patterns, lines),
+        timeit(
+            "RegexRegistry, pattern by pattern",
+            separate_compiled, lines, registry,
+        ),
+        timeit("RegexRegistry.scanner", combined_scanner, lines, registry),
+    ]
+    print("matches: %s" % ", ".join(map(str, results)))
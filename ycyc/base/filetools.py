@@ -4,23 +4,43 @@
 import os
 from os import path as os_path
 import codecs
+import io
 import tempfile
 import shutil
 from contextlib import contextmanager
 from functools import wraps
 import hashlib
+import json
+import mmap
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+from threading import RLock
 from datetime import datetime
+import binascii
+import errno
 import re
+import stat as stat_mode
+import struct
+import time
 
 import six
 
 from ycyc.base import contextutils
+from ycyc.base.typeutils import array_frombytes, array_tobytes, uint64_array
 
 if six.PY2:
     import exceptions
 else:
     import builtins as exceptions  # pylint: disable=import-error
 
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir  # pylint: disable=import-error
+    except ImportError:
+        scandir = None
+
 
 def oserror_format(func):
     """
@@ -61,15 +81,195 @@ def remove_dir(path, recursion=False):
         os.removedirs(path)
 
 
+class RemovalStats(object):
+    """
+    Statistics of bulk_remove_dir, paths are only recorded in dry run.
+    """
+    def __init__(self, dry_run=False, callback=None):
+        self.dry_run = dry_run
+        self.callback = callback
+        self.files = 0
+        self.dirs = 0
+        self.errors = []
+        self.paths = []
+        self.lock = RLock()
+
+    def __repr__(self):
+        return "%s(files=%d, dirs=%d, errors=%d)" % (
+            self.__class__.__name__, self.files, self.dirs, len(self.errors),
+        )
+
+    def remove(self, func, name, dir_fd, path, is_dir):
+        """
+        Remove a entry by func and record it.
+
+        :param func: os.unlink or os.rmdir
+        :param name: entry name relative to dir_fd or path
+        :param dir_fd: fd of parent directory or None
+        :param path: full path of the entry
+        :param is_dir: if entry is a directory
+        """
+        if not self.dry_run:
+            try:
+                if dir_fd is None:
+                    func(name)
+                else:
+                    func(name, dir_fd=dir_fd)
+            except OSError as err:
+                with self.lock:
+                    self.errors.append((path, err))
+                return
+
+        with self.lock:
+            if is_dir:
+                self.dirs += 1
+            else:
+                self.files += 1
+            if self.dry_run:
+                self.paths.append(path)
+            if self.callback:
+                self.callback(path, self)
+
+
+# the root could be a symlink to a directory, but not the children
+RootDirFdFlags = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+DirFdFlags = RootDirFdFlags | getattr(os, "O_NOFOLLOW", 0)
+SupportDirFd = (
+    scandir in getattr(os, "supports_fd", ()) and
+    set([os.open, os.unlink, os.rmdir]).issubset(
+        getattr(os, "supports_dir_fd", ())
+    )
+)
+
+
+def _empty_dir_by_fd(dir_fd, dir_path, stats):
+    for entry in _iter_scandir(dir_fd):
+        path = os_path.join(dir_path, entry.name)
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            is_dir = False
+        if not is_dir:
+            stats.remove(os.unlink, entry.name, dir_fd, path, False)
+            continue
+        try:
+            fd = os.open(entry.name, DirFdFlags, dir_fd=dir_fd)
+        except OSError as err:
+            with stats.lock:
+                stats.errors.append((path, err))
+            continue
+        try:
+            _empty_dir_by_fd(fd, path, stats)
+        finally:
+            os.close(fd)
+        stats.remove(os.rmdir, entry.name, dir_fd, path, True)
+
+
+def _empty_dir_by_path(dir_path, stats):
+    for entry in _iter_scandir(dir_path):
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            is_dir = False
+        if is_dir:
+            _empty_dir_by_path(entry.path, stats)
+            stats.remove(os.rmdir, entry.path, None, entry.path, True)
+        else:
+            stats.remove(os.unlink, entry.path, None, entry.path, False)
+
+
 @oserror_format
-def make_sure_dir_empty(path):
+def bulk_remove_dir(
+    path, keep_root=False, workers=4, callback=None, dry_run=False,
+    ignore_errors=False,
+):
+    """
+    Remove a directory tree by scandir, entries are removed relative to
+    the fd of their parent directory when the platform supports, and
+    the sub directories are removed in a thread pool.
+
+    :param path: directory path string
+    :param keep_root: only remove the entries in the directory
+    :param workers: thread pool size
+    :param callback: callback(path, stats) after each entry removed
+    :param dry_run: only report the entries which would be removed
+    :param ignore_errors: do not reraise the first error
+    :return: RemovalStats
+    """
+    stats = RemovalStats(dry_run, callback)
+    if os_path.islink(path) and not keep_root:
+        stats.remove(os.unlink, path, None, path, False)
+    elif os_path.isdir(path):
+        root_fd = os.open(path, RootDirFdFlags) if SupportDirFd else None
+        pool = ThreadPool(workers)
+        try:
+            def remove_sub_dir(entry):
+                sub_path = os_path.join(path, entry.name)
+                if root_fd is None:
+                    _empty_dir_by_path(sub_path, stats)
+                    stats.remove(os.rmdir, sub_path, None, sub_path, True)
+                    return
+                fd = os.open(entry.name, DirFdFlags, dir_fd=root_fd)
+                try:
+                    _empty_dir_by_fd(fd, sub_path, stats)
+                finally:
+                    os.close(fd)
+                stats.remove(os.rmdir, entry.name, root_fd, sub_path, True)
+
+            tasks = []
+            for entry in _iter_scandir(path if root_fd is None else root_fd):
+                sub_path = os_path.join(path, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    tasks.append((
+                        sub_path, pool.apply_async(remove_sub_dir, (entry,)),
+                    ))
+                elif root_fd is None:
+                    stats.remove(os.unlink, sub_path, None, sub_path, False)
+                else:
+                    stats.remove(os.unlink, entry.name, root_fd, sub_path, False)
+
+            for sub_path, task in tasks:
+                try:
+                    task.get()
+                except OSError as err:
+                    with stats.lock:
+                        stats.errors.append((sub_path, err))
+        finally:
+            pool.close()
+            pool.join()
+            if root_fd is not None:
+                os.close(root_fd)
+        if not keep_root:
+            stats.remove(os.rmdir, path, None, path, True)
+    elif os_path.exists(path) and not keep_root:
+        stats.remove(os.unlink, path, None, path, False)
+
+    if stats.errors and not ignore_errors:
+        raise stats.errors[0][1]
+    return stats
+
+
+@oserror_format
+def make_sure_dir_empty(
+    path, bulk=False, workers=4, callback=None, dry_run=False,
+):
     """
     Make sure the directory is empty.
 
     :param path: path string
+    :param bulk: remove the entries by bulk_remove_dir
+    :param workers: thread pool size in bulk mode
+    :param callback: callback(path, stats) after each entry removed
+    :param dry_run: only report the entries which would be removed
+    :return: RemovalStats in bulk mode
     """
+    bulk = bulk or dry_run or callback is not None
     if not os_path.exists(path):
-        make_sure_dir_exists(path)
+        if not dry_run:
+            make_sure_dir_exists(path)
+        return RemovalStats(dry_run) if bulk else None
+    elif bulk:
+        return bulk_remove_dir(path, True, workers, callback, dry_run)
     else:
         for i in os.listdir(path):
             i_path = os_path.join(path, i)
@@ -80,12 +280,21 @@ def make_sure_dir_empty(path):
 
 
 @oserror_format
-def make_sure_not_exists(path):
+def make_sure_not_exists(
+    path, bulk=False, workers=4, callback=None, dry_run=False,
+):
     """
     Make sure the path is not exists.
 
     :param path: path string
+    :param bulk: remove the directory by bulk_remove_dir
+    :param workers: thread pool size in bulk mode
+    :param callback: callback(path, stats) after each entry removed
+    :param dry_run: only report the entries which would be removed
+    :return: RemovalStats in bulk mode
     """
+    if bulk or dry_run or callback is not None:
+        return bulk_remove_dir(path, False, workers, callback, dry_run)
     if not os_path.exists(path):
         return
     if os_path.isdir(path):
@@ -105,6 +314,179 @@ def safe_open_for_write(fn, encoding="utf-8"):
     return codecs.open(fn, "w+", encoding)
 
 
+class AtomicFileWriter(object):
+    """
+    Write to a temporary file in the same directory and rename it to
+    the target on commit, so the readers never see a torn file.
+    Example:
+    >>> with AtomicFileWriter("report.txt") as writer:
+    ...     writer.write_lines(lines)
+    """
+    BufferSize = 1 << 20
+    BatchSize = 1024
+
+    def __init__(
+        self, fn, encoding="utf-8", binary=False, buffer_size=BufferSize,
+        preallocate=None, fsync=True,
+    ):
+        """
+        :param fn: file path string
+        :param encoding: file encoding, ignored in binary mode
+        :param binary: open the file for bytes
+        :param buffer_size: bytes of the userspace buffer
+        :param preallocate: bytes to preallocate by posix_fallocate
+        :param fsync: fsync the file before rename
+        """
+        self.fn = fn
+        self.encoding = encoding
+        self.binary = binary
+        self.buffer_size = buffer_size
+        self.preallocate = preallocate
+        self.fsync = fsync
+        self.temp_path = None
+        self.fp = None
+
+    @property
+    def closed(self):
+        return self.fp is None
+
+    def open(self):
+        """
+        Create the temporary file, respecting umask and the mode of
+        the existing target.
+        """
+        dir_path = os_path.dirname(os_path.abspath(self.fn))
+        make_sure_dir_exists(dir_path)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(
+            os, "O_BINARY", 0,
+        )
+        while True:
+            temp_path = "%s.%s.tmp" % (
+                self.fn, binascii.hexlify(os.urandom(4)).decode("ascii"),
+            )
+            try:
+                fd = os.open(temp_path, flags, 0o666)
+                break
+            except OSError as err:
+                if err.errno != errno.EEXIST:
+                    raise
+
+        self.temp_path = temp_path
+        try:
+            if os_path.exists(self.fn):
+                os.chmod(temp_path, stat_mode.S_IMODE(os.stat(self.fn).st_mode))
+            if self.preallocate and hasattr(os, "posix_fallocate"):
+                with contextutils.catch(OSError, callback=None):
+                    os.posix_fallocate(fd, 0, self.preallocate)
+            if self.binary:
+                self.fp = io.open(fd, "wb", self.buffer_size)
+            else:
+                self.fp = io.open(
+                    fd, "w", self.buffer_size,
+                    encoding=self.encoding, newline="",
+                )
+        except Exception:
+            os.close(fd)
+            self.abort()
+            raise
+        return self
+
+    def write(self, data):
+        return self.fp.write(data)
+
+    def flush(self):
+        self.fp.flush()
+
+    def close(self):
+        """
+        Commit like a file closed, do nothing if closed already.
+        """
+        self.commit()
+
+    def writelines(self, lines):
+        return self.fp.writelines(lines)
+
+    def write_lines(self, lines, newline="\n", batch_size=BatchSize):
+        """
+        Join lines with newline in batches and write each batch once.
+
+        :param lines: iterable lines without newline
+        :param newline: line separator
+        :param batch_size: lines of each batch
+        """
+        write = self.fp.write
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                batch.append(newline[:0])
+                write(newline.join(batch))
+                batch = []
+        if batch:
+            batch.append(newline[:0])
+            write(newline.join(batch))
+
+    def commit(self):
+        """
+        Flush and fsync the temporary file, then rename it to the target.
+        The temporary file is removed if any step failed.
+        Do nothing if the writer is closed already.
+        """
+        if self.closed:
+            return
+        fp = self.fp
+        try:
+            fp.flush()
+            fd = fp.fileno()
+            if self.preallocate:
+                os.ftruncate(fd, os.lseek(fd, 0, os.SEEK_CUR))
+            if self.fsync:
+                os.fsync(fd)
+            fp.close()
+            self.fp = None
+            getattr(os, "replace", os.rename)(self.temp_path, self.fn)
+        except Exception:
+            self.abort()
+            raise
+        self.temp_path = None
+
+    def abort(self):
+        """
+        Close and remove the temporary file.
+        """
+        if self.fp is not None:
+            with contextutils.catch(callback=None):
+                self.fp.close()
+            self.fp = None
+        if self.temp_path is not None:
+            with contextutils.catch(OSError, callback=None):
+                os.remove(self.temp_path)
+            self.temp_path = None
+
+    def __enter__(self):
+        if self.closed:
+            self.open()
+        return self
+
+    def __exit__(self, typ, val, trbk):
+        if typ is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def safe_open_for_atomic_write(fn, encoding="utf-8", **kwargs):
+    """
+    Auto create the directories and open a AtomicFileWriter for write,
+    the target file is replaced only when the writer is committed.
+
+    :param fn: file path string
+    :param encoding: file encoding
+    :param kwargs: other arguments of AtomicFileWriter
+    """
+    return AtomicFileWriter(fn, encoding, **kwargs).open()
+
+
 def touch_file(path):
     """
     As same as *nix command `touch`
@@ -139,7 +521,7 @@ def safe_open_for_read(fn, encoding="utf-8"):
     return tempfile.TemporaryFile("r")
 
 
-def choice_one_if_exists(paths, default=None):
+def choice_one_if_exists(paths, default=None, resolver=None):
     """
     Choice the first path in paths which is exists.
     You can use this to choice application configuration files.
@@ -157,10 +539,11 @@ def choice_one_if_exists(paths, default=None):
     ...     "./conf/demo.conf",
     ... ])
 
-    :param fn: file path string
-    :param encoding: file encoding
+    :param paths: path strings
+    :param default: returned value when all paths are not exists
+    :param resolver: PathResolver to check paths by directory listing
     """
-    isexists = os_path.exists
+    isexists = os_path.exists if resolver is None else resolver.exists
     for p in paths:
         if isexists(p):
             return p
@@ -205,33 +588,471 @@ def text_from(path, encoding="utf-8"):
         return fp.read()
 
 
-def hash_of(path, hash_name):
+class MappedTextReader(object):
+    """
+    Read the lines of a large text file randomly, the file is memory
+    mapped and indexed by line offsets, so only the requested lines are
+    decoded.
+    Example:
+    >>> with MappedTextReader("app.log", index_path="app.log.idx") as reader:
+    ...     reader.line(1000)
+    ...     reader.lines(10, 20)
+    ...     reader.tail(5)
+    """
+    IndexMagic = b"YCLI"
+    IndexHeader = struct.Struct("<4sQQ")
+
+    def __init__(self, path, encoding="utf-8", index_path=None):
+        """
+        :param path: file path string
+        :param encoding: file encoding
+        :param index_path: path to persist the line offset index
+        """
+        self.path = path
+        self.encoding = encoding
+        self.index_path = index_path
+        self.fp = open(path, "rb")
+        try:
+            stat = os.fstat(self.fp.fileno())
+            self.size = stat.st_size
+            self.mtime_ns = _mtime_ns(stat)
+            self.mapped = (
+                mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+                if self.size else b""
+            )
+        except Exception:
+            self.fp.close()
+            raise
+        self._offsets = None
+
+    def close(self):
+        if self.size:
+            self.mapped.close()
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, val, trbk):
+        self.close()
+
+    @property
+    def offsets(self):
+        """
+        Start offsets of each line and the end offset of the last line.
+        """
+        if self._offsets is None:
+            offsets = None
+            if self.index_path and os_path.exists(self.index_path):
+                offsets = self.load_index()
+            if offsets is None:
+                offsets = self.build_index()
+                if self.index_path:
+                    self.save_index(offsets)
+            self._offsets = offsets
+        return self._offsets
+
+    def build_index(self):
+        """
+        Scan the file and return the line offsets.
+        """
+        offsets = uint64_array([0])
+        append = offsets.append
+        find = self.mapped.find
+        pos = find(b"\n")
+        while pos != -1:
+            pos += 1
+            append(pos)
+            pos = find(b"\n", pos)
+        if offsets[-1] != self.size:
+            append(self.size)
+        return offsets
+
+    def load_index(self):
+        """
+        Load the line offsets from index_path,
+        return None if index is outdated.
+        """
+        header_size = self.IndexHeader.size
+        with open(self.index_path, "rb") as fp:
+            header = fp.read(header_size)
+            if len(header) != header_size:
+                return None
+            magic, size, mtime_ns = self.IndexHeader.unpack(header)
+            if (magic, size, mtime_ns) != (
+                self.IndexMagic, self.size, self.mtime_ns,
+            ):
+                return None
+            offsets = array_frombytes(uint64_array(), fp.read())
+        return offsets
+
+    def save_index(self, offsets):
+        """
+        Save the line offsets to index_path.
+
+        :param offsets: line offsets
+        """
+        with AtomicFileWriter(self.index_path, binary=True) as writer:
+            writer.write(self.IndexHeader.pack(
+                self.IndexMagic, self.size, self.mtime_ns,
+            ))
+            writer.write(array_tobytes(offsets))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _decode_line(self, start, end):
+        line = self.mapped[start:end]
+        if line.endswith(b"\n"):
+            line = line[:-1]
+            if line.endswith(b"\r"):
+                line = line[:-1]
+        return line.decode(self.encoding)
+
+    def line(self, n):
+        """
+        Return the nth line without the line separator.
+
+        :param n: line number from 0, negative number is from the end
+        """
+        offsets = self.offsets
+        count = len(offsets) - 1
+        if n < 0:
+            n += count
+        if not 0 <= n < count:
+            raise IndexError("line index out of range: %s" % n)
+        return self._decode_line(offsets[n], offsets[n + 1])
+
+    def lines(self, start=0, stop=None):
+        """
+        Return the lines in range [start, stop).
+
+        :param start: start line number
+        :param stop: stop line number(default: the end)
+        """
+        offsets = self.offsets
+        start, stop, _ = slice(start, stop).indices(len(offsets) - 1)
+        decode = self._decode_line
+        return [
+            decode(offsets[i], offsets[i + 1])
+            for i in range(start, stop)
+        ]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            if idx.step not in (None, 1):
+                raise ValueError("slice step is not supported")
+            return self.lines(idx.start or 0, idx.stop)
+        return self.line(idx)
+
+    def tail(self, k):
+        """
+        Return the last k lines, only the tail of file is scanned
+        when the index is not built.
+
+        :param k: number of lines
+        """
+        if k <= 0:
+            return []
+        if self._offsets is not None:
+            return self.lines(max(len(self) - k, 0))
+
+        if not self.size:
+            return []
+        pos = self.size
+        if self.mapped[pos - 1:pos] == b"\n":
+            pos -= 1
+        starts = [self.size]
+        rfind = self.mapped.rfind
+        while len(starts) <= k:
+            pos = rfind(b"\n", 0, pos)
+            starts.append(pos + 1)
+            if pos < 0:
+                break
+        starts.reverse()
+        return [
+            self._decode_line(starts[i], starts[i + 1])
+            for i in range(len(starts) - 1)
+        ]
+
+
+HashBlockSize = 1 << 20
+HashMmapThreshold = 64 << 20
+
+
+def _iter_block_views(path, block_size, mmap_threshold):
+    # blocks of mapped files are zero-copy memoryviews, which are
+    # released as soon as the next block is requested
+    with open(path, "rb") as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if mmap_threshold is not None and 0 < size and mmap_threshold <= size:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            if six.PY2:
+                # mmap does not support the buffer protocol of memoryview
+                try:
+                    for offset in range(0, size, block_size):
+                        yield mapped[offset: offset + block_size]
+                finally:
+                    mapped.close()
+                return
+
+            try:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, block_size):
+                        block = view[offset: offset + block_size]
+                        try:
+                            yield block
+                        finally:
+                            block.release()
+                finally:
+                    view.release()
+            finally:
+                mapped.close()
+            return
+
+        read = fp.read
+        block = read(block_size)
+        while block:
+            yield block
+            block = read(block_size)
+
+
+def iter_blocks(path, block_size=HashBlockSize, mmap_threshold=HashMmapThreshold):
+    """
+    Iterate the content of a file in bytes block by block, files larger
+    than mmap_threshold are mapped into memory instead of read into buffers.
+
+    :param path: file path string
+    :param block_size: bytes of each block
+    :param mmap_threshold: file size to use mmap(None to disable)
+    """
+    for block in _iter_block_views(path, block_size, mmap_threshold):
+        yield bytes(block)
+
+
+def hashes_of(
+    path, hash_names, block_size=HashBlockSize,
+    mmap_threshold=HashMmapThreshold,
+):
+    """
+    Return the hashes of a file by reading it only once.
+
+    :param path: file path string
+    :param hash_names: hash algorithm names, like: ("md5", "sha1")
+    :param block_size: bytes of each block
+    :param mmap_threshold: file size to use mmap(None to disable)
+    :return: dict of hash name and hex digest
+    """
+    hashes = [(i, hashlib.new(i)) for i in hash_names]
+    updaters = [h.update for _, h in hashes]
+    for block in _iter_block_views(path, block_size, mmap_threshold):
+        for update in updaters:
+            update(block)
+    return dict((name, h.hexdigest()) for name, h in hashes)
+
+
+def hash_of(path, hash_name, block_size=HashBlockSize, cache=None):
     """
     Return the hash of a file
 
     :param path: file path string
     :param hash_name: hash algorithm name(md5/sha1/sha256/sha512)
+    :param block_size: bytes of each block
+    :param cache: DigestCache to answer unchanged files
     """
-    hash = hashlib.new(hash_name, bytes_from(path))
-    return hash.hexdigest()
+    if cache is not None:
+        return cache.hashes_of(path, (hash_name,), block_size)[hash_name]
+    return hashes_of(path, (hash_name,), block_size)[hash_name]
 
 
-def sha1_of(path):
+def hash_tree(
+    path, hash_names=("md5",), workers=4, block_size=HashBlockSize,
+    cache=None,
+):
+    """
+    Return the hashes of all files in a directory tree,
+    files are hashed in a thread pool.
+
+    :param path: directory path string
+    :param hash_names: hash algorithm names, like: ("md5", "sha1")
+    :param workers: thread pool size
+    :param block_size: bytes of each block
+    :param cache: DigestCache to answer unchanged files
+    :return: dict of file path and dict of hash name and hex digest
+    """
+    hasher = hashes_of if cache is None else cache.hashes_of
+
+    def iter_files():
+        for root, _, files in os.walk(path):
+            for name in files:
+                yield os_path.join(root, name)
+
+    def hash_file(file_path):
+        return file_path, hasher(file_path, hash_names, block_size)
+
+    pool = ThreadPool(workers)
+    try:
+        return dict(pool.imap_unordered(hash_file, iter_files()))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _mtime_ns(stat):
+    mtime_ns = getattr(stat, "st_mtime_ns", None)
+    if mtime_ns is None:
+        mtime_ns = int(stat.st_mtime * 1000000000)
+    return mtime_ns
+
+
+class DigestCache(object):
+    """
+    A LRU cache of file digests keyed by (device, inode, size, mtime_ns),
+    so the unchanged files are answered without reading them.
+    Example:
+    >>> cache = DigestCache("/var/cache/digests.json")
+    >>> md5_of("/path/to/file", cache=cache)
+    >>> cache.save()
+    """
+    IndexVersion = 1
+
+    def __init__(self, index_path=None, capacity=65536):
+        """
+        :param index_path: path of the index file to load and save
+        :param capacity: max entries to keep
+        """
+        self.index_path = index_path
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = RLock()
+        if index_path and os_path.exists(index_path):
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def key_of(cls, path):
+        """
+        Return the cache key of a file.
+
+        :param path: file path string
+        """
+        stat = os.stat(path)
+        return (stat.st_dev, stat.st_ino, stat.st_size, _mtime_ns(stat))
+
+    def _store(self, key, digests):
+        entries = self.entries
+        entries.pop(key, None)
+        entries[key] = digests
+        while len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def hashes_of(self, path, hash_names, block_size=HashBlockSize):
+        """
+        Return the hashes of a file, only missing digests are computed.
+
+        :param path: file path string
+        :param hash_names: hash algorithm names, like: ("md5", "sha1")
+        :param block_size: bytes of each block
+        :return: dict of hash name and hex digest
+        """
+        key = self.key_of(path)
+        with self.lock:
+            digests = dict(self.entries.get(key) or {})
+            missing = [i for i in hash_names if i not in digests]
+            if not missing:
+                self.hits += 1
+                self._store(key, self.entries[key])
+                return dict((i, digests[i]) for i in hash_names)
+            self.misses += 1
+
+        digests.update(hashes_of(path, missing, block_size))
+        # file may be changed while hashing
+        if self.key_of(path) == key:
+            with self.lock:
+                cached = self.entries.get(key) or {}
+                cached.update(digests)
+                self._store(key, cached)
+        return dict((i, digests[i]) for i in hash_names)
+
+    def invalidate(self, path):
+        """
+        Drop the cached digests of a file.
+
+        :param path: file path string
+        :return: True if any digests were dropped
+        """
+        try:
+            key = self.key_of(path)
+        except OSError:
+            return False
+        with self.lock:
+            return self.entries.pop(key, None) is not None
+
+    def clear(self):
+        """
+        Drop all cached digests and reset the counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def load(self, index_path=None):
+        """
+        Load entries from the index file.
+
+        :param index_path: path of the index file(default: self.index_path)
+        """
+        with open(index_path or self.index_path, "rt") as fp:
+            index = json.load(fp)
+        if index.get("version") != self.IndexVersion:
+            return
+        with self.lock:
+            for entry in index["entries"]:
+                self._store(tuple(entry[:4]), entry[4])
+
+    def save(self, index_path=None):
+        """
+        Save entries to the index file.
+
+        :param index_path: path of the index file(default: self.index_path)
+        """
+        index_path = index_path or self.index_path
+        with self.lock:
+            index = {
+                "version": self.IndexVersion,
+                "entries": [
+                    list(key) + [digests]
+                    for key, digests in self.entries.items()
+                ],
+            }
+        with AtomicFileWriter(index_path) as writer:
+            writer.write(six.text_type(json.dumps(index)))
+
+
+def sha1_of(path, cache=None):
     """
     Return the sha1 hash of a file
 
     :param path: file path string
+    :param cache: DigestCache to answer unchanged files
     """
-    return hash_of(path, "sha1")
+    return hash_of(path, "sha1", cache=cache)
 
 
-def md5_of(path):
+def md5_of(path, cache=None):
     """
     Return the md5 hash of a file
 
     :param path: file path string
+    :param cache: DigestCache to answer unchanged files
     """
-    return hash_of(path, "md5")
+    return hash_of(path, "md5", cache=cache)
 
 
 def available_file_name(name, replaces="_"):
@@ -248,21 +1069,106 @@ def available_file_name(name, replaces="_"):
     )
 
 
-def mk_not_existed_path(path):
+def mk_not_existed_path(path, resolver=None, create=False):
     """
     Return a new file name based on path, and make sure the new name
     is not existed.
 
     :param path: file name
+    :param resolver: PathResolver to check names by directory listing
+    :param create: create the file exclusively to avoid races
     """
     name_without_ext, ext = os_path.splitext(path)
+    isexists = os_path.exists if resolver is None else resolver.exists
 
     n = 1
-    while os_path.exists(path):
+    while True:
+        while isexists(path):
+            n += 1
+            path = name_without_ext + "(%d)" % n + ext
+        if not create:
+            return path
+
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        except OSError as err:
+            if err.errno != errno.EEXIST:
+                raise
+        else:
+            if resolver is not None:
+                resolver.add(path)
+            return path
         n += 1
         path = name_without_ext + "(%d)" % n + ext
 
-    return path
+
+class PathResolver(object):
+    """
+    Check the existence of many paths by listing each directory once
+    and looking up names in a set, instead of a stat per path.
+    Names are compared exactly even on case insensitive file systems.
+    Example:
+    >>> resolver = PathResolver()
+    >>> resolver.existing(["conf/a.conf", "conf/b.conf", "conf/c.conf"])
+    >>> mk_not_existed_path("output/report.txt", resolver, create=True)
+    """
+    def __init__(self):
+        self.listings = {}
+
+    def names_of(self, dir_path):
+        """
+        Return the name set of a directory, it is listed only once.
+
+        :param dir_path: directory path string
+        """
+        names = self.listings.get(dir_path)
+        if names is None:
+            try:
+                names = set(os.listdir(dir_path or os.curdir))
+            except OSError:
+                names = set()
+            self.listings[dir_path] = names
+        return names
+
+    def exists(self, path):
+        """
+        Check if path is exists by the listing of its directory.
+
+        :param path: path string
+        """
+        dir_path, name = os_path.split(path)
+        if name in ("", os.curdir, os.pardir):
+            return os_path.exists(path)
+        return name in self.names_of(dir_path)
+
+    def existing(self, paths):
+        """
+        Return the paths which are exists, keeping the order.
+
+        :param paths: path strings
+        """
+        exists = self.exists
+        return [p for p in paths if exists(p)]
+
+    def add(self, path):
+        """
+        Record a path created by caller.
+
+        :param path: path string
+        """
+        dir_path, name = os_path.split(path)
+        self.names_of(dir_path).add(name)
+
+    def refresh(self, dir_path=None):
+        """
+        Drop the cached listing of a directory or all directories.
+
+        :param dir_path: directory path string(default: all)
+        """
+        if dir_path is None:
+            self.listings.clear()
+        else:
+            self.listings.pop(dir_path, None)
 
 
 class PathInfo(object):
@@ -360,3 +1266,252 @@ class PathInfo(object):
     @property
     def creation_time(self):
         return datetime.fromtimestamp(self.creation_timestamp)
+
+
+class CachedPathInfo(PathInfo):
+    """
+    A PathInfo which stats the path only once, children are listed by
+    scandir so their file types and stats come from the DirEntry.
+    """
+    def __init__(self, path, entry=None):
+        """
+        :param path: path string
+        :param entry: DirEntry of this path from scandir
+        """
+        if entry is None:
+            super(CachedPathInfo, self).__init__(path)
+        else:
+            self.path = entry.path
+        self.entry = entry
+        self._stat = None
+
+    def refresh(self):
+        """
+        Drop the cached stat result.
+        """
+        self._stat = None
+        self.entry = None
+
+    def _check_mode(self, checker, entry_checker):
+        if self.entry is not None:
+            with contextutils.catch(OSError, callback=None):
+                return entry_checker()
+            return False
+        try:
+            return checker(self.stat.st_mode)
+        except OSError:
+            return False
+
+    @property
+    def is_exists(self):
+        try:
+            self.stat
+        except OSError:
+            return False
+        return True
+
+    @property
+    def is_file(self):
+        return self._check_mode(
+            stat_mode.S_ISREG, lambda: self.entry.is_file(),
+        )
+
+    @property
+    def is_dir(self):
+        return self._check_mode(
+            stat_mode.S_ISDIR, lambda: self.entry.is_dir(),
+        )
+
+    @property
+    def is_link(self):
+        if self.entry is not None:
+            return self.entry.is_symlink()
+        return os_path.islink(self.path)
+
+    @property
+    def directory(self):
+        return CachedPathInfo(self.dir_path)
+
+    def iter_children(self):
+        """
+        Iterate the children lazily.
+        """
+        if not self.is_dir:
+            return
+        for entry in _iter_scandir(self.path):
+            yield CachedPathInfo(entry.path, entry)
+
+    @property
+    def children(self):
+        return list(self.iter_children())
+
+    @property
+    def stat(self):
+        if self._stat is None:
+            if self.entry is not None:
+                self._stat = self.entry.stat()
+            else:
+                self._stat = os.stat(self.path)
+        return self._stat
+
+
+class _DirEntry(object):
+    """
+    A minimal DirEntry by listdir and lstat, for python without scandir.
+    """
+    def __init__(self, dir_path, name):
+        self.name = name
+        self.path = os_path.join(dir_path, name)
+        self._lstat = None
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, self.name)
+
+    def inode(self):
+        return self.stat(follow_symlinks=False).st_ino
+
+    def stat(self, follow_symlinks=True):
+        if follow_symlinks:
+            return os.stat(self.path)
+        if self._lstat is None:
+            self._lstat = os.lstat(self.path)
+        return self._lstat
+
+    def is_symlink(self):
+        try:
+            return stat_mode.S_ISLNK(self.stat(follow_symlinks=False).st_mode)
+        except OSError:
+            return False
+
+    def _is_mode(self, checker, follow_symlinks):
+        try:
+            st = self.stat(follow_symlinks=False)
+            if follow_symlinks and stat_mode.S_ISLNK(st.st_mode):
+                st = self.stat()
+        except OSError:
+            return False
+        return checker(st.st_mode)
+
+    def is_dir(self, follow_symlinks=True):
+        return self._is_mode(stat_mode.S_ISDIR, follow_symlinks)
+
+    def is_file(self, follow_symlinks=True):
+        return self._is_mode(stat_mode.S_ISREG, follow_symlinks)
+
+
+def _listdir_scandir(path):
+    return (_DirEntry(path, i) for i in os.listdir(path))
+
+
+def _iter_scandir(path):
+    iterator = (scandir or _listdir_scandir)(path)
+    try:
+        for entry in iterator:
+            yield entry
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+def _as_timestamp(value):
+    if isinstance(value, datetime):
+        return time.mktime(value.timetuple()) + value.microsecond / 1e6
+    return value
+
+
+def iter_path_infos(
+    path, extensions=None, min_size=None, max_size=None,
+    modified_after=None, modified_before=None,
+    include_dirs=False, follow_links=False,
+):
+    """
+    Walk a directory tree lazily and yield the CachedPathInfo of entries
+    which pass all the filters, the tree is never materialised.
+    Example:
+    >>> for info in iter_path_infos("/var/log", extensions=[".log"]):
+    ...     print(info.path, info.length)
+
+    :param path: directory path string
+    :param extensions: file extensions to accept, like: [".py", ".txt"]
+    :param min_size: min file size in bytes
+    :param max_size: max file size in bytes
+    :param modified_after: timestamp or datetime of min modified time
+    :param modified_before: timestamp or datetime of max modified time
+    :param include_dirs: yield directories too
+    :param follow_links: walk into the linked directories
+    """
+    if extensions is not None:
+        extensions = set(i.lower() for i in extensions)
+    modified_after = _as_timestamp(modified_after)
+    modified_before = _as_timestamp(modified_before)
+    need_stat = not (
+        min_size is None and max_size is None and
+        modified_after is None and modified_before is None
+    )
+
+    visited = set()
+    if follow_links:
+        with contextutils.catch(OSError, callback=None):
+            root_stat = os.stat(path)
+            visited.add((root_stat.st_dev, root_stat.st_ino))
+
+    dir_paths = [path]
+    while dir_paths:
+        for entry in _iter_entries_quietly(dir_paths.pop()):
+            try:
+                info = _filter_entry(
+                    entry, extensions, min_size, max_size,
+                    modified_after, modified_before, need_stat,
+                    include_dirs, follow_links, dir_paths, visited,
+                )
+            except OSError:
+                continue
+            if info is not None:
+                yield info
+
+
+def _iter_entries_quietly(path):
+    try:
+        for entry in _iter_scandir(path):
+            yield entry
+    except OSError:
+        return
+
+
+def _filter_entry(
+    entry, extensions, min_size, max_size, modified_after, modified_before,
+    need_stat, include_dirs, follow_links, dir_paths, visited,
+):
+    # return the CachedPathInfo if entry passes, the sub directory is
+    # appended into dir_paths, linked directories are walked only once
+    if entry.is_dir(follow_symlinks=follow_links):
+        if follow_links:
+            dir_stat = os.stat(entry.path)
+            dir_key = (dir_stat.st_dev, dir_stat.st_ino)
+            if dir_key not in visited:
+                visited.add(dir_key)
+                dir_paths.append(entry.path)
+        else:
+            dir_paths.append(entry.path)
+        if not include_dirs:
+            return None
+    if extensions is not None and (
+        os_path.splitext(entry.name)[1].lower() not in extensions
+    ):
+        return None
+
+    info = CachedPathInfo(entry.path, entry)
+    if not need_stat:
+        return info
+
+    stat = info.stat
+    if min_size is not None and stat.st_size < min_size:
+        return None
+    if max_size is not None and stat.st_size > max_size:
+        return None
+    if modified_after is not None and stat.st_mtime < modified_after:
+        return None
+    if modified_before is not None and stat.st_mtime > modified_before:
+        return None
+    return info
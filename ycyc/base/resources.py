@@ -1,6 +1,11 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
+import re
+from functools import partial
+
+import six
+
 
 class Regex(object):
     @classmethod
@@ -150,3 +155,128 @@ class Regex(object):
     def ipv4(cls):
         ip_field = "0*%s" % cls.num_less_than(256)
         return r"(?<!\d)(%s(?:\.%s){3})(?!\d)" % (ip_field, ip_field)
+
+
+class RegexScanner(object):
+    """
+    Combine patterns into a named-group alternation, so that all of them
+    are extracted in one pass over the text.
+    Matches are not overlapped, when more than one pattern matched at
+    the same position, the former one in patterns wins.
+    Example:
+    >>> scanner = RegexScanner([("ip", Regex.ipv4()), ("date", Regex.date())])
+    >>> scanner.findall("127.0.0.1 at 2016-01-01")
+    {'ip': ['127.0.0.1'], 'date': ['2016-01-01']}
+    """
+
+    def __init__(self, patterns, flags=0):
+        """
+        :param patterns: list of (label, pattern string)
+        :param flags: re flags
+        """
+        self.labels = []
+        parts = []
+        for label, pattern in patterns:
+            if label in self.labels:
+                raise ValueError("duplicated label: %s" % label)
+            self.labels.append(label)
+            parts.append("(?P<%s>%s)" % (label, pattern))
+        self.rex = re.compile("|".join(parts), flags)
+
+    def finditer(self, text):
+        """
+        Scan text and yield the matches.
+
+        :param text: string
+        :return: iterator of (label, match object)
+        """
+        for match in self.rex.finditer(text):
+            yield match.lastgroup, match
+
+    def findall(self, text):
+        """
+        Scan text and group the matched strings by label.
+
+        :param text: string
+        :return: dict of label and matched strings
+        """
+        results = {}
+        for label, match in self.finditer(text):
+            results.setdefault(label, []).append(match.group(label))
+        return results
+
+
+class RegexRegistry(object):
+    """
+    Compile the patterns of Regex and memoize them, parameterised patterns
+    are memoized by their arguments.
+    Example:
+    >>> regexes = RegexRegistry()
+    >>> regexes.num_less_than(256).match("255")
+    >>> regexes.compile("hex_num", 4) is regexes.hex_num(4)
+    True
+    """
+
+    def __init__(self, regex=Regex, flags=0):
+        """
+        :param regex: class provided the pattern strings
+        :param flags: re flags of all patterns
+        """
+        self.regex = regex
+        self.flags = flags
+        self.compiled = {}
+        self.scanners = {}
+
+    def pattern(self, name, *args, **kwargs):
+        """
+        Get the pattern string of regex.
+
+        :param name: name of pattern in regex
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.regex, name)(*args, **kwargs)
+
+    def compile(self, name, *args, **kwargs):
+        """
+        Get the compiled pattern of regex.
+
+        :param name: name of pattern in regex
+        """
+        key = (name, args, tuple(sorted(kwargs.items())))
+        rex = self.compiled.get(key)
+        if rex is None:
+            rex = re.compile(self.pattern(name, *args, **kwargs), self.flags)
+            rex = self.compiled.setdefault(key, rex)
+        return rex
+
+    def scanner(self, names):
+        """
+        Get the memoized scanner combined by names, each of names is the
+        name of pattern, or the tuple of name and arguments.
+
+        :param names: pattern names
+        :return: RegexScanner
+        """
+        names = tuple(
+            (i, ()) if isinstance(i, six.string_types) else (i[0], tuple(i[1]))
+            for i in names
+        )
+        scanner = self.scanners.get(names)
+        if scanner is None:
+            scanner = RegexScanner(
+                [(name, self.pattern(name, *args)) for name, args in names],
+                self.flags,
+            )
+            scanner = self.scanners.setdefault(names, scanner)
+        return scanner
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if not callable(getattr(self.regex, name, None)):
+            raise AttributeError(name)
+        return partial(self.compile, name)
+
+
+regexes = RegexRegistry()
@@ -5,8 +5,11 @@
 funcutils provided some useful functions.
 """
 
+import heapq
 import re
-from functools import reduce
+from collections import OrderedDict, deque
+from operator import itemgetter
+from threading import Lock
 
 try:
     unicode = unicode
@@ -14,6 +17,101 @@ except NameError:
     unicode = str
 
 
+def _bit_count(num):
+    return bin(num).count("1")
+
+
+bit_count = getattr(int, "bit_count", _bit_count)
+
+
+TemplateCacheSize = 256
+TemplatePattern = re.compile(r"{{([\.\w]+?)}}")
+
+
+def _path_getter(path):
+    keys = path.split(".")
+    if len(keys) == 1:
+        return itemgetter(keys[0])
+
+    getters = [itemgetter(i) for i in keys]
+
+    def getter(model):
+        for get in getters:
+            model = get(model)
+        return model
+
+    return getter
+
+
+class CompiledTemplate(object):
+    """
+    Template parsed into literal chunks and accessors of model.
+    Example:
+    >>> template = CompiledTemplate("{{foo.bar}} {{name}}")
+    >>> template.render({"name": "lyc", "foo": {"bar": "hello"}})
+    'hello lyc'
+    """
+
+    def __init__(self, template):
+        """
+        :param template: template string
+        """
+        self.template = template
+        parts = TemplatePattern.split(template)
+        self.chunks = parts[0::2]
+        self.paths = parts[1::2]
+        self.accessors = [_path_getter(i) for i in self.paths]
+
+    def render(self, model):
+        """
+        Render the template with model
+
+        :param model: dict model
+        :return: string
+        """
+        if not self.accessors:
+            return self.chunks[0]
+
+        parts = [None] * (len(self.chunks) * 2 - 1)
+        parts[0::2] = self.chunks
+        parts[1::2] = [str(get(model)) for get in self.accessors]
+        return "".join(parts)
+
+    def render_many(self, models):
+        """
+        Render the template with each model
+
+        :param models: dict model list
+        :return: string list
+        """
+        return [self.render(i) for i in models]
+
+
+_template_cache = OrderedDict()
+_template_cache_lock = Lock()
+
+
+def compile_template(template):
+    """
+    Compile template and cache the result in a LRU cache,
+    which is shared by all callers and limited by TemplateCacheSize.
+
+    :param template: template string or CompiledTemplate
+    :return: CompiledTemplate
+    """
+    if isinstance(template, CompiledTemplate):
+        return template
+
+    with _template_cache_lock:
+        compiled = _template_cache.pop(template, None)
+        if compiled is None:
+            compiled = CompiledTemplate(template)
+        _template_cache[template] = compiled
+        while len(_template_cache) > TemplateCacheSize:
+            _template_cache.popitem(last=False)
+    return compiled
+
+
 def template_render(template, model):
     """
     A simple template render.
@@ -27,15 +125,10 @@ def template_render(template, model):
     >>> template = "{{foo.bar}} {{ name }}"
     >>> template_render(template, model)
 
-    :param template: template string
+    :param template: template string or CompiledTemplate
     :param model: dict model
     """
-    parts = []
-    for part in re.split(r"{{([\.\w]+?)}}", template):
-        parts.append(str(
-            part if len(parts) & 1 == 0 else
-            reduce(lambda m, k: m[k], part.split("."), model)))
-    return "".join(parts)
+    return compile_template(template).render(model)
 
 
 def encode(s, encoding="utf-8", errors="strict"):
@@ -158,38 +251,117 @@ class TxtDistance(object):
     @classmethod
     def edit_distance(cls, s1, s2):
         """
-        Simple algorithm to calculate the distance between two str
+        Simple algorithm to calculate the distance between two str,
+        only two rows of the table are kept, so the memory is
+        O(min(len(s1), len(s2))).
 
         :param s1: string 1
         :param s2: string 2
         :return: distance number
         """
-        len1 = len(s1)
-        len2 = len(s2)
+        if len(s1) < len(s2):
+            s1, s2 = s2, s1
+        if not s2:
+            return len(s1)
+
+        previous = list(range(len(s2) + 1))
+        for i, c1 in enumerate(s1, 1):
+            current = [i]
+            for j, c2 in enumerate(s2, 1):
+                if c1 == c2:
+                    current.append(previous[j - 1])
+                else:
+                    current.append(1 + min(
+                        previous[j], current[j - 1], previous[j - 1],
+                    ))
+            previous = current
+        return previous[-1]
 
-        if (len1 <= 0) or (len2 <= 0):
-            return len1 or len2
+    @classmethod
+    def bit_parallel_edit_distance(cls, s1, s2):
+        """
+        Myers' bit-parallel algorithm(Hyyrö's variant for edit distance),
+        each column of the table is a bit vector of the shorter string,
+        python int is used as the machine word so there is no limit of
+        the length.
 
-        row_n = len1 + 1
-        col_n = len2 + 1
+        :param s1: string 1
+        :param s2: string 2
+        :return: distance number
+        """
+        if len(s1) < len(s2):
+            s1, s2 = s2, s1
+        length = len(s2)
+        if not length:
+            return len(s1)
+
+        peq = {}
+        for i, c in enumerate(s2):
+            peq[c] = peq.get(c, 0) | (1 << i)
+
+        mask = (1 << length) - 1
+        last = 1 << (length - 1)
+        pv = mask
+        mv = 0
+        score = length
+        for c in s1:
+            eq = peq.get(c, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = ((ph << 1) | 1) & mask
+            mh = (mh << 1) & mask
+            pv = (mh | ~(xv | ph)) & mask
+            mv = ph & xv
+        return score
 
-        f_table = [[0] * col_n for x in range(row_n)]
-        for i in range(row_n):
-            f_table[i][0] = i
-        for i in range(col_n):
-            f_table[0][i] = i
+    @classmethod
+    def banded_edit_distance(cls, s1, s2, max_distance):
+        """
+        Calculate the distance only in the band of max_distance around
+        the diagonal, and stop once every cell of a row exceeds it.
 
-        for i in range(1, row_n):
-            for j in range(1, col_n):
-                if s1[i - 1] == s2[j - 1]:
-                    f_table[i][j] = f_table[i - 1][j - 1]
+        :param s1: string 1
+        :param s2: string 2
+        :param max_distance: max distance to care about
+        :return: distance number, or max_distance + 1 if exceeded
+        """
+        len1 = len(s1)
+        len2 = len(s2)
+        limit = max_distance + 1
+        if abs(len1 - len2) > max_distance:
+            return limit
+        if not len1 or not len2:
+            return len1 or len2
+
+        previous = [j if j <= max_distance else limit for j in range(len2 + 1)]
+        current = [limit] * (len2 + 1)
+        for i in range(1, len1 + 1):
+            low = max(1, i - max_distance)
+            high = min(len2, i + max_distance)
+            current[low - 1] = i if low == 1 and i <= max_distance else limit
+            row_min = current[low - 1]
+            c1 = s1[i - 1]
+            for j in range(low, high + 1):
+                if c1 == s2[j - 1]:
+                    val = previous[j - 1]
                 else:
-                    f_table[i][j] = min([
-                        f_table[i - 1][j] + 1,
-                        f_table[i][j - 1] + 1,
-                        f_table[i - 1][j - 1] + 1
-                    ])
-        return f_table[row_n - 1][col_n - 1]
+                    val = 1 + min(previous[j], current[j - 1], previous[j - 1])
+                    if val > limit:
+                        val = limit
+                current[j] = val
+                if val < row_min:
+                    row_min = val
+            if row_min > max_distance:
+                return limit
+            previous, current = current, previous
+
+        return min(previous[len2], limit)
 
     @classmethod
     def edit_distance2(cls, str1, str2):
@@ -242,23 +414,352 @@ class TxtDistance(object):
                 distance += 1
         return distance
 
+    @classmethod
+    def int_hamming_distance(cls, n1, n2):
+        """
+        Reutrn hamming distance between two non-negative integers,
+        such as simhash fingerprints.
+
+        :param n1: integer 1
+        :param n2: integer 2
+        :return: distance number
+        """
+        return bit_count(n1 ^ n2)
+
+    @classmethod
+    def int_hamming_distances(cls, num, numbers):
+        """
+        Reutrn hamming distances between num and each of numbers.
+
+        :param num: integer
+        :param numbers: integer list
+        :return: distance list
+        """
+        return [bit_count(num ^ i) for i in numbers]
+
+    @classmethod
+    def nearest_by_hamming(cls, num, numbers, top_k=1, max_distance=None):
+        """
+        Find the top_k numbers closest to num in hamming distance,
+        the former one wins if distances are the same.
+
+        :param num: integer
+        :param numbers: integer list
+        :param top_k: max count of results
+        :param max_distance: max distance of results, None means no limit
+        :return: sorted list of (distance, number)
+        """
+        results = (
+            (bit_count(num ^ n), i, n)
+            for i, n in enumerate(numbers)
+        )
+        if max_distance is not None:
+            results = (i for i in results if i[0] <= max_distance)
+        return [(d, n) for d, _, n in heapq.nsmallest(top_k, results)]
+
+
+class FuzzyMatcher(object):
+    """
+    Index candidates in a BK-tree so that a query only computes the
+    distance to the candidates which could be in the distance bound.
+    Example:
+    >>> matcher = FuzzyMatcher(["start", "stop", "status"])
+    >>> matcher.search("stat", max_distance=2)
+    [(1, 'start'), (2, 'stop'), (2, 'status')]
+    """
+
+    def __init__(self, candidates=(), distance=None):
+        """
+        :param candidates: string list
+        :param distance: distance function, it must be a metric
+        """
+        self.distance = distance or TxtDistance.bit_parallel_edit_distance
+        # node: [candidate, insert order, {distance: child node}]
+        self.root = None
+        self.size = 0
+        self.add_many(candidates)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, candidate):
+        """
+        Add a candidate, duplicated candidate would be ignored
+
+        :param candidate: string
+        :return: True if the candidate is added
+        """
+        node = [candidate, self.size, {}]
+        if self.root is None:
+            self.root = node
+            self.size += 1
+            return True
+
+        current = self.root
+        while True:
+            dist = self.distance(candidate, current[0])
+            if dist == 0:
+                return False
+            child = current[2].get(dist)
+            if child is None:
+                current[2][dist] = node
+                self.size += 1
+                return True
+            current = child
+
+    def add_many(self, candidates):
+        """
+        Add candidates
+
+        :param candidates: string list
+        :return: count of added candidates
+        """
+        return sum(1 for i in candidates if self.add(i))
+
+    def search(self, target, max_distance=None, top_k=None):
+        """
+        Find the candidates look like target
+
+        :param target: string
+        :param max_distance: max distance of results, None means no limit
+        :param top_k: max count of results, None means no limit
+        :return: sorted list of (distance, candidate)
+        """
+        if self.root is None or top_k is not None and top_k <= 0:
+            return []
+
+        bound = float("inf") if max_distance is None else max_distance
+        # max heap of (-distance, -insert order, candidate) when top_k given
+        found = []
+        stack = [self.root]
+        while stack:
+            candidate, order, children = stack.pop()
+            dist = self.distance(target, candidate)
+            if dist <= bound:
+                item = (-dist, -order, candidate)
+                if top_k is None:
+                    found.append(item)
+                elif len(found) < top_k:
+                    heapq.heappush(found, item)
+                elif item > found[0]:
+                    heapq.heapreplace(found, item)
+                if top_k is not None and len(found) == top_k:
+                    bound = -found[0][0]
+
+            for child_dist, child in children.items():
+                if abs(child_dist - dist) <= bound:
+                    stack.append(child)
+
+        found.sort(reverse=True)
+        return [(-dist, candidate) for dist, _, candidate in found]
+
+    def best(self, target, max_distance=None):
+        """
+        Choice the candidate most look like target,
+        the first added one wins if there are many.
+
+        :param target: string
+        :param max_distance: max distance of result, None means no limit
+        :return: candidate or None
+        """
+        results = self.search(target, max_distance, top_k=1)
+        return results[0][1] if results else None
+
 
 def look_like(target, candidates):
     """
     choice one of string in candidates that target is looks like
 
     :param target: string
-    :param candidates: string list
+    :param candidates: string list or a FuzzyMatcher
     :return: item in candidates
     """
+    if isinstance(candidates, FuzzyMatcher):
+        return candidates.best(target)
+
     results = [
-        (TxtDistance.edit_distance(target, i), i)
+        (TxtDistance.bit_parallel_edit_distance(target, i), i)
         for i in candidates
     ]
     result = min(*results, key=lambda x: x[0])
     return result[1]
 
 
+class KeywordsAutomaton(object):
+    """
+    Aho-Corasick automaton to find all the keywords in one pass.
+    Example:
+    >>> automaton = KeywordsAutomaton(["he", "she", "hers"])
+    >>> list(automaton.finditer("ushers"))
+    [(1, 'she'), (2, 'he'), (2, 'hers')]
+    """
+
+    def __init__(self, keywords=()):
+        """
+        :param keywords: keyword list
+        """
+        self.keywords = []
+        self.goto = [{}]
+        # keyword ends on each state, outputs merged the ones of fail links
+        self.ends = [None]
+        self.outputs = [()]
+        self.fail = [0]
+        self.built = True
+        self.add_many(keywords)
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def add(self, keyword):
+        """
+        Add a keyword, duplicated keyword would be ignored
+
+        :param keyword: non-empty string
+        :return: True if the keyword is added
+        """
+        if not keyword:
+            raise ValueError("keyword is empty")
+
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.ends.append(None)
+                self.outputs.append(())
+                self.fail.append(0)
+            state = next_state
+
+        if self.ends[state] is not None:
+            return False
+        self.keywords.append(keyword)
+        self.ends[state] = keyword
+        self.built = False
+        return True
+
+    def add_many(self, keywords):
+        """
+        Add keywords
+
+        :param keywords: keyword list
+        :return: count of added keywords
+        """
+        return sum(1 for i in keywords if self.add(i))
+
+    def build(self):
+        """
+        Build the fail links and merge the outputs, it will be called
+        automatically before searching if some keywords were added.
+        """
+        goto = self.goto
+        fail = self.fail
+        outputs = [() if i is None else (i,) for i in self.ends]
+        queue = deque()
+        for state in goto[0].values():
+            fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                if fail[next_state] == next_state:
+                    fail[next_state] = 0
+                outputs[next_state] += outputs[fail[next_state]]
+
+        self.outputs = outputs
+        self.built = True
+
+    def _scan(self, text, states, offset):
+        # states is a one item list so that the stream could resume from it
+        if not self.built:
+            self.build()
+
+        goto = self.goto
+        fail = self.fail
+        outputs = self.outputs
+        state = states[0]
+        for index, char in enumerate(text, offset + 1):
+            next_state = goto[state].get(char)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(char)
+            state = next_state or 0
+            for keyword in outputs[state]:
+                yield index - len(keyword), keyword
+        states[0] = state
+
+    def finditer(self, text):
+        """
+        Find all the keywords(overlapped included) in text.
+
+        :param text: string
+        :return: iterator of (start position, keyword) ordered by the end
+        """
+        return self._scan(text, [0], 0)
+
+    def finditer_stream(self, chunks):
+        """
+        Find all the keywords in a stream of chunks, the keywords across
+        chunks are found too.
+
+        :param chunks: iterable of string
+        :return: iterator of (start position in stream, keyword)
+        """
+        states = [0]
+        offset = 0
+        for chunk in chunks:
+            for match in self._scan(chunk, states, offset):
+                yield match
+            offset += len(chunk)
+
+    def positions(self, text):
+        """
+        Find the positions of each keywords in text.
+
+        :param text: string or iterable of string chunks
+        :return: dict of keyword and start positions
+        """
+        results = {}
+        for start, keyword in self._matches_of(text):
+            results.setdefault(keyword, []).append(start)
+        return results
+
+    def counts(self, text):
+        """
+        Count each keywords in text.
+
+        :param text: string or iterable of string chunks
+        :return: dict of keyword and count
+        """
+        results = {}
+        for _, keyword in self._matches_of(text):
+            results[keyword] = results.get(keyword, 0) + 1
+        return results
+
+    def search(self, text):
+        """
+        Find the first matched keyword in text.
+
+        :param text: string
+        :return: (start position, keyword) or None
+        """
+        for match in self.finditer(text):
+            return match
+        return None
+
+    def _matches_of(self, text):
+        if isinstance(text, (str, unicode, bytes)):
+            return self.finditer(text)
+        return self.finditer_stream(text)
+
+
 def reversed_txt(txt):
     """
     Reverse a txt
@@ -1,9 +1,12 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
+from array import array
 from itertools import groupby
 from operator import itemgetter
 
+import six
+
 
 def get_real_bases(bases):
     """
@@ -194,3 +197,54 @@ def enums(*values):
         {k: i for i, k in enumerate(values)},
         {"name": "EnumerationSet", "getitem_hook": _enums_getitem_hook}
     )
+
+
+def _uint64_typecode():
+    for typecode in ("Q", "L"):
+        try:
+            if array(typecode).itemsize == 8:
+                return typecode
+        except ValueError:
+            # "Q" is not supported before python 3.3
+            continue
+    return None
+
+
+UInt64Typecode = _uint64_typecode()
+
+
+def uint64_array(values=()):
+    """
+    Create an array of unsigned 64 bits integers, the typecode is "Q",
+    or "L" when it is 8 bytes on python 2.
+
+    :param values: initial values
+    """
+    if UInt64Typecode is None:
+        raise NotImplementedError("unsigned 64 bits array is not supported")
+    return array(UInt64Typecode, values)
+
+
+def array_frombytes(arr, data):
+    """
+    Append items from bytes to array, same as array.frombytes.
+
+    :param arr: array
+    :param data: bytes
+    """
+    if six.PY2:
+        arr.fromstring(bytes(data))
+    else:
+        arr.frombytes(data)
+    return arr
+
+
+def array_tobytes(arr):
+    """
+    Convert array to bytes, same as array.tobytes.
+
+    :param arr: array
+    """
+    if six.PY2:
+        return arr.tostring()
+    return arr.tobytes()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+Bulk hamming distances over fixed-width(at most 64 bits) fingerprints,
+such as simhash, in numpy uint64 arrays.
+"""
+
+from ycyc.base.txtutils import TxtDistance
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if numpy is not None:
+    _byte_popcounts = numpy.array(
+        [bin(i).count("1") for i in range(256)], dtype=numpy.uint8,
+    )
+else:
+    _byte_popcounts = None
+
+# bytes of the temporary arrays for a pair of fingerprints: the xor in
+# uint64, the popcount in 8 uint8(or an intp) and the distance in intp
+PairBytes = 24
+PairwiseChunkBytes = 64 << 20
+
+
+def _require_numpy():
+    if numpy is None:
+        raise ValueError("numpy is not available")
+
+
+def _chunk_rows(columns, chunk_bytes):
+    return max(1, chunk_bytes // (max(1, columns) * PairBytes))
+
+
+def as_fingerprints(fingerprints):
+    """
+    Convert fingerprints into a numpy uint64 array.
+
+    :param fingerprints: integer list or array
+    """
+    _require_numpy()
+    return numpy.asarray(fingerprints, dtype=numpy.uint64)
+
+
+def popcount64(values):
+    """
+    Count the set bits of each item in an uint64 array.
+
+    :param values: uint64 array
+    :return: array of counts with the same shape
+    """
+    _require_numpy()
+    values = numpy.ascontiguousarray(values, dtype=numpy.uint64)
+    bitwise_count = getattr(numpy, "bitwise_count", None)
+    if bitwise_count is not None:
+        return bitwise_count(values).astype(numpy.intp)
+
+    counts = _byte_popcounts[values.view(numpy.uint8)]
+    return counts.reshape(values.shape + (8,)).sum(
+        axis=-1, dtype=numpy.intp,
+    )
+
+
+def hamming_distances(fingerprint, fingerprints):
+    """
+    One-vs-many hamming distances.
+
+    :param fingerprint: integer
+    :param fingerprints: integer list or uint64 array
+    :return: array of distances
+    """
+    fingerprints = as_fingerprints(fingerprints)
+    return popcount64(fingerprints ^ numpy.uint64(fingerprint))
+
+
+def pairwise_hamming_distances(left, right, chunk_bytes=PairwiseChunkBytes):
+    """
+    Many-vs-many hamming distances, rows of left are calculated in chunks
+    sized by len(right), so the temporary arrays of a chunk are about
+    chunk_bytes at most(at least one row).
+
+    :param left: integer list or uint64 array
+    :param right: integer list or uint64 array
+    :param chunk_bytes: bytes of temporary arrays in a chunk
+    :return: array of distances in shape (len(left), len(right))
+    """
+    left = as_fingerprints(left)
+    right = as_fingerprints(right)
+    distances = numpy.empty((len(left), len(right)), dtype=numpy.intp)
+    chunk_size = _chunk_rows(len(right), chunk_bytes)
+    for start in range(0, len(left), chunk_size):
+        chunk = left[start:start + chunk_size]
+        distances[start:start + len(chunk)] = popcount64(
+            chunk[:, None] ^ right[None, :],
+        )
+    return distances
+
+
+def _top_k_of_row(distances, top_k, max_distance):
+    if max_distance is not None:
+        indexes = numpy.flatnonzero(distances <= max_distance)
+    else:
+        indexes = numpy.arange(len(distances))
+
+    if top_k < len(indexes):
+        selected = numpy.argpartition(distances[indexes], top_k - 1)
+        kth = distances[indexes[selected[top_k - 1]]]
+        # keep the ties of kth distance so the former ones could win
+        indexes = indexes[distances[indexes] <= kth]
+
+    order = numpy.lexsort((indexes, distances[indexes]))[:top_k]
+    return indexes[order]
+
+
+def nearest(fingerprint, fingerprints, top_k=1, max_distance=None):
+    """
+    Find the top_k fingerprints closest to fingerprint,
+    the former one wins if distances are the same.
+    Fallback to TxtDistance.nearest_by_hamming when numpy is not available.
+
+    :param fingerprint: integer
+    :param fingerprints: integer list or uint64 array
+    :param top_k: max count of results
+    :param max_distance: max distance of results, None means no limit
+    :return: sorted list of (distance, fingerprint)
+    """
+    if numpy is None:
+        return TxtDistance.nearest_by_hamming(
+            fingerprint, fingerprints, top_k, max_distance,
+        )
+    if top_k <= 0:
+        return []
+
+    fingerprints = as_fingerprints(fingerprints)
+    distances = hamming_distances(fingerprint, fingerprints)
+    indexes = _top_k_of_row(distances, top_k, max_distance)
+    return [(int(distances[i]), int(fingerprints[i])) for i in indexes]
+
+
+def nearest_many(
+    queries, fingerprints, top_k=1, max_distance=None,
+    chunk_bytes=PairwiseChunkBytes,
+):
+    """
+    Find the top_k closest fingerprints for each of queries.
+
+    :param queries: integer list or uint64 array
+    :param fingerprints: integer list or uint64 array
+    :param top_k: max count of results for each query
+    :param max_distance: max distance of results, None means no limit
+    :param chunk_bytes: bytes of temporary arrays in a chunk of queries
+    :return: list of sorted (distance, fingerprint) lists
+    """
+    if numpy is None:
+        fingerprints = list(fingerprints)
+        return [
+            TxtDistance.nearest_by_hamming(i, fingerprints, top_k, max_distance)
+            for i in queries
+        ]
+    if top_k <= 0:
+        return [[] for _ in queries]
+
+    queries = as_fingerprints(queries)
+    fingerprints = as_fingerprints(fingerprints)
+    results = []
+    chunk_size = _chunk_rows(len(fingerprints), chunk_bytes)
+    for start in range(0, len(queries), chunk_size):
+        distances = pairwise_hamming_distances(
+            queries[start:start + chunk_size], fingerprints, chunk_bytes,
+        )
+        for row in distances:
+            indexes = _top_k_of_row(row, top_k, max_distance)
+            results.append([
+                (int(row[i]), int(fingerprints[i])) for i in indexes
+            ])
+    return results
@@ -2,7 +2,18 @@
 # encoding: utf-8
 
 import re
+import binascii
+import hashlib
 from functools import reduce
+from itertools import islice
+from collections import Counter, deque
+
+import six
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class SimHash(object):
@@ -81,6 +92,285 @@ def simhash(words, bits=128, spliter=None):
     return SimHash(((1, i) for i in words), bits).raw()
 
 
+def stable_digest(token, nbytes=8):
+    """
+    Return the digest bytes of token which is stable across processes,
+    unlike the salted builtin hash.
+
+    :param token: string or bytes token
+    :param nbytes: bytes of digest(up to 64)
+    """
+    if not isinstance(token, bytes):
+        token = six.text_type(token).encode("utf-8")
+    if nbytes <= 16:
+        return hashlib.md5(token).digest()[:nbytes]
+    if nbytes <= 64:
+        return hashlib.sha512(token).digest()[:nbytes]
+    raise ValueError("digest size error: %s" % nbytes)
+
+
+def stable_hash(token, bits=64):
+    """
+    Return the n bits hash of token which is stable across processes.
+
+    :param token: string or bytes token
+    :param bits: bits of hash(up to 512)
+    """
+    nbytes = (bits + 7) // 8
+    digest = stable_digest(token, nbytes)
+    return int(binascii.hexlify(digest), 16) >> (nbytes * 8 - bits)
+
+
+class SimHashEngine(object):
+    """
+    A batched simhash engine, tokens are hashed by stable_hash so the
+    fingerprints are deterministic across processes, and the weights
+    are accumulated by numpy bit-unpacking when numpy is available.
+    Example:
+    >>> engine = SimHashEngine(64)
+    >>> engine.fingerprints([
+    ...     [(1, "hello"), (2, "world")],
+    ...     [(1, "hello"), (1, "python")],
+    ... ])
+    """
+    CacheSize = 1 << 16
+    # temporary arrays of numpy for each bit of a token: the unpacked bit
+    # and signs in int8, the weighted sign in float64
+    TokenBitBytes = 12
+    ChunkBytes = 16 << 20
+
+    def __init__(self, bits=64, use_numpy=None):
+        """
+        :param bits: bits of fingerprint(up to 512)
+        :param use_numpy: use numpy to accumulate weights(default: auto)
+        """
+        if not 0 < bits <= 512:
+            raise ValueError("bits error: %s" % bits)
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ValueError("numpy is not available")
+        self.bits = bits
+        self.nbytes = (bits + 7) // 8
+        self.shift = self.nbytes * 8 - bits
+        self.use_numpy = use_numpy
+        self.digest_cache = {}
+
+    def digest_of(self, token):
+        """
+        Return the cached digest bytes of token.
+
+        :param token: string or bytes token
+        """
+        cache = self.digest_cache
+        digest = cache.get(token)
+        if digest is None:
+            if len(cache) >= self.CacheSize:
+                cache.clear()
+            digest = cache[token] = stable_digest(token, self.nbytes)
+        return digest
+
+    def hash_of(self, token):
+        """
+        Return the stable hash of token.
+
+        :param token: string or bytes token
+        """
+        digest = self.digest_of(token)
+        return int(binascii.hexlify(digest), 16) >> self.shift
+
+    @classmethod
+    def weights_of(cls, tokens):
+        """
+        Merge the weights of same tokens.
+
+        :param tokens: token with weight:[(weight, token), ...]
+        :return: dict of token and weight
+        """
+        weights = {}
+        get = weights.get
+        for weight, token in tokens:
+            weights[token] = get(token, 0) + weight
+        return weights
+
+    def _accumulate(self, weights, positives):
+        total = 0
+        hash_of = self.hash_of
+        for token, weight in six.iteritems(weights):
+            total += weight
+            word_hash = hash_of(token)
+            while word_hash:
+                low_bit = word_hash & -word_hash
+                positives[low_bit.bit_length() - 1] += weight
+                word_hash ^= low_bit
+        return total
+
+    def _fingerprint_of_positives(self, positives, total):
+        fingerprint = 0
+        for i, positive in enumerate(positives):
+            if positive * 2 > total:
+                fingerprint |= 1 << i
+        return fingerprint
+
+    def _fingerprint_of_weights(self, weights):
+        positives = [0] * self.bits
+        total = self._accumulate(weights, positives)
+        return self._fingerprint_of_positives(positives, total)
+
+    def _numpy_vectors(self, documents):
+        """
+        Return the weight vectors of the non-empty documents,
+        column 0 is the highest bit.
+        Tokens are unpacked in chunks so the temporary arrays are about
+        ChunkBytes, the tokens of a document could span chunks.
+        """
+        documents = [i for i in documents if i]
+        vectors = numpy.zeros((len(documents), self.bits))
+        chunk_size = max(1, self.ChunkBytes // (self.bits * self.TokenBitBytes))
+        digest_of = self.digest_of
+        digests = []
+        weights = []
+        rows = []
+        for row, doc_weights in enumerate(documents):
+            for token, weight in six.iteritems(doc_weights):
+                digests.append(digest_of(token))
+                weights.append(weight)
+                rows.append(row)
+                if len(digests) >= chunk_size:
+                    self._add_numpy_chunk(vectors, digests, weights, rows)
+                    digests = []
+                    weights = []
+                    rows = []
+        if digests:
+            self._add_numpy_chunk(vectors, digests, weights, rows)
+        return vectors
+
+    def _add_numpy_chunk(self, vectors, digests, weights, rows):
+        bit_matrix = numpy.unpackbits(
+            numpy.frombuffer(b"".join(digests), dtype=numpy.uint8).reshape(
+                len(digests), self.nbytes,
+            ),
+            axis=1,
+        )[:, :self.bits]
+        signs = bit_matrix.astype(numpy.int8) * 2 - 1
+        rows = numpy.asarray(rows, dtype=numpy.intp)
+        # rows are ascending, reduce the tokens of each row at once
+        starts = numpy.flatnonzero(numpy.r_[True, rows[1:] != rows[:-1]])
+        vectors[rows[starts]] += numpy.add.reduceat(
+            signs * numpy.asarray(weights, dtype=numpy.float64)[:, None],
+            starts,
+            axis=0,
+        )
+
+    def _fingerprint_of_vector(self, vector):
+        packed = numpy.packbits(vector > 0).tobytes()
+        return int(binascii.hexlify(packed), 16) >> self.shift
+
+    def _numpy_fingerprints(self, documents):
+        fingerprints = [0] * len(documents)
+        vectors = iter(self._numpy_vectors(documents))
+        for i, doc_weights in enumerate(documents):
+            if doc_weights:
+                fingerprints[i] = self._fingerprint_of_vector(next(vectors))
+        return fingerprints
+
+    def fingerprint(self, tokens):
+        """
+        Return the fingerprint of a document.
+
+        :param tokens: token with weight:[(weight, token), ...]
+        """
+        return self.fingerprints([tokens])[0]
+
+    def fingerprints(self, documents):
+        """
+        Return the fingerprints of documents in one call.
+
+        :param documents: iterable of tokens with weight
+        """
+        documents = [self.weights_of(i) for i in documents]
+        if self.use_numpy:
+            return self._numpy_fingerprints(documents)
+        return [self._fingerprint_of_weights(i) for i in documents]
+
+    def accumulator(self):
+        """
+        Return a SimHashAccumulator to fingerprint a document incrementally.
+        """
+        return SimHashAccumulator(self)
+
+    def fingerprint_stream(self, tokens, batch_size=65536):
+        """
+        Return the fingerprint of a huge document, tokens are consumed in
+        batches so only one batch is kept in memory.
+
+        :param tokens: iterable of tokens with weight
+        :param batch_size: tokens of each batch
+        """
+        accumulator = self.accumulator()
+        tokens = iter(tokens)
+        batch = list(islice(tokens, batch_size))
+        while batch:
+            accumulator.update(batch)
+            batch = list(islice(tokens, batch_size))
+        return accumulator.fingerprint()
+
+
+class SimHashAccumulator(object):
+    """
+    Accumulate the weights of tokens for a SimHashEngine, the weights of
+    a token are linear so updating by batches is as same as hashing the
+    whole document at once.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.total = 0
+        if engine.use_numpy:
+            self.vector = numpy.zeros(engine.bits)
+        else:
+            self.vector = [0] * engine.bits
+
+    def update(self, tokens):
+        """
+        Add tokens to the document.
+
+        :param tokens: token with weight:[(weight, token), ...]
+        """
+        engine = self.engine
+        weights = engine.weights_of(tokens)
+        if not weights:
+            return
+        if engine.use_numpy:
+            self.vector += engine._numpy_vectors([weights])[0]
+        else:
+            self.total += engine._accumulate(weights, self.vector)
+
+    def fingerprint(self):
+        """
+        Return the fingerprint of the tokens added so far.
+        """
+        if self.engine.use_numpy:
+            return self.engine._fingerprint_of_vector(self.vector)
+        return self.engine._fingerprint_of_positives(self.vector, self.total)
+
+
+def simhash_many(documents, bits=64, spliter=None):
+    """
+    Return stable simhash fingerprints of documents which weight all
+    is 1 of each item.
+
+    :param documents: iterable of string words
+    :param bits: bits of simhash
+    :param spliter: spliter to split words
+    """
+    if spliter is not None:
+        documents = (spliter(i) for i in documents)
+    return SimHashEngine(bits).fingerprints(
+        ((1, i) for i in words) for words in documents
+    )
+
+
 class Spliter(object):
     @classmethod
     def by_space(cls, words):
@@ -108,3 +398,102 @@ class Spliter(object):
                 end += step
 
         return wrapper
+
+    ChunkSize = 1 << 16
+    WordPattern = re.compile(r"\w+", re.UNICODE)
+
+    @classmethod
+    def iter_chunks(cls, source, chunk_size=ChunkSize):
+        """
+        Iterate a string or a file-like object chunk by chunk.
+
+        :param source: string or object with read method
+        :param chunk_size: chars of each chunk
+        """
+        read = getattr(source, "read", None)
+        if read is None:
+            for start in range(0, len(source), chunk_size):
+                yield source[start:start + chunk_size]
+            return
+
+        chunk = read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = read(chunk_size)
+
+    @classmethod
+    def char_shingles(cls, k, chunk_size=ChunkSize):
+        """
+        Return a streaming spliter of k chars shingles.
+
+        :param k: chars of each shingle
+        :param chunk_size: chars of each chunk to read
+        """
+        def wrapper(source):
+            tail = None
+            for chunk in cls.iter_chunks(source, chunk_size):
+                text = chunk if tail is None else tail + chunk
+                for start in range(len(text) - k + 1):
+                    yield text[start:start + k]
+                tail = text[max(len(text) - k + 1, 0):]
+
+        return wrapper
+
+    @classmethod
+    def iter_words(cls, source, chunk_size=ChunkSize):
+        """
+        Iterate the words of a string or a file-like object,
+        words across chunks are joined.
+
+        :param source: string or object with read method
+        :param chunk_size: chars of each chunk to read
+        """
+        finditer = cls.WordPattern.finditer
+        partial = None
+        for chunk in cls.iter_chunks(source, chunk_size):
+            if partial:
+                chunk = partial + chunk
+            partial = None
+            chunk_len = len(chunk)
+            for match in finditer(chunk):
+                if match.end() == chunk_len:
+                    partial = match.group()
+                else:
+                    yield match.group()
+        if partial:
+            yield partial
+
+    @classmethod
+    def word_shingles(cls, k, sep=" ", chunk_size=ChunkSize):
+        """
+        Return a streaming spliter of k words shingles.
+
+        :param k: words of each shingle
+        :param sep: separator to join words
+        :param chunk_size: chars of each chunk to read
+        """
+        def wrapper(source):
+            window = deque(maxlen=k)
+            for word in cls.iter_words(source, chunk_size):
+                window.append(word)
+                if len(window) == k:
+                    yield sep.join(window)
+
+        return wrapper
+
+    @classmethod
+    def weighted(cls, tokens, batch_size=65536):
+        """
+        Count the tokens in batches and yield tokens with TF weight,
+        feed it to SimHashEngine.fingerprint_stream to fingerprint
+        a huge document in bounded memory.
+
+        :param tokens: iterable tokens
+        :param batch_size: tokens of each batch
+        """
+        tokens = iter(tokens)
+        batch = Counter(islice(tokens, batch_size))
+        while batch:
+            for token, count in six.iteritems(batch):
+                yield count, token
+            batch = Counter(islice(tokens, batch_size))
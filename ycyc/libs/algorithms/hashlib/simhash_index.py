@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import binascii
+import struct
+import sys
+
+from ycyc.base.filetools import AtomicFileWriter
+from ycyc.base.typeutils import array_frombytes, array_tobytes, uint64_array
+from ycyc.base.txtutils import bit_count as popcount
+
+
+class SimHashIndex(object):
+    """
+    A near-duplicate index of simhash fingerprints in Manku's style:
+    fingerprints are split into max_distance + 1 blocks, and each block
+    is the prefix of a permuted table, so any fingerprint within the
+    hamming distance must share at least one prefix with the query.
+    Each table is a dict of prefix and fingerprints bucket, queries only
+    check the fingerprints in the matched buckets.
+    Example:
+    >>> index = SimHashIndex(fingerprints, bits=64, max_distance=3)
+    >>> index.query(fingerprint)
+    [(0, fingerprint), (2, similar_fingerprint)]
+    """
+    FileMagic = b"YCSI"
+    FileHeader = struct.Struct("<4sHHQ")
+
+    def __init__(self, fingerprints=(), bits=64, max_distance=3):
+        """
+        :param fingerprints: initial fingerprints
+        :param bits: bits of fingerprint
+        :param max_distance: max hamming distance of queries
+        """
+        if not 0 <= max_distance < bits:
+            raise ValueError("max distance error: %s" % max_distance)
+        self.bits = bits
+        self.max_distance = max_distance
+        self.blocks = self.split_blocks(bits, max_distance + 1)
+        self.tables = [{} for _ in self.blocks]
+        self.fingerprints = set()
+        self.add_many(fingerprints)
+
+    @classmethod
+    def split_blocks(cls, bits, num):
+        """
+        Split bits into num blocks, return the (shift, mask) of blocks.
+
+        :param bits: bits of fingerprint
+        :param num: number of blocks
+        """
+        size, remains = divmod(bits, num)
+        blocks = []
+        shift = 0
+        for i in range(num):
+            width = size + (1 if i < remains else 0)
+            blocks.append((shift, (1 << width) - 1))
+            shift += width
+        return blocks
+
+    def prefixes_of(self, fingerprint):
+        """
+        Return the table prefixes of fingerprint.
+
+        :param fingerprint: int fingerprint
+        """
+        return [(fingerprint >> s) & m for s, m in self.blocks]
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.fingerprints
+
+    def __iter__(self):
+        return iter(self.fingerprints)
+
+    def add(self, fingerprint):
+        """
+        Add a fingerprint.
+
+        :param fingerprint: int fingerprint
+        """
+        if fingerprint in self.fingerprints:
+            return
+        if not 0 <= fingerprint >> self.bits < 1:
+            raise ValueError("fingerprint error: %s" % fingerprint)
+        self.fingerprints.add(fingerprint)
+        for table, prefix in zip(self.tables, self.prefixes_of(fingerprint)):
+            bucket = table.get(prefix)
+            if bucket is None:
+                table[prefix] = [fingerprint]
+            else:
+                bucket.append(fingerprint)
+
+    def add_many(self, fingerprints):
+        """
+        Add fingerprints in bulk.
+
+        :param fingerprints: int fingerprints
+        """
+        add = self.add
+        for fingerprint in fingerprints:
+            add(fingerprint)
+
+    def remove(self, fingerprint):
+        """
+        Remove a fingerprint, raise KeyError if it is not in index.
+
+        :param fingerprint: int fingerprint
+        """
+        self.fingerprints.remove(fingerprint)
+        for table, prefix in zip(self.tables, self.prefixes_of(fingerprint)):
+            bucket = table[prefix]
+            bucket.remove(fingerprint)
+            if not bucket:
+                del table[prefix]
+
+    def remove_many(self, fingerprints):
+        """
+        Remove fingerprints in bulk, missing fingerprints are ignored.
+
+        :param fingerprints: int fingerprints
+        """
+        existed = self.fingerprints
+        for fingerprint in fingerprints:
+            if fingerprint in existed:
+                self.remove(fingerprint)
+
+    def query(self, fingerprint, distance=None):
+        """
+        Return all fingerprints within the hamming distance,
+        sorted by distance.
+
+        :param fingerprint: int fingerprint
+        :param distance: max hamming distance(default: max_distance)
+        :return: [(distance, fingerprint), ...]
+        """
+        if distance is None:
+            distance = self.max_distance
+        elif distance > self.max_distance:
+            raise ValueError("distance error: %s" % distance)
+
+        checked = set()
+        results = []
+        for table, prefix in zip(self.tables, self.prefixes_of(fingerprint)):
+            for candidate in table.get(prefix, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                candidate_distance = popcount(candidate ^ fingerprint)
+                if candidate_distance <= distance:
+                    results.append((candidate_distance, candidate))
+        results.sort()
+        return results
+
+    def _dumps_fingerprints(self):
+        if self.bits <= 64:
+            fingerprints = uint64_array(sorted(self.fingerprints))
+            if sys.byteorder != "little":
+                fingerprints.byteswap()
+            return array_tobytes(fingerprints)
+
+        template = "%%0%dx" % ((self.bits + 7) // 8 * 2)
+        return binascii.unhexlify("".join(
+            template % i for i in sorted(self.fingerprints)
+        ))
+
+    @classmethod
+    def _loads_fingerprints(cls, data, bits):
+        if bits <= 64:
+            fingerprints = array_frombytes(uint64_array(), data)
+            if sys.byteorder != "little":
+                fingerprints.byteswap()
+            return fingerprints
+
+        nbytes = (bits + 7) // 8
+        return (
+            int(binascii.hexlify(data[i:i + nbytes]), 16)
+            for i in range(0, len(data), nbytes)
+        )
+
+    def save(self, path):
+        """
+        Save fingerprints to a compact binary file.
+
+        :param path: file path string
+        """
+        with AtomicFileWriter(path, binary=True) as writer:
+            writer.write(self.FileHeader.pack(
+                self.FileMagic, self.bits, self.max_distance,
+                len(self.fingerprints),
+            ))
+            writer.write(self._dumps_fingerprints())
+
+    @classmethod
+    def load(cls, path, max_distance=None):
+        """
+        Load a index from file saved by save.
+
+        :param path: file path string
+        :param max_distance: rebuild tables with a new max_distance
+        """
+        with open(path, "rb") as fp:
+            header = fp.read(cls.FileHeader.size)
+            data = fp.read()
+        if len(header) != cls.FileHeader.size:
+            raise ValueError("index file error: %s" % path)
+        magic, bits, saved_distance, count = cls.FileHeader.unpack(header)
+        if magic != cls.FileMagic or len(data) != count * (
+            8 if bits <= 64 else (bits + 7) // 8
+        ):
+            raise ValueError("index file error: %s" % path)
+        return cls(
+            cls._loads_fingerprints(data, bits), bits,
+            saved_distance if max_distance is None else max_distance,
+        )
@@ -1,7 +1,21 @@
+from array import array
 from collections import deque
 from itertools import repeat
+from multiprocessing import Pool
+from multiprocessing.sharedctypes import RawArray
+from operator import add, sub, mul
+import ctypes
 import os
 
+import six
+
+from ycyc.base.typeutils import array_frombytes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class Matrix(object):
 
@@ -78,6 +92,14 @@ class Matrix(object):
     def __iter__(self):
         return iter(self.data)
 
+    def iter_items(self):
+        """
+        Iterate the (row, column, value) of elements.
+        """
+        for i, row in enumerate(self):
+            for j, val in enumerate(row):
+                yield i, j, val
+
     def __getitem__(self, idx):
         if isinstance(idx, (tuple, list)):
             row_n, col_n = idx
@@ -118,6 +140,9 @@ class Matrix(object):
         )
 
     def __eq__(self, other):
+        if not isinstance(other, Matrix):
+            # let the other types, such as SparseMatrix, compare
+            return NotImplemented
         if self.row_n != other.row_n or self.col_n != other.col_n:
             return False
 
@@ -197,3 +222,570 @@ class Matrix(object):
             for j in range(self.col_n):
                 matrix[j, i] = self[i, j]
         return matrix
+
+
+class ArraySliceView(object):
+    """
+    A writable view of an array slice, rows and columns are returned as
+    it on python 2, whose memoryview does not support array.
+    """
+
+    def __init__(self, data, start, stop, step=1):
+        self.data = data
+        self.indexes = range(start, stop, step)
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __iter__(self):
+        data = self.data
+        return (data[i] for i in self.indexes)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            data = self.data
+            return [data[i] for i in self.indexes[idx]]
+        return self.data[self.indexes[idx]]
+
+    def __setitem__(self, idx, val):
+        self.data[self.indexes[idx]] = val
+
+    def tolist(self):
+        return list(self)
+
+
+class DenseMatrix(Matrix):
+    """
+    A Matrix stored in a flat row-major array('d'), rows and columns
+    are zero-copy memoryviews of the storage, and the operations run
+    on numpy arrays sharing the storage when numpy is available.
+    """
+    use_numpy = numpy is not None
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """
+        Return a DenseMatrix copied from matrix.
+
+        :param matrix: Matrix, DenseMatrix or SparseMatrix
+        """
+        if isinstance(matrix, DenseMatrix):
+            return cls.from_array(matrix.row_n, matrix.col_n, matrix.data)
+        dense = cls(matrix.row_n, matrix.col_n)
+        data = dense.data
+        col_n = dense.col_n
+        for r, c, val in matrix.iter_items():
+            data[r * col_n + c] = val
+        return dense
+
+    @classmethod
+    def from_array(cls, row_n, col_n, data, init_val=0):
+        """
+        Return a DenseMatrix whose storage is a copy of data.
+
+        :param row_n: rows number
+        :param col_n: columns number
+        :param data: row-major array('d') or iterable of numbers
+        """
+        matrix = cls.__new__(cls)
+        matrix.init_val = init_val
+        matrix.row_n = int(row_n)
+        matrix.col_n = int(col_n)
+        matrix.data = array("d", data)
+        if len(matrix.data) != matrix.row_n * matrix.col_n:
+            raise ValueError("matrix size error: [%d, %d]" % (
+                matrix.row_n, matrix.col_n,
+            ))
+        matrix.make_sure_matrix_size()
+        return matrix
+
+    @classmethod
+    def from_numpy(cls, ndarray):
+        """
+        Return a DenseMatrix from a 2-d numpy array.
+
+        :param ndarray: numpy array
+        """
+        row_n, col_n = ndarray.shape
+        data = array_frombytes(array("d"), numpy.ascontiguousarray(
+            ndarray, dtype=numpy.float64,
+        ).tobytes())
+        return cls.from_array(row_n, col_n, data)
+
+    def __init__(self, row_n, col_n, matrix=None, init_val=0):
+        self.init_val = init_val
+        self.row_n = int(row_n)
+        self.col_n = int(col_n)
+        self.data = array("d", repeat(init_val, self.row_n * self.col_n))
+        self.make_sure_matrix_size()
+
+        if matrix:
+            data = self.data
+            col_n = self.col_n
+            for r, row in zip(range(self.row_n), matrix):
+                start = r * col_n
+                for c, val in zip(range(col_n), row):
+                    data[start + c] = val
+
+    def make_sure_matrix_size(self):
+        self.check_size(
+            self,
+            lambda x: x > 0,
+            lambda x: x > 0,
+        )
+
+    def as_numpy(self):
+        """
+        Return a numpy array which shares the storage.
+        """
+        return numpy.frombuffer(self.data, dtype=numpy.float64).reshape(
+            self.row_n, self.col_n,
+        )
+
+    def row(self, idx):
+        """
+        Return a zero-copy view of a row.
+
+        :param idx: row index
+        """
+        if idx < 0:
+            idx += self.row_n
+        if not 0 <= idx < self.row_n:
+            raise IndexError("index error: %s" % idx)
+        start = idx * self.col_n
+        if six.PY2:
+            return ArraySliceView(self.data, start, start + self.col_n)
+        return memoryview(self.data)[start:start + self.col_n]
+
+    def col(self, idx):
+        """
+        Return a zero-copy view of a column.
+
+        :param idx: column index
+        """
+        if idx < 0:
+            idx += self.col_n
+        if not 0 <= idx < self.col_n:
+            raise IndexError("index error: %s" % idx)
+        if six.PY2:
+            return ArraySliceView(self.data, idx, len(self.data), self.col_n)
+        return memoryview(self.data)[idx::self.col_n]
+
+    def visit_with(self, callback):
+        col_n = self.col_n
+        for i, val in enumerate(self.data):
+            callback(i // col_n, i % col_n, val)
+
+    def __iter__(self):
+        return (self.row(i) for i in range(self.row_n))
+
+    def offset_of(self, idx):
+        """
+        Return the offset of a [row, col] index in data,
+        negative indexes are counted from the end.
+
+        :param idx: (row index, column index)
+        """
+        row_n, col_n = idx
+        if row_n < 0:
+            row_n += self.row_n
+        if col_n < 0:
+            col_n += self.col_n
+        if not (0 <= row_n < self.row_n and 0 <= col_n < self.col_n):
+            raise IndexError("index error: [%s, %s]" % tuple(idx))
+        return row_n * self.col_n + col_n
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (tuple, list)):
+            return self.data[self.offset_of(idx)]
+        return self.row(idx)
+
+    def __setitem__(self, idx, val):
+        if not isinstance(idx, (tuple, list)):
+            raise ValueError("index type error: %s" % idx)
+
+        self.data[self.offset_of(idx)] = val
+
+    def __eq__(self, other):
+        if isinstance(other, DenseMatrix):
+            return (
+                self.row_n == other.row_n and
+                self.col_n == other.col_n and
+                self.data == other.data
+            )
+        return super(DenseMatrix, self).__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def _dense_of(self, other):
+        if isinstance(other, DenseMatrix):
+            return other
+        return DenseMatrix.from_matrix(other)
+
+    def _elementwise(self, other, operator):
+        self.check_size(
+            other,
+            lambda x: self.row_n == x,
+            lambda x: self.col_n == x,
+        )
+        other = self._dense_of(other)
+        if self.use_numpy:
+            return self.from_numpy(operator(self.as_numpy(), other.as_numpy()))
+        return self.from_array(
+            self.row_n, self.col_n, map(operator, self.data, other.data),
+        )
+
+    def __add__(self, other):
+        return self._elementwise(other, add)
+
+    def __sub__(self, other):
+        return self._elementwise(other, sub)
+
+    def __mul__(self, other):
+        self.check_size(
+            other,
+            lambda x: self.col_n == x,
+        )
+        other = self._dense_of(other)
+        if self.use_numpy:
+            return self.from_numpy(numpy.dot(self.as_numpy(), other.as_numpy()))
+
+        data = self.data
+        col_n = self.col_n
+        other_cols = [other.data[j::other.col_n] for j in range(other.col_n)]
+        result = array("d")
+        for i in range(0, self.row_n * col_n, col_n):
+            row = data[i:i + col_n]
+            result.extend(sum(map(mul, row, c)) for c in other_cols)
+        return self.from_array(self.row_n, other.col_n, result)
+
+    def __rmul__(self, other):
+        if isinstance(other, Matrix):
+            # Matrix * DenseMatrix, the subclass is asked first
+            return self._dense_of(other) * self
+        if self.use_numpy:
+            return self.from_numpy(other * self.as_numpy())
+        return self.from_array(
+            self.row_n, self.col_n, (other * i for i in self.data),
+        )
+
+    def multiply(self, other, block_size=None, processes=None):
+        """
+        Return self * other, multiply by tiles in a process pool
+        when block_size is given.
+
+        :param other: matrix
+        :param block_size: rows and columns of each tile
+        :param processes: process pool size(default: cpu count)
+        """
+        if block_size is None:
+            return self * other
+        return blocked_multiply(self, other, block_size, processes)
+
+    def lu_decompose(self):
+        """
+        Return the LUDecomposition of this square matrix.
+        """
+        return LUDecomposition(self)
+
+    def solve(self, rhs):
+        """
+        Solve self * x = rhs.
+
+        :param rhs: vector or matrix of right hand sides
+        """
+        return self.lu_decompose().solve(rhs)
+
+    def det(self):
+        """
+        Return the determinant.
+        """
+        return self.lu_decompose().det()
+
+    def inverse(self):
+        """
+        Return the inverse matrix.
+        """
+        return self.lu_decompose().inverse()
+
+    def transpose_matrix(self):
+        if self.use_numpy:
+            return self.from_numpy(self.as_numpy().T)
+
+        data = self.data
+        col_n = self.col_n
+        result = array("d")
+        for j in range(col_n):
+            result.extend(data[j::col_n])
+        return self.from_array(col_n, self.row_n, result)
+
+
+class LUDecomposition(object):
+    """
+    LU decomposition with partial pivoting, P * A = L * U.
+    L (without its unit diagonal) and U are stored together in one
+    row-major array('d'), so the O(n^3) factorization is reused to
+    solve any number of right hand sides in O(n^2) each.
+    Example:
+    >>> lu = DenseMatrix.from_table([[4, 3], [6, 3]]).lu_decompose()
+    >>> lu.solve([10, 12])
+    [1.0, 2.0]
+    >>> lu.det()
+    -6.0
+    """
+    Epsilon = 2.220446049250313e-16
+
+    def __init__(self, matrix):
+        """
+        :param matrix: square Matrix or DenseMatrix
+        """
+        matrix.check_size(matrix, col_checker=lambda x: matrix.row_n == x)
+        if not isinstance(matrix, DenseMatrix):
+            matrix = DenseMatrix.from_matrix(matrix)
+        self.n = n = matrix.row_n
+        self.use_numpy = matrix.use_numpy
+        self.perm = list(range(n))
+        self.sign = 1
+        self.singular = False
+        tolerance = n * self.Epsilon * max(abs(i) for i in matrix.data)
+
+        if self.use_numpy:
+            lu = matrix.as_numpy().copy()
+            for k in range(n):
+                pivot_row = k + int(numpy.argmax(numpy.abs(lu[k:, k])))
+                self._swap(lu, k, pivot_row)
+                pivot = lu[k, k]
+                if abs(pivot) <= tolerance:
+                    self.singular = True
+                    continue
+                lu[k + 1:, k] /= pivot
+                lu[k + 1:, k + 1:] -= numpy.outer(lu[k + 1:, k], lu[k, k + 1:])
+            self.lu = array_frombytes(array("d"), lu.tobytes())
+            return
+
+        data = matrix.data
+        rows = [data[i * n:(i + 1) * n].tolist() for i in range(n)]
+        for k in range(n):
+            pivot_row = max(range(k, n), key=lambda i: abs(rows[i][k]))
+            self._swap(rows, k, pivot_row)
+            pivot_values = rows[k]
+            pivot = pivot_values[k]
+            if abs(pivot) <= tolerance:
+                self.singular = True
+                continue
+            pivot_tail = pivot_values[k + 1:]
+            for row in rows[k + 1:]:
+                factor = row[k] / pivot
+                row[k] = factor
+                if factor:
+                    row[k + 1:] = map(
+                        sub, row[k + 1:], [factor * x for x in pivot_tail],
+                    )
+        self.lu = array("d", (x for row in rows for x in row))
+
+    def _swap(self, rows, i, j):
+        if i == j:
+            return
+        if self.use_numpy:
+            rows[[i, j]] = rows[[j, i]]
+        else:
+            rows[i], rows[j] = rows[j], rows[i]
+        self.perm[i], self.perm[j] = self.perm[j], self.perm[i]
+        self.sign = -self.sign
+
+    def det(self):
+        """
+        Return the determinant.
+        """
+        if self.singular:
+            return 0.0
+        n = self.n
+        result = float(self.sign)
+        for i in range(n):
+            result *= self.lu[i * n + i]
+        return result
+
+    def _solve_vector(self, vector):
+        n = self.n
+        lu = self.lu
+        values = [float(vector[i]) for i in self.perm]
+        for i in range(n):
+            start = i * n
+            values[i] -= sum(map(mul, lu[start:start + i], values[:i]))
+        for i in range(n - 1, -1, -1):
+            start = i * n
+            values[i] = (
+                values[i] - sum(map(
+                    mul, lu[start + i + 1:start + n], values[i + 1:],
+                ))
+            ) / lu[start + i]
+        return values
+
+    def _numpy_solve(self, rhs):
+        n = self.n
+        lu = numpy.frombuffer(self.lu).reshape(n, n)
+        values = rhs[self.perm].astype(numpy.float64)
+        for i in range(1, n):
+            values[i] -= numpy.dot(lu[i, :i], values[:i])
+        for i in range(n - 1, -1, -1):
+            values[i] -= numpy.dot(lu[i, i + 1:], values[i + 1:])
+            values[i] /= lu[i, i]
+        return values
+
+    def solve(self, rhs):
+        """
+        Solve A * x = rhs.
+
+        :param rhs: vector(list of numbers) or n rows matrix
+        :return: list for vector, DenseMatrix for matrix
+        """
+        if self.singular:
+            raise ValueError("matrix is singular")
+
+        if not isinstance(rhs, Matrix):
+            if len(rhs) != self.n:
+                raise ValueError("vector size error: %d" % len(rhs))
+            if self.use_numpy:
+                return self._numpy_solve(numpy.asarray(rhs)).tolist()
+            return self._solve_vector(rhs)
+
+        Matrix.check_size(rhs, lambda x: self.n == x)
+        if not isinstance(rhs, DenseMatrix):
+            rhs = DenseMatrix.from_matrix(rhs)
+        if self.use_numpy:
+            return DenseMatrix.from_numpy(self._numpy_solve(rhs.as_numpy()))
+
+        result = DenseMatrix(self.n, rhs.col_n)
+        for j in range(rhs.col_n):
+            for i, val in enumerate(self._solve_vector(rhs.col(j))):
+                result[i, j] = val
+        return result
+
+    def inverse(self):
+        """
+        Return the inverse matrix.
+        """
+        identity = DenseMatrix(self.n, self.n)
+        for i in range(self.n):
+            identity[i, i] = 1
+        return self.solve(identity)
+
+
+_block_operands = {}
+
+
+def _init_block_worker(left, right, output, shape, use_numpy):
+    _block_operands.update(
+        left=left, right=right, output=output, shape=shape,
+        use_numpy=use_numpy,
+    )
+
+
+def _shared_view(raw):
+    if six.PY2:
+        # memoryview.cast is not available, ctypes array is indexed directly
+        return raw
+    return memoryview(raw).cast("B").cast("d")
+
+
+def _multiply_block(tile):
+    row_start, row_end, col_start, col_end = tile
+    row_n, inner_n, col_n, block_size = _block_operands["shape"]
+
+    if _block_operands["use_numpy"]:
+        left = numpy.frombuffer(_block_operands["left"]).reshape(
+            row_n, inner_n,
+        )
+        right = numpy.frombuffer(_block_operands["right"]).reshape(
+            inner_n, col_n,
+        )
+        output = numpy.frombuffer(_block_operands["output"]).reshape(
+            row_n, col_n,
+        )
+        result = numpy.zeros((row_end - row_start, col_end - col_start))
+        for k in range(0, inner_n, block_size):
+            result += numpy.dot(
+                left[row_start:row_end, k:k + block_size],
+                right[k:k + block_size, col_start:col_end],
+            )
+        output[row_start:row_end, col_start:col_end] = result
+        return tile
+
+    left = _shared_view(_block_operands["left"])
+    right = _shared_view(_block_operands["right"])
+    output = _shared_view(_block_operands["output"])
+    width = col_end - col_start
+    for k_start in range(0, inner_n, block_size):
+        k_end = min(k_start + block_size, inner_n)
+        right_rows = [
+            list(right[k * col_n + col_start: k * col_n + col_end])
+            for k in range(k_start, k_end)
+        ]
+        for i in range(row_start, row_end):
+            out_start = i * col_n + col_start
+            result = list(output[out_start:out_start + width])
+            left_row = left[i * inner_n + k_start: i * inner_n + k_end]
+            for val, right_row in zip(left_row, right_rows):
+                if val:
+                    result = list(map(add, result, [val * x for x in right_row]))
+            output[out_start:out_start + width] = array("d", result)
+    return tile
+
+
+def _shared_copy(data):
+    raw = RawArray(ctypes.c_double, len(data))
+    address, length = data.buffer_info()
+    ctypes.memmove(raw, address, length * data.itemsize)
+    return raw
+
+
+def blocked_multiply(left, right, block_size=64, processes=None):
+    """
+    Multiply matrices by tiles, the tiles of result are computed over
+    a process pool and the operands are shared with workers by shared
+    memory buffers instead of pickling.
+
+    :param left: left matrix
+    :param right: right matrix
+    :param block_size: rows and columns of each tile
+    :param processes: process pool size, 1 to compute in this process
+    :return: DenseMatrix
+    """
+    left.check_size(right, lambda x: left.col_n == x)
+    if not isinstance(left, DenseMatrix):
+        left = DenseMatrix.from_matrix(left)
+    if not isinstance(right, DenseMatrix):
+        right = DenseMatrix.from_matrix(right)
+
+    row_n, inner_n, col_n = left.row_n, left.col_n, right.col_n
+    output = RawArray(ctypes.c_double, row_n * col_n)
+    initargs = (
+        _shared_copy(left.data), _shared_copy(right.data), output,
+        (row_n, inner_n, col_n, block_size), DenseMatrix.use_numpy,
+    )
+    tiles = [
+        (i, min(i + block_size, row_n), j, min(j + block_size, col_n))
+        for i in range(0, row_n, block_size)
+        for j in range(0, col_n, block_size)
+    ]
+
+    if processes == 1:
+        _init_block_worker(*initargs)
+        try:
+            for tile in tiles:
+                _multiply_block(tile)
+        finally:
+            _block_operands.clear()
+    else:
+        pool = Pool(processes, _init_block_worker, initargs)
+        try:
+            for _ in pool.imap_unordered(_multiply_block, tiles):
+                pass
+        finally:
+            pool.close()
+            pool.join()
+
+    data = array("d", repeat(0, len(output)))
+    ctypes.memmove(data.buffer_info()[0], output, ctypes.sizeof(output))
+    return DenseMatrix.from_array(row_n, col_n, data)
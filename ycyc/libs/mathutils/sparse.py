@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+
+from ycyc.libs.mathutils.matrix import Matrix, DenseMatrix
+from ycyc.ycollections.table import SparseTable
+
+
+class SparseMatrix(object):
+    """
+    A sparse matrix in CSR storage: the column indices and values of
+    non-zero elements are stored row by row, and indptr[i] is the
+    offset of row i, so the memory scales with non-zeros.
+    Example:
+    >>> m = SparseMatrix.from_coo(3, 3, [(0, 0, 1), (2, 1, 5)])
+    >>> (m * m.transpose_matrix()).to_matrix()
+    """
+
+    @classmethod
+    def from_coo(cls, row_n, col_n, entries):
+        """
+        Build a SparseMatrix from COO entries, values of duplicated
+        entries are summed up and zeros are dropped.
+
+        :param row_n: rows number
+        :param col_n: columns number
+        :param entries: iterable of (row, col, value)
+        """
+        rows = {}
+        for r, c, val in entries:
+            if not (0 <= r < row_n and 0 <= c < col_n):
+                raise IndexError("index error: [%s, %s]" % (r, c))
+            row = rows.get(r)
+            if row is None:
+                row = rows[r] = {}
+            row[c] = row.get(c, 0) + val
+
+        indptr = array("l", [0])
+        indices = array("l")
+        values = array("d")
+        for r in range(row_n):
+            row = rows.get(r)
+            if row:
+                for c in sorted(row):
+                    val = row[c]
+                    if val != 0:
+                        indices.append(c)
+                        values.append(val)
+            indptr.append(len(indices))
+        return cls(row_n, col_n, indptr, indices, values)
+
+    @classmethod
+    def from_table(cls, table):
+        """
+        Build a SparseMatrix from a table like Matrix.from_table.
+
+        :param table: iterable rows
+        """
+        row_n = 0
+        col_n = 0
+        entries = []
+        for r, row in enumerate(table):
+            row_n = r + 1
+            for c, val in enumerate(row):
+                if col_n <= c:
+                    col_n = c + 1
+                if val != 0:
+                    entries.append((r, c, val))
+        return cls.from_coo(row_n, col_n, entries)
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """
+        Build a SparseMatrix from a Matrix or DenseMatrix.
+
+        :param matrix: Matrix
+        """
+        return cls.from_coo(matrix.row_n, matrix.col_n, (
+            (r, c, val)
+            for r, row in enumerate(matrix)
+            for c, val in enumerate(row)
+            if val != 0
+        ))
+
+    @classmethod
+    def from_sparse_table(cls, table):
+        """
+        Build a SparseMatrix from a SparseTable,
+        cells equal to init_val of table are treated as zero.
+
+        :param table: SparseTable
+        """
+        init_val = table.init_val
+        return cls.from_coo(table.height, table.width, (
+            (r, c, val)
+            for r, row in table.table.items()
+            for c, val in row.items()
+            if val != init_val
+        ))
+
+    def __init__(self, row_n, col_n, indptr=None, indices=None, values=None):
+        """
+        :param row_n: rows number
+        :param col_n: columns number
+        :param indptr: row offsets, length is row_n + 1
+        :param indices: column indices of non-zeros
+        :param values: values of non-zeros
+        """
+        self.row_n = int(row_n)
+        self.col_n = int(col_n)
+        if self.row_n <= 0 or self.col_n <= 0:
+            raise ValueError("matrix size error: [%d, %d]" % (
+                self.row_n, self.col_n,
+            ))
+        self.indptr = array(
+            "l", repeat(0, self.row_n + 1) if indptr is None else indptr,
+        )
+        self.indices = array("l", () if indices is None else indices)
+        self.values = array("d", () if values is None else values)
+        if (
+            len(self.indptr) != self.row_n + 1 or
+            len(self.indices) != len(self.values) or
+            self.indptr[-1] != len(self.values)
+        ):
+            raise ValueError("csr storage error")
+
+    @property
+    def nnz(self):
+        """
+        Number of non-zero elements.
+        """
+        return len(self.values)
+
+    def row_items(self, idx):
+        """
+        Return the (column, value) pairs of a row.
+
+        :param idx: row index
+        """
+        start = self.indptr[idx]
+        end = self.indptr[idx + 1]
+        return zip(self.indices[start:end], self.values[start:end])
+
+    def iter_items(self):
+        """
+        Iterate the (row, column, value) of non-zero elements.
+        """
+        for r in range(self.row_n):
+            for c, val in self.row_items(r):
+                yield r, c, val
+
+    def __getitem__(self, idx):
+        if not isinstance(idx, (tuple, list)):
+            raise ValueError("index type error: %s" % (idx,))
+        r, c = idx
+        if not (0 <= r < self.row_n and 0 <= c < self.col_n):
+            raise IndexError("index error: [%s, %s]" % (r, c))
+        start = self.indptr[r]
+        end = self.indptr[r + 1]
+        pos = bisect_left(self.indices, c, start, end)
+        if pos < end and self.indices[pos] == c:
+            return self.values[pos]
+        return 0
+
+    def __str__(self):
+        return "<%s: [%d, %d], nnz=%d>" % (
+            self.__class__.__name__, self.row_n, self.col_n, self.nnz,
+        )
+
+    __repr__ = __str__
+
+    def __eq__(self, other):
+        if self.row_n != other.row_n or self.col_n != other.col_n:
+            return False
+        if isinstance(other, SparseMatrix):
+            return (
+                self.indptr == other.indptr and
+                self.indices == other.indices and
+                self.values == other.values
+            )
+        return self.to_matrix(DenseMatrix) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def to_matrix(self, cls=Matrix):
+        """
+        Convert to a dense matrix.
+
+        :param cls: Matrix or DenseMatrix
+        """
+        matrix = cls(self.row_n, self.col_n)
+        for r, c, val in self.iter_items():
+            matrix[r, c] = val
+        return matrix
+
+    def to_sparse_table(self, init_val=0):
+        """
+        Convert to a SparseTable.
+
+        :param init_val: value of the zero cells
+        """
+        table = SparseTable(self.row_n, self.col_n, init_val)
+        for r, c, val in self.iter_items():
+            table[r, c] = val
+        return table
+
+    def transpose_matrix(self):
+        col_n = self.col_n
+        counts = [0] * (col_n + 1)
+        for c in self.indices:
+            counts[c + 1] += 1
+        for c in range(col_n):
+            counts[c + 1] += counts[c]
+
+        indptr = array("l", counts)
+        indices = array("l", repeat(0, self.nnz))
+        values = array("d", repeat(0, self.nnz))
+        offsets = counts[:-1]
+        for r in range(self.row_n):
+            for c, val in self.row_items(r):
+                pos = offsets[c]
+                indices[pos] = r
+                values[pos] = val
+                offsets[c] = pos + 1
+        return SparseMatrix(col_n, self.row_n, indptr, indices, values)
+
+    def __mul__(self, other):
+        if self.col_n != other.row_n:
+            raise ValueError("matrix size error: [%d, %d]" % (
+                other.row_n, other.col_n,
+            ))
+        if isinstance(other, SparseMatrix):
+            return self._mul_sparse(other)
+        return self._mul_dense(other)
+
+    def _mul_sparse(self, other):
+        indptr = array("l", [0])
+        indices = array("l")
+        values = array("d")
+        for r in range(self.row_n):
+            accumulator = {}
+            get = accumulator.get
+            for k, val in self.row_items(r):
+                for c, other_val in other.row_items(k):
+                    accumulator[c] = get(c, 0) + val * other_val
+            for c in sorted(accumulator):
+                val = accumulator[c]
+                if val != 0:
+                    indices.append(c)
+                    values.append(val)
+            indptr.append(len(indices))
+        return SparseMatrix(self.row_n, other.col_n, indptr, indices, values)
+
+    def _mul_dense(self, other):
+        if not isinstance(other, DenseMatrix):
+            other = DenseMatrix.from_matrix(other)
+        col_n = other.col_n
+        result = DenseMatrix(self.row_n, col_n)
+        if DenseMatrix.use_numpy:
+            dense = other.as_numpy()
+            output = result.as_numpy()
+            for r, k, val in self.iter_items():
+                output[r] += val * dense[k]
+            return result
+
+        data = result.data
+        other_data = other.data
+        for r, k, val in self.iter_items():
+            start = r * col_n
+            other_start = k * col_n
+            for c in range(col_n):
+                data[start + c] += val * other_data[other_start + c]
+        return result
+
+    def __rmul__(self, other):
+        if other == 0:
+            return SparseMatrix(self.row_n, self.col_n)
+        return SparseMatrix(
+            self.row_n, self.col_n, self.indptr, self.indices,
+            (other * i for i in self.values),
+        )
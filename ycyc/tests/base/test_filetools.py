@@ -1,7 +1,15 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
-from unittest import TestCase
+import errno
+import os
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime
+from unittest import TestCase, skipIf
+
+import mock
 
 from ycyc.tests import mock_patches
 from ycyc.base import filetools
@@ -164,3 +172,639 @@ class TestChangeDir(TestCase):
                     raise NotImplementedError
 
             self.assertEqual(patches.chdir.call_count, 2)
+
+
+class TestHashOf(TestCase):
+    Content = b"ycyc" * 4099
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "file.bin")
+        with open(self.path, "wb") as fp:
+            fp.write(self.Content)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_hash_of(self):
+        self.assertEqual(
+            filetools.md5_of(self.path),
+            hashlib.md5(self.Content).hexdigest(),
+        )
+        self.assertEqual(
+            filetools.sha1_of(self.path),
+            hashlib.sha1(self.Content).hexdigest(),
+        )
+        self.assertEqual(
+            filetools.hash_of(self.path, "sha256", block_size=7),
+            hashlib.sha256(self.Content).hexdigest(),
+        )
+
+    def test_iter_blocks(self):
+        blocks = list(filetools.iter_blocks(self.path, 1000))
+        self.assertEqual(len(blocks), 17)
+        self.assertEqual(b"".join(blocks), self.Content)
+
+        mmap_blocks = list(filetools.iter_blocks(self.path, 1000, 1))
+        self.assertTrue(all(isinstance(i, bytes) for i in mmap_blocks))
+        self.assertListEqual(mmap_blocks, blocks)
+
+    def test_hashes_of(self):
+        names = ("md5", "sha1", "sha256")
+        expected = dict(
+            (i, hashlib.new(i, self.Content).hexdigest()) for i in names
+        )
+        self.assertDictEqual(filetools.hashes_of(self.path, names), expected)
+        self.assertDictEqual(
+            filetools.hashes_of(self.path, names, 100, mmap_threshold=1),
+            expected,
+        )
+
+        empty_path = os.path.join(self.root, "empty")
+        open(empty_path, "wb").close()
+        self.assertEqual(
+            filetools.hashes_of(empty_path, ["md5"], mmap_threshold=0),
+            {"md5": hashlib.md5(b"").hexdigest()},
+        )
+
+    def test_hash_tree(self):
+        sub_path = os.path.join(self.root, "sub", "file.txt")
+        os.makedirs(os.path.dirname(sub_path))
+        with open(sub_path, "wb") as fp:
+            fp.write(b"lyc")
+
+        self.assertDictEqual(
+            filetools.hash_tree(self.root, ["md5", "sha1"], workers=2),
+            {
+                self.path: {
+                    "md5": hashlib.md5(self.Content).hexdigest(),
+                    "sha1": hashlib.sha1(self.Content).hexdigest(),
+                },
+                sub_path: {
+                    "md5": hashlib.md5(b"lyc").hexdigest(),
+                    "sha1": hashlib.sha1(b"lyc").hexdigest(),
+                },
+            }
+        )
+
+
+class TestDigestCache(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "file.txt")
+        self.write(b"lyc")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, content, path=None):
+        path = path or self.path
+        with open(path, "wb") as fp:
+            fp.write(content)
+
+    def test_hit_and_miss(self):
+        cache = filetools.DigestCache()
+        md5 = hashlib.md5(b"lyc").hexdigest()
+        self.assertEqual(filetools.md5_of(self.path, cache=cache), md5)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+        with mock_patches("ycyc.base.filetools.hashes_of") as patches:
+            self.assertEqual(filetools.md5_of(self.path, cache=cache), md5)
+            self.assertEqual(patches.hashes_of.call_count, 0)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.assertEqual(
+            filetools.sha1_of(self.path, cache=cache),
+            hashlib.sha1(b"lyc").hexdigest(),
+        )
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(len(cache), 1)
+
+        self.write(b"ycyc")
+        os.utime(self.path, (0, 0))
+        self.assertEqual(
+            filetools.md5_of(self.path, cache=cache),
+            hashlib.md5(b"ycyc").hexdigest(),
+        )
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_invalidate(self):
+        cache = filetools.DigestCache()
+        filetools.md5_of(self.path, cache=cache)
+        self.assertTrue(cache.invalidate(self.path))
+        self.assertFalse(cache.invalidate(self.path))
+        self.assertFalse(cache.invalidate(self.path + ".missing"))
+        filetools.md5_of(self.path, cache=cache)
+        self.assertEqual(cache.misses, 2)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+    def test_lru(self):
+        cache = filetools.DigestCache(capacity=2)
+        paths = [os.path.join(self.root, str(i)) for i in range(3)]
+        for p in paths:
+            self.write(p.encode("utf-8"), p)
+            filetools.md5_of(p, cache=cache)
+        self.assertEqual(len(cache), 2)
+        self.assertListEqual(
+            list(cache.entries.keys()),
+            [cache.key_of(p) for p in paths[1:]],
+        )
+
+        filetools.md5_of(paths[1], cache=cache)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(
+            list(cache.entries.keys())[-1], cache.key_of(paths[1])
+        )
+
+    def test_save_and_load(self):
+        index_path = os.path.join(self.root, "cache", "index.json")
+        cache = filetools.DigestCache(index_path)
+        hashes = filetools.hash_tree(
+            self.root, ["md5", "sha256"], workers=2, cache=cache,
+        )
+        cache.save()
+
+        cache = filetools.DigestCache(index_path)
+        self.assertEqual(len(cache), 1)
+        self.assertDictEqual(
+            cache.hashes_of(self.path, ["md5", "sha256"]),
+            hashes[self.path],
+        )
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+
+class TestCachedPathInfo(TestCase):
+    def setUp(self):
+        self.root = os.path.realpath(tempfile.mkdtemp())
+        self.files = {
+            "a.txt": b"a",
+            "b.log": b"bb" * 100,
+            os.path.join("sub", "c.TXT"): b"ccc",
+            os.path.join("sub", "deep", "d.log"): b"dddd",
+        }
+        for name, content in self.files.items():
+            path = os.path.join(self.root, name)
+            filetools.make_sure_dir_exists(os.path.dirname(path))
+            with open(path, "wb") as fp:
+                fp.write(content)
+        os.utime(os.path.join(self.root, "a.txt"), (100, 100))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_stat_once(self):
+        info = filetools.CachedPathInfo(os.path.join(self.root, "b.log"))
+        stat = os.stat(info.path)
+        with mock_patches("ycyc.base.filetools.os.stat") as patches:
+            patches.stat.return_value = stat
+            self.assertEqual(info.length, 200)
+            self.assertTrue(info.is_file)
+            self.assertFalse(info.is_dir)
+            info.last_write_time
+            info.creation_time
+            self.assertEqual(patches.stat.call_count, 1)
+
+        info.refresh()
+        self.assertIsNone(info._stat)
+        self.assertFalse(
+            filetools.CachedPathInfo(info.path + ".missing").is_exists
+        )
+
+    def test_children(self):
+        info = filetools.CachedPathInfo(self.root)
+        self.assertTrue(info.is_dir)
+        children = dict((i.full_name, i) for i in info.children)
+        self.assertSetEqual(set(children), {"a.txt", "b.log", "sub"})
+        self.assertIsNotNone(children["sub"].entry)
+        self.assertTrue(children["sub"].is_dir)
+        self.assertTrue(children["a.txt"].is_file)
+        self.assertEqual(children["b.log"].length, 200)
+        self.assertEqual(children["a.txt"].last_write_timestamp, 100)
+        self.assertListEqual(children["a.txt"].children, [])
+
+    def test_iter_path_infos(self):
+        def walk(**kwargs):
+            return sorted(
+                os.path.relpath(i.path, self.root)
+                for i in filetools.iter_path_infos(self.root, **kwargs)
+            )
+
+        self.assertListEqual(walk(), sorted(self.files))
+        self.assertListEqual(
+            walk(include_dirs=True),
+            sorted(list(self.files) + ["sub", os.path.join("sub", "deep")]),
+        )
+        self.assertListEqual(
+            walk(extensions=[".txt"]),
+            ["a.txt", os.path.join("sub", "c.TXT")],
+        )
+        self.assertListEqual(
+            walk(min_size=3, max_size=100),
+            [os.path.join("sub", "c.TXT"), os.path.join("sub", "deep", "d.log")],
+        )
+        self.assertListEqual(walk(modified_before=1000), ["a.txt"])
+        self.assertListEqual(
+            walk(modified_after=datetime.fromtimestamp(1000)),
+            sorted(i for i in self.files if i != "a.txt"),
+        )
+        self.assertListEqual(
+            list(filetools.iter_path_infos(self.root + ".missing")), []
+        )
+
+    def walk_names(self, **kwargs):
+        return sorted(
+            os.path.relpath(i.path, self.root)
+            for i in filetools.iter_path_infos(self.root, **kwargs)
+        )
+
+    def test_iter_path_infos_entry_error(self):
+        iter_scandir = filetools._iter_scandir
+
+        class BrokenEntry(object):
+            name = "broken"
+            path = os.path.join(self.root, "broken")
+
+            def is_dir(self, follow_symlinks=True):
+                raise OSError("broken")
+
+        def fake_iter_scandir(path):
+            yield BrokenEntry()
+            for entry in iter_scandir(path):
+                yield entry
+
+        with mock.patch.object(filetools, "_iter_scandir", fake_iter_scandir):
+            self.assertListEqual(self.walk_names(), sorted(self.files))
+
+    def test_iter_path_infos_link_cycle(self):
+        os.symlink(self.root, os.path.join(self.root, "sub", "loop"))
+        self.assertListEqual(
+            self.walk_names(follow_links=True), sorted(self.files),
+        )
+        self.assertListEqual(
+            self.walk_names(follow_links=True, include_dirs=True),
+            sorted(list(self.files) + [
+                "sub", os.path.join("sub", "deep"), os.path.join("sub", "loop"),
+            ]),
+        )
+
+    def test_listdir_scandir(self):
+        with mock.patch.object(filetools, "scandir", None):
+            self.assertListEqual(self.walk_names(), sorted(self.files))
+            children = dict(
+                (i.full_name, i)
+                for i in filetools.CachedPathInfo(self.root).children
+            )
+            self.assertTrue(children["sub"].is_dir)
+            self.assertFalse(children["sub"].is_link)
+            self.assertTrue(children["a.txt"].is_file)
+            self.assertEqual(children["b.log"].length, 200)
+            self.assertEqual(
+                children["a.txt"].entry.inode(),
+                os.stat(children["a.txt"].path).st_ino,
+            )
+
+
+class TestBulkRemove(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.files = [
+            os.path.join(self.root, "a"),
+            os.path.join(self.root, "sub1", "b"),
+            os.path.join(self.root, "sub1", "sub", "c"),
+            os.path.join(self.root, "sub2", "d"),
+        ]
+        for path in self.files:
+            filetools.make_sure_dir_exists(os.path.dirname(path))
+            filetools.touch_file(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_dry_run(self):
+        stats = filetools.make_sure_dir_empty(self.root, dry_run=True)
+        self.assertEqual((stats.files, stats.dirs), (4, 3))
+        self.assertSetEqual(
+            set(stats.paths),
+            set(self.files) | {
+                os.path.join(self.root, "sub1"),
+                os.path.join(self.root, "sub1", "sub"),
+                os.path.join(self.root, "sub2"),
+            },
+        )
+        self.assertLess(
+            stats.paths.index(self.files[2]),
+            stats.paths.index(os.path.join(self.root, "sub1", "sub")),
+        )
+        for path in self.files:
+            self.assertTrue(os.path.exists(path))
+
+        stats = filetools.make_sure_not_exists(self.root, dry_run=True)
+        self.assertEqual((stats.files, stats.dirs), (4, 4))
+        self.assertEqual(stats.paths[-1], self.root)
+        self.assertTrue(os.path.exists(self.root))
+
+    def test_make_sure_dir_empty(self):
+        removed = []
+        stats = filetools.make_sure_dir_empty(
+            self.root, workers=2,
+            callback=lambda path, stats: removed.append(path),
+        )
+        self.assertEqual((stats.files, stats.dirs), (4, 3))
+        self.assertEqual(len(removed), 7)
+        self.assertListEqual(stats.paths, [])
+        self.assertListEqual(os.listdir(self.root), [])
+
+    def test_make_sure_not_exists(self):
+        with mock.patch.object(filetools, "SupportDirFd", False):
+            stats = filetools.make_sure_not_exists(self.root, bulk=True)
+        self.assertEqual((stats.files, stats.dirs), (4, 4))
+        self.assertFalse(os.path.exists(self.root))
+
+        stats = filetools.make_sure_not_exists(self.root, bulk=True)
+        self.assertEqual((stats.files, stats.dirs), (0, 0))
+
+    def test_errors(self):
+        with mock_patches("ycyc.base.filetools.os.unlink") as patches:
+            patches.unlink.side_effect = OSError("denied")
+            with self.assertRaises(OSError):
+                filetools.bulk_remove_dir(self.root)
+
+            stats = filetools.bulk_remove_dir(
+                self.root, keep_root=True, ignore_errors=True,
+            )
+            self.assertEqual(len(stats.errors), 7)
+
+    @skipIf(not filetools.SupportDirFd, "dir fd is not supported")
+    def test_sub_dir_errors(self):
+        sub_path = os.path.join(self.root, "sub2")
+        error = OSError(errno.EACCES, "denied")
+        os_open = os.open
+
+        def open_dir(name, *args, **kwargs):
+            if name == "sub2":
+                raise error
+            return os_open(name, *args, **kwargs)
+
+        with mock.patch.object(filetools.os, "open", side_effect=open_dir):
+            stats = filetools.bulk_remove_dir(
+                self.root, keep_root=True, ignore_errors=True,
+            )
+        self.assertListEqual(stats.errors, [(sub_path, error)])
+        self.assertListEqual(os.listdir(self.root), ["sub2"])
+
+    def test_link_to_dir(self):
+        link = os.path.join(tempfile.mkdtemp(), "link")
+        self.addCleanup(shutil.rmtree, os.path.dirname(link))
+        os.symlink(self.root, link)
+        for support_dir_fd in {False, filetools.SupportDirFd}:
+            filetools.touch_file(os.path.join(self.root, "e"))
+            with mock.patch.object(filetools, "SupportDirFd", support_dir_fd):
+                stats = filetools.make_sure_dir_empty(link, bulk=True)
+            self.assertGreater(stats.files, 0)
+            self.assertListEqual(os.listdir(self.root), [])
+            self.assertTrue(os.path.islink(link))
+
+
+class TestAtomicFileWriter(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "sub", "report.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def read(self):
+        with open(self.path, "rb") as fp:
+            return fp.read()
+
+    def test_commit(self):
+        with filetools.AtomicFileWriter(self.path, buffer_size=4) as writer:
+            writer.write(u"测试\n")
+            writer.writelines([u"a\n", u"b\n"])
+            writer.write_lines((u"line%d" % i for i in range(5)), batch_size=2)
+            self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(writer.closed)
+        self.assertEqual(
+            self.read(),
+            u"测试\na\nb\nline0\nline1\nline2\nline3\nline4\n".encode("utf-8"),
+        )
+        self.assertListEqual(os.listdir(os.path.dirname(self.path)), ["report.txt"])
+
+    def test_abort(self):
+        filetools.make_sure_dir_exists(os.path.dirname(self.path))
+        with open(self.path, "wb") as fp:
+            fp.write(b"old")
+        os.chmod(self.path, 0o640)
+
+        with self.assertRaises(NotImplementedError):
+            with filetools.AtomicFileWriter(self.path) as writer:
+                writer.write(u"new")
+                raise NotImplementedError
+        self.assertEqual(self.read(), b"old")
+        self.assertListEqual(os.listdir(os.path.dirname(self.path)), ["report.txt"])
+
+        writer = filetools.safe_open_for_atomic_write(self.path, binary=True)
+        writer.write(b"new")
+        writer.commit()
+        self.assertEqual(self.read(), b"new")
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+
+    def test_preallocate(self):
+        with filetools.safe_open_for_atomic_write(
+            self.path, preallocate=1 << 16, fsync=False,
+        ) as writer:
+            writer.write_lines([u"a", u"b"], newline=u"\r\n")
+        self.assertEqual(self.read(), b"a\r\nb\r\n")
+
+    def test_commit_error(self):
+        dir_path = os.path.dirname(self.path)
+        with self.assertRaises(OSError):
+            with mock.patch.object(
+                filetools.os, "fsync", side_effect=OSError("fsync"),
+            ):
+                with filetools.AtomicFileWriter(self.path) as writer:
+                    writer.write(u"new")
+        self.assertTrue(writer.closed)
+        self.assertIsNone(writer.temp_path)
+        self.assertListEqual(os.listdir(dir_path), [])
+
+        writer = filetools.safe_open_for_atomic_write(self.path)
+        writer.write(u"new")
+        writer.flush()
+        self.assertFalse(os.path.exists(self.path))
+        writer.close()
+        writer.close()
+        self.assertEqual(self.read(), b"new")
+        self.assertListEqual(os.listdir(dir_path), ["report.txt"])
+
+    def test_commit_in_with(self):
+        with filetools.AtomicFileWriter(self.path) as writer:
+            writer.write(u"new")
+            writer.commit()
+            self.assertEqual(self.read(), b"new")
+        self.assertTrue(writer.closed)
+        self.assertEqual(self.read(), b"new")
+
+        with self.assertRaises(NotImplementedError):
+            with filetools.AtomicFileWriter(self.path) as writer:
+                writer.write(u"newer")
+                writer.commit()
+                raise NotImplementedError
+        self.assertEqual(self.read(), b"newer")
+        self.assertListEqual(
+            os.listdir(os.path.dirname(self.path)), ["report.txt"],
+        )
+
+
+class TestMappedTextReader(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "app.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def reader_of(self, content, **kwargs):
+        with open(self.path, "wb") as fp:
+            fp.write(content.encode("utf-8"))
+        return filetools.MappedTextReader(self.path, **kwargs)
+
+    def test_mmap_error(self):
+        with open(self.path, "wb") as fp:
+            fp.write(b"line\n")
+        opened = []
+
+        def open_file(*args):
+            opened.append(open(*args))
+            return opened[-1]
+
+        with mock.patch.object(filetools, "open", create=True, side_effect=open_file):
+            with mock.patch.object(
+                filetools.mmap, "mmap", side_effect=EnvironmentError("mmap"),
+            ):
+                with self.assertRaises(EnvironmentError):
+                    filetools.MappedTextReader(self.path)
+        self.assertEqual(len(opened), 1)
+        self.assertTrue(opened[0].closed)
+
+    def test_lines(self):
+        for content in [
+            u"", u"\n", u"a", u"a\n", u"a\r\nb", u"\n\n测试\n", u"a\nb\n\nc",
+        ]:
+            expected = content.split(u"\n")
+            if expected[-1] == u"":
+                expected.pop()
+            expected = [i[:-1] if i.endswith(u"\r") else i for i in expected]
+            with self.reader_of(content) as reader:
+                for k in range(len(expected) + 2):
+                    self.assertListEqual(
+                        reader.tail(k),
+                        expected[max(len(expected) - k, 0):] if k else [],
+                    )
+                self.assertEqual(len(reader), len(expected))
+                self.assertListEqual(reader.lines(), expected)
+                self.assertListEqual(reader[1:3], expected[1:3])
+                self.assertListEqual(reader.tail(2), expected[-2:])
+                for i, line in enumerate(expected):
+                    self.assertEqual(reader.line(i), line)
+                    self.assertEqual(reader[i - len(expected)], line)
+                with self.assertRaises(IndexError):
+                    reader.line(len(expected))
+
+    def test_index(self):
+        index_path = os.path.join(self.root, "app.log.idx")
+        content = u"".join(u"line%d\n" % i for i in range(100))
+        with self.reader_of(content, index_path=index_path) as reader:
+            self.assertEqual(reader.line(42), u"line42")
+        self.assertTrue(os.path.exists(index_path))
+
+        with mock_patches(
+            "ycyc.base.filetools.MappedTextReader.build_index",
+        ) as patches:
+            with filetools.MappedTextReader(
+                self.path, index_path=index_path,
+            ) as reader:
+                self.assertListEqual(reader.lines(98), [u"line98", u"line99"])
+            self.assertEqual(patches.build_index.call_count, 0)
+
+        content += u"line100\n"
+        with self.reader_of(content, index_path=index_path) as reader:
+            self.assertEqual(len(reader), 101)
+
+
+class TestPathResolver(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "report.txt")
+        for name in ["a.conf", "report.txt", "report(2).txt", "report(4).txt"]:
+            filetools.touch_file(os.path.join(self.root, name))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_existing(self):
+        resolver = filetools.PathResolver()
+        paths = [
+            os.path.join(self.root, i)
+            for i in ["b.conf", "a.conf", "report.txt", "missing/a.conf"]
+        ]
+        with mock_patches(
+            "ycyc.base.filetools.os.path.exists",
+        ) as patches:
+            self.assertListEqual(resolver.existing(paths), paths[1:3])
+            self.assertEqual(
+                filetools.choice_one_if_exists(paths, resolver=resolver),
+                paths[1],
+            )
+            self.assertEqual(
+                filetools.choice_one_if_exists(
+                    paths[:1], "default", resolver=resolver,
+                ),
+                "default",
+            )
+            self.assertEqual(patches.exists.call_count, 0)
+        self.assertSetEqual(
+            set(resolver.listings),
+            {self.root, os.path.join(self.root, "missing")},
+        )
+        self.assertTrue(resolver.exists(self.root + os.sep))
+
+        filetools.touch_file(paths[0])
+        self.assertFalse(resolver.exists(paths[0]))
+        resolver.refresh(self.root)
+        self.assertTrue(resolver.exists(paths[0]))
+
+    def test_mk_not_existed_path(self):
+        expected = os.path.join(self.root, "report(3).txt")
+        self.assertEqual(filetools.mk_not_existed_path(self.path), expected)
+
+        resolver = filetools.PathResolver()
+        with mock_patches(
+            "ycyc.base.filetools.os.path.exists",
+        ) as patches:
+            self.assertEqual(
+                filetools.mk_not_existed_path(self.path, resolver), expected,
+            )
+            self.assertEqual(patches.exists.call_count, 0)
+
+        self.assertEqual(
+            filetools.mk_not_existed_path(self.path, resolver, create=True),
+            expected,
+        )
+        self.assertTrue(os.path.exists(expected))
+        self.assertEqual(
+            filetools.mk_not_existed_path(self.path, resolver, create=True),
+            os.path.join(self.root, "report(5).txt"),
+        )
+
+    def test_create_race(self):
+        resolver = filetools.PathResolver()
+        resolver.names_of(self.root)
+        filetools.touch_file(os.path.join(self.root, "report(3).txt"))
+        self.assertEqual(
+            filetools.mk_not_existed_path(self.path, resolver, create=True),
+            os.path.join(self.root, "report(5).txt"),
+        )
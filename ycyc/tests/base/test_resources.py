@@ -52,3 +52,62 @@ class TestRegex(TestCase):
         test_num(2000)
         test_num(2001)
         test_num(2002)
+
+
+class TestRegexRegistry(TestCase):
+    def setUp(self):
+        self.registry = resources.RegexRegistry()
+
+    def test_compile(self):
+        rex = self.registry.num_less_than(256)
+        self.assertIs(self.registry.num_less_than(256), rex)
+        self.assertIs(self.registry.compile("num_less_than", 256), rex)
+        self.assertIsNot(self.registry.num_less_than(100), rex)
+        self.assertEqual(rex.pattern, resources.Regex.num_less_than(256))
+        self.assertIs(
+            self.registry.hex_num(repeat=2), self.registry.hex_num(repeat=2),
+        )
+        self.assertIsNotNone(self.registry.ipv4().search("ip: 10.0.0.1"))
+        self.assertIs(resources.regexes.ipv4(), resources.regexes.ipv4())
+
+        with self.assertRaises(AttributeError):
+            self.registry.nothing
+        with self.assertRaises(AttributeError):
+            self.registry.compile("_private")
+
+    def test_flags(self):
+        registry = resources.RegexRegistry(flags=re.IGNORECASE)
+        self.assertIsNotNone(registry.hms_time().match("12:00:00"))
+        self.assertEqual(registry.hms_time().flags & re.IGNORECASE, re.IGNORECASE)
+
+    def test_scanner(self):
+        scanner = self.registry.scanner([
+            "email_addr", "simple_url_pattern", "ipv4", "date",
+            ("quoted_string", ("'",)),
+        ])
+        self.assertIs(
+            self.registry.scanner([
+                "email_addr", "simple_url_pattern", "ipv4", "date",
+                ("quoted_string", ["'"]),
+            ]),
+            scanner,
+        )
+        text = (
+            "lyc@example.com visit http://example.com/a?b=1 "
+            "from 192.168.1.1, 999.1.1.1 at 2016-02-28 'hello'"
+        )
+        self.assertEqual(scanner.findall(text), {
+            "email_addr": ["lyc@example.com"],
+            "simple_url_pattern": ["http://example.com/a?b=1"],
+            "ipv4": ["192.168.1.1"],
+            "date": ["2016-02-28"],
+            "quoted_string": ["'hello'"],
+        })
+        self.assertEqual(
+            [(label, m.start()) for label, m in scanner.finditer(text)][:2],
+            [("email_addr", 0), ("simple_url_pattern", 22)],
+        )
+        self.assertEqual(scanner.findall("nothing"), {})
+
+        with self.assertRaises(ValueError):
+            resources.RegexScanner([("a", "a"), ("a", "b")])
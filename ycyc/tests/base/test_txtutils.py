@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
+import random
 from unittest import TestCase
 
+import mock
+
 from ycyc.base import txtutils
 
 
@@ -123,11 +126,47 @@ class TestTxtDistance(TestCase):
         }
         edit_distance = txtutils.TxtDistance.edit_distance
         edit_distance2 = txtutils.TxtDistance.edit_distance2
+        bit_parallel = txtutils.TxtDistance.bit_parallel_edit_distance
+        banded = txtutils.TxtDistance.banded_edit_distance
 
         for case, result in list(test_cases.items()):
             s1, s2 = case
             self.assertEqual(edit_distance(s1, s2), result)
             self.assertEqual(edit_distance2(s1, s2), result)
+            self.assertEqual(bit_parallel(s1, s2), result)
+            self.assertEqual(bit_parallel(s2, s1), result)
+            self.assertEqual(banded(s1, s2, result), result)
+            self.assertEqual(banded(s1, s2, result + 3), result)
+            if result:
+                self.assertEqual(banded(s1, s2, result - 1), result)
+
+    def test_edit_distance_random(self):
+        rand = random.Random(42)
+        for _ in range(300):
+            s1 = "".join(rand.choice("abc") for _ in range(rand.randint(0, 12)))
+            s2 = "".join(rand.choice("abc") for _ in range(rand.randint(0, 12)))
+            result = txtutils.TxtDistance.edit_distance2(s1, s2)
+            self.assertEqual(txtutils.TxtDistance.edit_distance(s1, s2), result)
+            self.assertEqual(
+                txtutils.TxtDistance.bit_parallel_edit_distance(s1, s2), result,
+            )
+            for max_distance in range(6):
+                self.assertEqual(
+                    txtutils.TxtDistance.banded_edit_distance(
+                        s1, s2, max_distance,
+                    ),
+                    min(result, max_distance + 1),
+                )
+
+        s1 = "".join(rand.choice("abcdefgh") for _ in range(300))
+        s2 = "".join(rand.choice("abcdefgh") for _ in range(280))
+        result = txtutils.TxtDistance.edit_distance(s1, s2)
+        self.assertEqual(
+            txtutils.TxtDistance.bit_parallel_edit_distance(s1, s2), result,
+        )
+        self.assertEqual(
+            txtutils.TxtDistance.banded_edit_distance(s1, s2, 300), result,
+        )
 
     def test_hamming_distance(self):
         test_cases = {
@@ -169,3 +208,211 @@ class TestSepJoin(TestCase):
             txtutils.sep_join(",", list(map(str, list(range(3)))), "x="),
             "x=0,1,2"
         )
+
+
+class TestFuzzyMatcher(TestCase):
+
+    def test_usage(self):
+        matcher = txtutils.FuzzyMatcher(["start", "stop", "status", "stop"])
+        self.assertEqual(len(matcher), 3)
+        self.assertEqual(
+            matcher.search("stat", max_distance=2),
+            [(1, "start"), (2, "stop"), (2, "status")],
+        )
+        self.assertEqual(matcher.search("stat", top_k=1), [(1, "start")])
+        self.assertEqual(matcher.search("stat", top_k=0), [])
+        self.assertEqual(matcher.search("xxxxxxxx", max_distance=1), [])
+        self.assertEqual(matcher.best("stpo"), "stop")
+        self.assertIsNone(matcher.best("xxxxxxxx", max_distance=1))
+        self.assertIsNone(txtutils.FuzzyMatcher().best("stop"))
+        self.assertEqual(txtutils.look_like("stpo", matcher), "stop")
+
+    def test_same_as_linear_scan(self):
+        rand = random.Random(7)
+
+        def random_word():
+            return "".join(
+                rand.choice("abcde") for _ in range(rand.randint(1, 8))
+            )
+
+        candidates = list(set(random_word() for _ in range(500)))
+        matcher = txtutils.FuzzyMatcher(candidates)
+        distance = txtutils.TxtDistance.edit_distance
+        for _ in range(30):
+            target = random_word()
+            expected = sorted(
+                (distance(target, i), candidates.index(i), i)
+                for i in candidates
+            )
+            self.assertEqual(
+                matcher.search(target, max_distance=2),
+                [(d, i) for d, _, i in expected if d <= 2],
+            )
+            self.assertEqual(
+                matcher.search(target, top_k=5),
+                [(d, i) for d, _, i in expected[:5]],
+            )
+            self.assertEqual(
+                matcher.best(target),
+                txtutils.look_like(target, candidates),
+            )
+
+
+class TestTemplate(TestCase):
+
+    def setUp(self):
+        self.model = {
+            "name": "lyc",
+            "age": 1,
+            "foo": {"bar": "hello", "baz": {"qux": 0}},
+        }
+
+    def test_template_render(self):
+        self.assertEqual(
+            txtutils.template_render(
+                "{{foo.bar}} {{ name }} {{name}}", self.model,
+            ),
+            "hello {{ name }} lyc",
+        )
+        self.assertEqual(
+            txtutils.template_render(
+                "{{age}}{{foo.baz.qux}}-{{foo.baz}}", self.model,
+            ),
+            "10-{'qux': 0}",
+        )
+        self.assertEqual(txtutils.template_render("", self.model), "")
+        self.assertEqual(txtutils.template_render("name", self.model), "name")
+        with self.assertRaises(KeyError):
+            txtutils.template_render("{{foo.nothing}}", self.model)
+
+    def test_compile_template(self):
+        compiled = txtutils.compile_template("<{{name}}:{{age}}>")
+        self.assertIs(txtutils.compile_template("<{{name}}:{{age}}>"), compiled)
+        self.assertIs(txtutils.compile_template(compiled), compiled)
+        self.assertEqual(compiled.chunks, ["<", ":", ">"])
+        self.assertEqual(compiled.paths, ["name", "age"])
+        self.assertEqual(
+            compiled.render_many([self.model, {"name": "x", "age": 2}]),
+            ["<lyc:1>", "<x:2>"],
+        )
+        self.assertEqual(txtutils.template_render(compiled, self.model), "<lyc:1>")
+
+    def test_cache_size(self):
+        with mock.patch.object(txtutils, "TemplateCacheSize", 2):
+            first = txtutils.compile_template("{{name}}1")
+            txtutils.compile_template("{{name}}2")
+            self.assertIs(txtutils.compile_template("{{name}}1"), first)
+            txtutils.compile_template("{{name}}3")
+            self.assertEqual(len(txtutils._template_cache), 2)
+            self.assertNotIn("{{name}}2", txtutils._template_cache)
+            self.assertIn("{{name}}1", txtutils._template_cache)
+
+
+class TestIntHamming(TestCase):
+
+    def test_usage(self):
+        distance = txtutils.TxtDistance
+        self.assertEqual(txtutils.bit_count(0), 0)
+        self.assertEqual(txtutils.bit_count((1 << 64) - 1), 64)
+        self.assertEqual(distance.int_hamming_distance(0b1011, 0b0110), 3)
+        self.assertEqual(
+            distance.int_hamming_distances(0b1011, [0b1011, 0b0110, 0]),
+            [0, 3, 3],
+        )
+        self.assertEqual(
+            distance.nearest_by_hamming(0b1011, [0, 0b0110, 0b1010, 0b1011], 3),
+            [(0, 0b1011), (1, 0b1010), (3, 0)],
+        )
+        self.assertEqual(
+            distance.nearest_by_hamming(
+                0b1011, [0, 0b0110, 0b1010], 3, max_distance=2,
+            ),
+            [(1, 0b1010)],
+        )
+
+
+class TestKeywordsAutomaton(TestCase):
+
+    def brute_force(self, keywords, text):
+        return sorted(
+            (i + len(k), -len(k), i, k)
+            for k in set(keywords)
+            for i in range(len(text))
+            if text.startswith(k, i)
+        )
+
+    def test_usage(self):
+        automaton = txtutils.KeywordsAutomaton(["he", "she", "hers", "his"])
+        self.assertEqual(len(automaton), 4)
+        self.assertFalse(automaton.add("she"))
+        self.assertEqual(
+            list(automaton.finditer("ushers")),
+            [(1, "she"), (2, "he"), (2, "hers")],
+        )
+        self.assertEqual(
+            automaton.positions("she said his hers"),
+            {"she": [0], "he": [1, 13], "his": [9], "hers": [13]},
+        )
+        self.assertEqual(
+            automaton.counts("hehehe"), {"he": 3},
+        )
+        self.assertEqual(automaton.search("this"), (1, "his"))
+        self.assertIsNone(automaton.search("nothing"))
+        self.assertEqual(list(automaton.finditer("")), [])
+        with self.assertRaises(ValueError):
+            automaton.add("")
+
+        automaton.add("s")
+        self.assertEqual(automaton.counts("ushers"), {
+            "s": 2, "she": 1, "he": 1, "hers": 1,
+        })
+
+    def test_stream(self):
+        automaton = txtutils.KeywordsAutomaton(["abc", "bcd", "cd"])
+        self.assertEqual(
+            list(automaton.finditer_stream(["xa", "b", "", "cdab", "cd"])),
+            [
+                (1, "abc"), (2, "bcd"), (3, "cd"),
+                (5, "abc"), (6, "bcd"), (7, "cd"),
+            ],
+        )
+        self.assertEqual(
+            automaton.positions(iter(["ab", "cd"])),
+            {"abc": [0], "bcd": [1], "cd": [2]},
+        )
+
+    def test_same_as_brute_force(self):
+        rand = random.Random(3)
+        for _ in range(50):
+            keywords = [
+                "".join(rand.choice("ab") for _ in range(rand.randint(1, 4)))
+                for _ in range(rand.randint(1, 8))
+            ]
+            text = "".join(rand.choice("abc") for _ in range(60))
+            automaton = txtutils.KeywordsAutomaton(keywords)
+            self.assertEqual(
+                list(automaton.finditer(text)),
+                [(i, k) for _, _, i, k in self.brute_force(keywords, text)],
+            )
+
+    def test_add_after_search(self):
+        automaton = txtutils.KeywordsAutomaton(["abc", "b"])
+        self.assertEqual(list(automaton.finditer("ab")), [(1, "b")])
+        automaton.add("zz")
+        self.assertEqual(list(automaton.finditer("ab")), [(1, "b")])
+        self.assertEqual(automaton.counts("abzz"), {"b": 1, "zz": 1})
+
+        rand = random.Random(4)
+        automaton = txtutils.KeywordsAutomaton()
+        keywords = []
+        for _ in range(30):
+            keyword = "".join(
+                rand.choice("ab") for _ in range(rand.randint(1, 4))
+            )
+            keywords.append(keyword)
+            automaton.add(keyword)
+            text = "".join(rand.choice("abc") for _ in range(40))
+            self.assertEqual(
+                list(automaton.finditer(text)),
+                [(i, k) for _, _, i, k in self.brute_force(keywords, text)],
+            )
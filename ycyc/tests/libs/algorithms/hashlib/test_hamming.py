@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import random
+from unittest import TestCase, skipIf
+
+import mock
+
+from ycyc.base.txtutils import TxtDistance
+from ycyc.libs.algorithms.hashlib import hamming
+
+
+@skipIf(hamming.numpy is None, "numpy is not available")
+class TestHamming(TestCase):
+    def setUp(self):
+        rand = random.Random(42)
+        self.fingerprints = [rand.getrandbits(64) for _ in range(200)]
+        self.fingerprints.extend([0, (1 << 64) - 1, self.fingerprints[0]])
+        self.queries = [rand.getrandbits(64) for _ in range(20)]
+        self.queries.append(self.fingerprints[3] ^ 0b101)
+
+    def test_popcount64(self):
+        values = hamming.as_fingerprints(self.fingerprints)
+        self.assertEqual(
+            hamming.popcount64(values).tolist(),
+            [bin(i).count("1") for i in self.fingerprints],
+        )
+        with mock.patch.object(
+            hamming.numpy, "bitwise_count", None, create=True,
+        ):
+            self.assertEqual(
+                hamming.popcount64(values.reshape(1, -1)).tolist(),
+                [[bin(i).count("1") for i in self.fingerprints]],
+            )
+
+    def test_distances(self):
+        query = self.queries[0]
+        self.assertEqual(
+            hamming.hamming_distances(query, self.fingerprints).tolist(),
+            TxtDistance.int_hamming_distances(query, self.fingerprints),
+        )
+        expected = [
+            TxtDistance.int_hamming_distances(i, self.fingerprints)
+            for i in self.queries
+        ]
+        for chunk_bytes in (1, 7 * 203 * hamming.PairBytes, 1 << 20):
+            distances = hamming.pairwise_hamming_distances(
+                self.queries, self.fingerprints, chunk_bytes=chunk_bytes,
+            )
+            self.assertEqual(distances.shape, (21, 203))
+            self.assertEqual(distances.tolist(), expected)
+
+    def test_chunk_bytes(self):
+        with mock.patch.object(
+            hamming, "popcount64", wraps=hamming.popcount64,
+        ) as popcount64:
+            hamming.pairwise_hamming_distances(
+                self.queries, self.fingerprints,
+                chunk_bytes=7 * 203 * hamming.PairBytes,
+            )
+            self.assertEqual(
+                [i[0][0].shape for i in popcount64.call_args_list],
+                [(7, 203)] * 3,
+            )
+
+            popcount64.reset_mock()
+            hamming.nearest_many(
+                self.queries, self.fingerprints, chunk_bytes=1,
+            )
+            self.assertEqual(popcount64.call_count, len(self.queries))
+            self.assertEqual(popcount64.call_args[0][0].shape, (1, 203))
+
+    def test_nearest(self):
+        for query in self.queries:
+            for top_k, max_distance in [(1, None), (5, None), (5, 28), (300, 30)]:
+                self.assertEqual(
+                    hamming.nearest(
+                        query, self.fingerprints, top_k, max_distance,
+                    ),
+                    TxtDistance.nearest_by_hamming(
+                        query, self.fingerprints, top_k, max_distance,
+                    ),
+                )
+        self.assertEqual(
+            hamming.nearest(self.queries[-1], self.fingerprints, 1),
+            [(2, self.fingerprints[3])],
+        )
+        self.assertEqual(hamming.nearest(0, self.fingerprints, 0), [])
+
+    def test_nearest_many(self):
+        self.assertEqual(
+            hamming.nearest_many(
+                self.queries, self.fingerprints, 3,
+                chunk_bytes=4 * 203 * hamming.PairBytes,
+            ),
+            [
+                TxtDistance.nearest_by_hamming(i, self.fingerprints, 3)
+                for i in self.queries
+            ],
+        )
+        self.assertEqual(
+            hamming.nearest_many(self.queries, self.fingerprints, 0),
+            [[]] * len(self.queries),
+        )
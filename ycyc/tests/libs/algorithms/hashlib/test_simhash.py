@@ -1,8 +1,187 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
-from unittest import TestCase
+import hashlib
+from unittest import TestCase, skipIf
 
+import mock
+from six import StringIO
 
-class Test1(TestCase):
-    pass
+from ycyc.libs.algorithms.hashlib import simhash
+
+
+class TestStableHash(TestCase):
+    def test_usage(self):
+        self.assertEqual(
+            simhash.stable_hash("lyc", 64),
+            int(hashlib.md5(b"lyc").hexdigest()[:16], 16),
+        )
+        self.assertEqual(
+            simhash.stable_hash(u"lyc", 128),
+            int(hashlib.md5(b"lyc").hexdigest(), 16),
+        )
+        self.assertEqual(
+            simhash.stable_hash(b"lyc", 12),
+            int(hashlib.md5(b"lyc").hexdigest()[:4], 16) >> 4,
+        )
+        self.assertEqual(
+            simhash.stable_hash("lyc", 256),
+            int(hashlib.sha512(b"lyc").hexdigest()[:64], 16),
+        )
+        with self.assertRaises(ValueError):
+            simhash.stable_hash("lyc", 1024)
+
+
+class TestSimHashEngine(TestCase):
+    Documents = [
+        "the quick brown fox jumps over the lazy dog".split(),
+        "the quick brown fox jumps over the lazy cat".split(),
+        "lorem ipsum dolor sit amet consectetur adipiscing elit".split(),
+        [],
+        ["single"],
+    ]
+
+    def weighted(self, words):
+        return [(len(i), i) for i in words]
+
+    def distance(self, fp1, fp2):
+        return bin(fp1 ^ fp2).count("1")
+
+    def test_fingerprint(self):
+        engine = simhash.SimHashEngine(64, use_numpy=False)
+        self.assertEqual(
+            engine.fingerprint([(1, "single")]),
+            simhash.stable_hash("single", 64),
+        )
+        self.assertEqual(
+            engine.fingerprint([(1, "a"), (1, "b"), (1, "a")]),
+            engine.fingerprint([(2, "a"), (1, "b")]),
+        )
+        self.assertEqual(engine.fingerprint([]), 0)
+
+        fps = engine.fingerprints(self.weighted(i) for i in self.Documents)
+        self.assertEqual(len(fps), len(self.Documents))
+        self.assertLess(
+            self.distance(fps[0], fps[1]), self.distance(fps[0], fps[2]),
+        )
+        for fp in fps:
+            self.assertLess(fp, 1 << 64)
+
+    def test_bits(self):
+        for bits in (12, 64, 128, 256):
+            engine = simhash.SimHashEngine(bits, use_numpy=False)
+            self.assertEqual(
+                engine.fingerprint([(1, "lyc")]),
+                simhash.stable_hash("lyc", bits),
+            )
+        with self.assertRaises(ValueError):
+            simhash.SimHashEngine(0)
+
+    @skipIf(simhash.numpy is None, "numpy is not available")
+    def test_numpy(self):
+        for bits in (12, 64, 128):
+            python_engine = simhash.SimHashEngine(bits, use_numpy=False)
+            numpy_engine = simhash.SimHashEngine(bits, use_numpy=True)
+            documents = [self.weighted(i) for i in self.Documents]
+            self.assertListEqual(
+                numpy_engine.fingerprints(documents),
+                python_engine.fingerprints(documents),
+            )
+        self.assertListEqual(numpy_engine.fingerprints([[], []]), [0, 0])
+
+    @skipIf(simhash.numpy is None, "numpy is not available")
+    def test_numpy_chunks(self):
+        documents = [self.weighted(i) for i in self.Documents]
+        expected = simhash.SimHashEngine(64, use_numpy=False).fingerprints(
+            documents,
+        )
+        engine = simhash.SimHashEngine(64, use_numpy=True)
+        for chunk_size in (1, 3, 8, 100):
+            engine.ChunkBytes = chunk_size * 64 * engine.TokenBitBytes
+            with mock.patch.object(
+                engine, "_add_numpy_chunk", wraps=engine._add_numpy_chunk,
+            ) as add_chunk:
+                self.assertListEqual(engine.fingerprints(documents), expected)
+            self.assertTrue(all(
+                len(i[0][1]) <= chunk_size for i in add_chunk.call_args_list
+            ))
+            self.assertEqual(
+                sum(len(i[0][1]) for i in add_chunk.call_args_list),
+                sum(len(set(i)) for i in self.Documents),
+            )
+
+    def test_simhash_many(self):
+        fps = simhash.simhash_many(
+            [" ".join(i) for i in self.Documents], spliter=simhash.Spliter.by_space,
+        )
+        engine = simhash.SimHashEngine(64)
+        self.assertListEqual(
+            fps,
+            [engine.fingerprint((1, j) for j in i) for i in self.Documents],
+        )
+
+
+class TestSpliter(TestCase):
+    Text = u"The quick brown fox, jumps over the lazy dog. 测试 文本"
+
+    def test_char_shingles(self):
+        expected = [self.Text[i:i + 3] for i in range(len(self.Text) - 2)]
+        for chunk_size in (1, 2, 5, 1000):
+            spliter = simhash.Spliter.char_shingles(3, chunk_size)
+            self.assertListEqual(list(spliter(self.Text)), expected)
+            self.assertListEqual(list(spliter(StringIO(self.Text))), expected)
+        self.assertListEqual(
+            list(simhash.Spliter.char_shingles(1, 4)(u"abc")), [u"a", u"b", u"c"],
+        )
+        self.assertListEqual(
+            list(simhash.Spliter.char_shingles(4, 1)(u"abc")), [],
+        )
+
+    def test_word_shingles(self):
+        words = simhash.Spliter.WordPattern.findall(self.Text)
+        for chunk_size in (1, 3, 7, 1000):
+            self.assertListEqual(
+                list(simhash.Spliter.iter_words(StringIO(self.Text), chunk_size)),
+                words,
+            )
+            spliter = simhash.Spliter.word_shingles(2, chunk_size=chunk_size)
+            self.assertListEqual(
+                list(spliter(self.Text)),
+                [" ".join(words[i:i + 2]) for i in range(len(words) - 1)],
+            )
+
+    def test_weighted(self):
+        tokens = list("abracadabra")
+        self.assertDictEqual(
+            dict((t, w) for w, t in simhash.Spliter.weighted(tokens)),
+            {"a": 5, "b": 2, "r": 2, "c": 1, "d": 1},
+        )
+        self.assertEqual(len(list(simhash.Spliter.weighted(tokens, 3))), 10)
+
+
+class TestSimHashAccumulator(TestCase):
+    def test_stream(self):
+        text = u" ".join(u"word%d" % (i % 37) for i in range(2000))
+        spliter = simhash.Spliter.word_shingles(2, chunk_size=100)
+        for use_numpy in (False, True):
+            if use_numpy and simhash.numpy is None:
+                continue
+            engine = simhash.SimHashEngine(64, use_numpy=use_numpy)
+            expected = engine.fingerprint((1, i) for i in spliter(text))
+            self.assertEqual(
+                engine.fingerprint_stream(
+                    simhash.Spliter.weighted(spliter(StringIO(text)), 50),
+                    batch_size=7,
+                ),
+                expected,
+            )
+
+            accumulator = engine.accumulator()
+            self.assertEqual(accumulator.fingerprint(), 0)
+            accumulator.update([(1, "a")])
+            accumulator.update([])
+            accumulator.update([(2, "b")])
+            self.assertEqual(
+                accumulator.fingerprint(),
+                engine.fingerprint([(1, "a"), (2, "b")]),
+            )
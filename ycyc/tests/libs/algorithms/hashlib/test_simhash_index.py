@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase
+
+from ycyc.libs.algorithms.hashlib.simhash_index import SimHashIndex
+
+
+class TestSimHashIndex(TestCase):
+    def setUp(self):
+        self.random = random.Random(42)
+        self.fingerprints = [self.random.getrandbits(64) for _ in range(500)]
+
+    def flip(self, fingerprint, n, bits=64):
+        for i in self.random.sample(range(bits), n):
+            fingerprint ^= 1 << i
+        return fingerprint
+
+    def brute_force(self, fingerprints, target, distance):
+        return sorted(
+            (bin(i ^ target).count("1"), i) for i in set(fingerprints)
+            if bin(i ^ target).count("1") <= distance
+        )
+
+    def test_split_blocks(self):
+        self.assertListEqual(
+            SimHashIndex.split_blocks(64, 3),
+            [(0, (1 << 22) - 1), (22, (1 << 21) - 1), (43, (1 << 21) - 1)],
+        )
+
+    def test_query(self):
+        near = [self.flip(self.fingerprints[0], i) for i in range(1, 7)]
+        index = SimHashIndex(self.fingerprints + near, max_distance=3)
+        self.assertEqual(len(index), 506)
+        self.assertIn(near[3], index)
+
+        for distance in range(4):
+            self.assertListEqual(
+                index.query(self.fingerprints[0], distance),
+                self.brute_force(
+                    index.fingerprints, self.fingerprints[0], distance,
+                ),
+            )
+        for fingerprint in self.fingerprints[:50]:
+            target = self.flip(fingerprint, 2)
+            self.assertListEqual(
+                index.query(target),
+                self.brute_force(index.fingerprints, target, 3),
+            )
+
+        with self.assertRaises(ValueError):
+            index.query(self.fingerprints[0], 4)
+        with self.assertRaises(ValueError):
+            index.add(1 << 64)
+
+    def test_remove(self):
+        index = SimHashIndex(self.fingerprints, max_distance=2)
+        index.add(self.fingerprints[0])
+        self.assertEqual(len(index), 500)
+
+        index.remove(self.fingerprints[0])
+        self.assertNotIn(self.fingerprints[0], index)
+        self.assertListEqual(index.query(self.fingerprints[0]), [])
+        with self.assertRaises(KeyError):
+            index.remove(self.fingerprints[0])
+
+        index.remove_many(self.fingerprints[:10])
+        self.assertEqual(len(index), 490)
+        self.assertEqual(
+            sum(sum(len(b) for b in t.values()) for t in index.tables),
+            490 * 3,
+        )
+
+    def test_save_and_load(self):
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, "index.bin")
+            index = SimHashIndex(self.fingerprints, max_distance=2)
+            index.save(path)
+            self.assertEqual(
+                os.path.getsize(path), SimHashIndex.FileHeader.size + 500 * 8,
+            )
+
+            loaded = SimHashIndex.load(path)
+            self.assertEqual(loaded.max_distance, 2)
+            self.assertSetEqual(loaded.fingerprints, index.fingerprints)
+            self.assertEqual(SimHashIndex.load(path, 4).max_distance, 4)
+
+            fingerprints = [self.random.getrandbits(128) for _ in range(20)]
+            index = SimHashIndex(fingerprints, bits=128, max_distance=5)
+            index.save(path)
+            loaded = SimHashIndex.load(path)
+            self.assertEqual(loaded.bits, 128)
+            self.assertSetEqual(loaded.fingerprints, set(fingerprints))
+
+            with open(path, "ab") as fp:
+                fp.write(b"x")
+            with self.assertRaises(ValueError):
+                SimHashIndex.load(path)
+        finally:
+            shutil.rmtree(root)
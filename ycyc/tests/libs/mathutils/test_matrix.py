@@ -1,6 +1,12 @@
 from unittest import TestCase
 
-from ycyc.libs.mathutils.matrix import Matrix
+import mock
+
+from ycyc.libs.mathutils import matrix as matrix_module
+from ycyc.libs.mathutils.matrix import (
+    Matrix, DenseMatrix, ArraySliceView, LUDecomposition, blocked_multiply,
+    numpy,
+)
 
 
 class TestMatrix(TestCase):
@@ -247,3 +253,251 @@ class TestMatrix(TestCase):
             [1, 3, 5],
             [2, 4, 6],
         ])
+
+
+class TestDenseMatrix(TestCase):
+    def assertMatrixAlmostEqualAs(self, matrix, table):
+        self.assertIsInstance(matrix, DenseMatrix)
+        self.assertEqual(matrix.row_n, len(table))
+        self.assertEqual(matrix.col_n, len(table[0]))
+        for mr, tr in zip(matrix, table):
+            for mc, tc in zip(mr, tr):
+                self.assertAlmostEqual(mc, tc)
+
+    def each_backend(self):
+        backends = [False]
+        if numpy is not None:
+            backends.append(True)
+        for use_numpy in backends:
+            with mock.patch.object(DenseMatrix, "use_numpy", use_numpy):
+                yield use_numpy
+
+    def test_construction(self):
+        m = DenseMatrix(3, 2, [[1], [2, 3]])
+        self.assertMatrixAlmostEqualAs(m, [[1, 0], [2, 3], [0, 0]])
+        self.assertEqual(len(m.data), 6)
+
+        m = DenseMatrix.from_table([[1, 2], [4, 5, 6], [7]])
+        self.assertMatrixAlmostEqualAs(m, [[1, 2, 0], [4, 5, 6], [7, 0, 0]])
+        self.assertEqual(m, Matrix.from_table([[1, 2, 0], [4, 5, 6], [7]]))
+        self.assertEqual(Matrix.from_table([[1, 2, 0], [4, 5, 6], [7]]), m)
+        self.assertEqual(DenseMatrix.from_matrix(m), m)
+        self.assertEqual(
+            DenseMatrix.from_matrix(Matrix.from_table([[1, 2], [3, 4]])),
+            DenseMatrix.from_table([[1, 2], [3, 4]]),
+        )
+        with self.assertRaisesRegexp(ValueError, "matrix size error"):
+            DenseMatrix.from_array(2, 2, [1, 2, 3])
+        with self.assertRaisesRegexp(ValueError, "matrix size error"):
+            DenseMatrix(0, 2)
+
+    def test_index(self):
+        m = DenseMatrix.from_table([[1, 2], [3, 4]])
+        self.assertEqual(m[0, 1], 2)
+        self.assertEqual(m[-1, -1], 4)
+        self.assertListEqual(m[1].tolist(), [3, 4])
+        self.assertListEqual(m.col(1).tolist(), [2, 4])
+
+        m[1, 1] = 5
+        self.assertEqual(m.row(-1)[1], 5)
+        m.row(0)[0] = 9
+        self.assertEqual(m[0, 0], 9)
+
+        with self.assertRaisesRegexp(ValueError, "index type error"):
+            m[0] = 5
+        with self.assertRaisesRegexp(IndexError, "index error"):
+            m[2, 2] = 5
+        with self.assertRaisesRegexp(IndexError, "index error"):
+            m[2, 0]
+        self.assertNotEqual(m, DenseMatrix.from_table([[9, 2], [3, 4]]))
+
+    def test_array_slice_view(self):
+        m = DenseMatrix.from_table([[1, 2, 3], [4, 5, 6]])
+        with mock.patch.object(matrix_module.six, "PY2", True):
+            row = m.row(1)
+            col = m.col(-1)
+        self.assertIsInstance(row, ArraySliceView)
+        self.assertEqual(len(row), 3)
+        self.assertListEqual(row.tolist(), [4, 5, 6])
+        self.assertListEqual(row[1:], [5, 6])
+        self.assertListEqual(list(col), [3, 6])
+        self.assertEqual(col[-1], 6)
+        col[0] = 9
+        row[-1] = 8
+        self.assertListEqual(m.data.tolist(), [1, 2, 9, 4, 5, 8])
+
+    def test_negative_index(self):
+        m = DenseMatrix.from_table([[1, 2], [3, 4]])
+        base = Matrix.from_table([[1, 2], [3, 4]])
+        m[0, -1] = 9
+        base[0, -1] = 9
+        m[-1, -2] = 8
+        base[-1, -2] = 8
+        self.assertListEqual([list(i) for i in m], [[1, 9], [8, 4]])
+        self.assertEqual(m, base)
+        with self.assertRaisesRegexp(IndexError, "index error"):
+            m[0, -3] = 5
+        with self.assertRaisesRegexp(IndexError, "index error"):
+            m[[-3, 0]] = 5
+
+    def test_operations(self):
+        m1 = DenseMatrix.from_table([
+            [20, 20, 18],
+            [24, 16, 27],
+            [21, 19, 22],
+        ])
+        m2 = DenseMatrix.from_table([
+            [12, 1.2],
+            [14, 1.3],
+            [16, 1.5],
+        ])
+        for _ in self.each_backend():
+            self.assertMatrixAlmostEqualAs(m1 * m2, [
+                [808, 77],
+                [944, 90.1],
+                [870, 82.9],
+            ])
+            self.assertMatrixAlmostEqualAs(
+                m1 * Matrix.from_table([[1], [0], [1]]), [[38], [51], [43]],
+            )
+            self.assertMatrixAlmostEqualAs(
+                Matrix.from_table([[1, 0, 1]]) * m1, [[41, 39, 40]],
+            )
+            with self.assertRaisesRegexp(ValueError, "matrix size error"):
+                Matrix.from_table([[1, 0]]) * m1
+            self.assertMatrixAlmostEqualAs(m2 + m2, [
+                [24, 2.4], [28, 2.6], [32, 3.0],
+            ])
+            self.assertMatrixAlmostEqualAs(m2 - m2, [[0, 0]] * 3)
+            self.assertMatrixAlmostEqualAs(0.5 * m2, [
+                [6, 0.6], [7, 0.65], [8, 0.75],
+            ])
+            self.assertMatrixAlmostEqualAs(m2.transpose_matrix(), [
+                [12, 14, 16], [1.2, 1.3, 1.5],
+            ])
+
+            with self.assertRaisesRegexp(ValueError, "matrix size error"):
+                m2 * m2
+            with self.assertRaisesRegexp(ValueError, "matrix size error"):
+                m1 + m2
+
+    def test_same_as_matrix(self):
+        table1 = [[(i * 7 + j * 3) % 11 - 5 for j in range(6)] for i in range(5)]
+        table2 = [[(i * 5 + j) % 7 - 3 for j in range(4)] for i in range(6)]
+        for _ in self.each_backend():
+            self.assertEqual(
+                DenseMatrix.from_table(table1) * DenseMatrix.from_table(table2),
+                Matrix.from_table(table1) * Matrix.from_table(table2),
+            )
+            self.assertEqual(
+                DenseMatrix.from_table(table1).transpose_matrix(),
+                Matrix.from_table(table1).transpose_matrix(),
+            )
+
+
+class TestBlockedMultiply(TestCase):
+    def table(self, row_n, col_n, seed):
+        return [
+            [(i * seed + j * 7) % 13 - 6 for j in range(col_n)]
+            for i in range(row_n)
+        ]
+
+    def test_usage(self):
+        left = DenseMatrix.from_table(self.table(7, 5, 3))
+        right = DenseMatrix.from_table(self.table(5, 9, 5))
+        expected = Matrix.from_table(self.table(7, 5, 3)) * Matrix.from_table(
+            self.table(5, 9, 5),
+        )
+
+        backends = [False] + ([True] if numpy is not None else [])
+        for use_numpy in backends:
+            with mock.patch.object(DenseMatrix, "use_numpy", use_numpy):
+                for block_size in (1, 2, 4, 64):
+                    self.assertEqual(
+                        blocked_multiply(left, right, block_size, processes=1),
+                        expected,
+                    )
+                self.assertEqual(
+                    left.multiply(right, block_size=3, processes=2), expected,
+                )
+                self.assertEqual(
+                    blocked_multiply(
+                        Matrix.from_table(self.table(7, 5, 3)), right, 3, 1,
+                    ),
+                    expected,
+                )
+        self.assertEqual(left.multiply(right), expected)
+
+        with self.assertRaisesRegexp(ValueError, "matrix size error"):
+            blocked_multiply(left, left)
+
+
+class TestLUDecomposition(TestCase):
+    Table = [
+        [2, 1, 1, 0],
+        [4, 3, 3, 1],
+        [8, 7, 9, 5],
+        [6, 7, 9, 8],
+    ]
+
+    def each_backend(self):
+        backends = [False] + ([True] if numpy is not None else [])
+        for use_numpy in backends:
+            with mock.patch.object(DenseMatrix, "use_numpy", use_numpy):
+                yield use_numpy
+
+    def assertMatrixAlmostEqual(self, m1, m2):
+        self.assertEqual((m1.row_n, m1.col_n), (m2.row_n, m2.col_n))
+        for r1, r2 in zip(m1, m2):
+            for c1, c2 in zip(r1, r2):
+                self.assertAlmostEqual(c1, c2)
+
+    def test_det(self):
+        for _ in self.each_backend():
+            self.assertAlmostEqual(DenseMatrix.from_table(self.Table).det(), 8)
+            self.assertAlmostEqual(
+                DenseMatrix.from_table([[4, 3], [6, 3]]).det(), -6,
+            )
+            self.assertEqual(
+                DenseMatrix.from_table([[1, 2], [2, 4]]).det(), 0,
+            )
+            self.assertAlmostEqual(
+                LUDecomposition(Matrix.from_table([[0, 1], [1, 0]])).det(), -1,
+            )
+
+    def test_solve(self):
+        a = DenseMatrix.from_table(self.Table)
+        x = [1, -2, 3, 0.5]
+        b = [sum(i * j for i, j in zip(row, x)) for row in self.Table]
+        rhs = DenseMatrix.from_table([[i, 2 * i] for i in b])
+        for _ in self.each_backend():
+            lu = a.lu_decompose()
+            for i, j in zip(lu.solve(b), x):
+                self.assertAlmostEqual(i, j)
+            for i, j in zip(a.solve(b), x):
+                self.assertAlmostEqual(i, j)
+
+            result = lu.solve(rhs)
+            self.assertIsInstance(result, DenseMatrix)
+            self.assertMatrixAlmostEqual(
+                result, DenseMatrix.from_table([[i, 2 * i] for i in x]),
+            )
+            self.assertMatrixAlmostEqual(a * result, rhs)
+
+            with self.assertRaisesRegexp(ValueError, "vector size error"):
+                lu.solve([1, 2])
+            with self.assertRaisesRegexp(ValueError, "matrix is singular"):
+                DenseMatrix.from_table([[1, 2], [2, 4]]).solve([1, 2])
+
+    def test_inverse(self):
+        a = DenseMatrix.from_table(self.Table)
+        identity = DenseMatrix(4, 4)
+        for i in range(4):
+            identity[i, i] = 1
+        for _ in self.each_backend():
+            inverse = a.inverse()
+            self.assertMatrixAlmostEqual(a * inverse, identity)
+            self.assertMatrixAlmostEqual(inverse * a, identity)
+
+        with self.assertRaisesRegexp(ValueError, "matrix size error"):
+            DenseMatrix(2, 3).lu_decompose()
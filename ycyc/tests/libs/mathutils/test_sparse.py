@@ -0,0 +1,124 @@
+from unittest import TestCase
+
+import mock
+
+from ycyc.libs.mathutils.matrix import Matrix, DenseMatrix, numpy
+from ycyc.libs.mathutils.sparse import SparseMatrix
+from ycyc.ycollections.table import SparseTable
+
+
+class TestSparseMatrix(TestCase):
+    Table1 = [
+        [1, 0, 0, 2],
+        [0, 0, 0, 0],
+        [0, 3, 0, 4],
+    ]
+    Table2 = [
+        [0, 5],
+        [1, 0],
+        [0, 0],
+        [2, 0],
+    ]
+
+    def test_construction(self):
+        m = SparseMatrix.from_table(self.Table1)
+        self.assertEqual((m.row_n, m.col_n, m.nnz), (3, 4, 4))
+        self.assertListEqual(list(m.indptr), [0, 2, 2, 4])
+        self.assertListEqual(list(m.indices), [0, 3, 1, 3])
+        self.assertListEqual(list(m.values), [1, 2, 3, 4])
+
+        self.assertEqual(
+            SparseMatrix.from_coo(3, 4, [
+                (2, 3, 4), (0, 0, 1), (0, 3, 1), (2, 1, 3), (0, 3, 1),
+                (1, 1, 0),
+            ]),
+            m,
+        )
+        self.assertEqual(SparseMatrix.from_matrix(Matrix.from_table(self.Table1)), m)
+        self.assertEqual(
+            SparseMatrix.from_matrix(DenseMatrix.from_table(self.Table1)), m,
+        )
+
+        with self.assertRaisesRegexp(IndexError, "index error"):
+            SparseMatrix.from_coo(2, 2, [(2, 0, 1)])
+        with self.assertRaisesRegexp(ValueError, "csr storage error"):
+            SparseMatrix(2, 2, [0, 1, 1], [0], [])
+        with self.assertRaisesRegexp(ValueError, "matrix size error"):
+            SparseMatrix(0, 2)
+
+    def test_index(self):
+        m = SparseMatrix.from_table(self.Table1)
+        for r, row in enumerate(self.Table1):
+            for c, val in enumerate(row):
+                self.assertEqual(m[r, c], val)
+        with self.assertRaisesRegexp(IndexError, "index error"):
+            m[3, 0]
+        with self.assertRaisesRegexp(ValueError, "index type error"):
+            m[0]
+
+    def test_conversion(self):
+        m = SparseMatrix.from_table(self.Table1)
+        self.assertEqual(m.to_matrix(), Matrix.from_table(self.Table1))
+        self.assertEqual(m, Matrix.from_table(self.Table1))
+        self.assertIsInstance(m.to_matrix(DenseMatrix), DenseMatrix)
+
+        table = m.to_sparse_table()
+        self.assertIsInstance(table, SparseTable)
+        self.assertEqual(len(table.table), 2)
+        self.assertEqual(table[2, 3], 4)
+        self.assertEqual(table[1, 1], 0)
+        self.assertEqual(SparseMatrix.from_sparse_table(table), m)
+
+    def test_dense_to_sparse(self):
+        m = SparseMatrix.from_table(self.Table1)
+        dense = DenseMatrix.from_matrix(m)
+        self.assertIsInstance(dense, DenseMatrix)
+        self.assertEqual(dense, DenseMatrix.from_table(self.Table1))
+        self.assertEqual(SparseMatrix.from_matrix(dense), m)
+
+        self.assertEqual(Matrix.from_table(self.Table1), m)
+        self.assertEqual(DenseMatrix.from_table(self.Table1), m)
+        self.assertNotEqual(DenseMatrix.from_table(self.Table2), m)
+        self.assertFalse(Matrix.from_table(self.Table2) == m)
+
+        m2 = SparseMatrix.from_table(self.Table2)
+        expected = Matrix.from_table(self.Table1) * Matrix.from_table(self.Table2)
+        backends = [False] + ([True] if numpy is not None else [])
+        for use_numpy in backends:
+            with mock.patch.object(DenseMatrix, "use_numpy", use_numpy):
+                result = DenseMatrix.from_table(self.Table1) * m2
+                self.assertIsInstance(result, DenseMatrix)
+                self.assertEqual(result, expected)
+        self.assertEqual(Matrix.from_table(self.Table1) * m2, expected)
+
+    def test_transpose_matrix(self):
+        m = SparseMatrix.from_table(self.Table1).transpose_matrix()
+        self.assertEqual(
+            m, Matrix.from_table(self.Table1).transpose_matrix(),
+        )
+        self.assertEqual(
+            m.transpose_matrix(), SparseMatrix.from_table(self.Table1),
+        )
+
+    def test_multiplication(self):
+        m1 = SparseMatrix.from_table(self.Table1)
+        m2 = SparseMatrix.from_table(self.Table2)
+        expected = Matrix.from_table(self.Table1) * Matrix.from_table(self.Table2)
+
+        result = m1 * m2
+        self.assertIsInstance(result, SparseMatrix)
+        self.assertEqual(result, expected)
+        self.assertEqual(result.nnz, 3)
+
+        backends = [False] + ([True] if numpy is not None else [])
+        for use_numpy in backends:
+            with mock.patch.object(DenseMatrix, "use_numpy", use_numpy):
+                result = m1 * Matrix.from_table(self.Table2)
+                self.assertIsInstance(result, DenseMatrix)
+                self.assertEqual(result, expected)
+                self.assertEqual(m1 * DenseMatrix.from_table(self.Table2), expected)
+
+        self.assertEqual(2 * m1, 2 * Matrix.from_table(self.Table1))
+        self.assertEqual((0 * m1).nnz, 0)
+        with self.assertRaisesRegexp(ValueError, "matrix size error"):
+            m1 * m1
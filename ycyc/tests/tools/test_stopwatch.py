@@ -5,6 +5,9 @@ import time
 
 from unittest import TestCase
 
+import mock
+from six import StringIO
+
 from ycyc.tools import stopwatch
 
 
@@ -34,3 +37,15 @@ class TestStopwatch(TestCase):
         self.assertLess(s_watch.duration, duration3)
         self.assertGreater(s_watch.duration, duration1)
         self.assertGreater(s_watch.start_on, start_on2)
+
+
+class TestTimeit(TestCase):
+    def test_usage(self):
+        output = StringIO()
+        with mock.patch.object(stopwatch.sys, "stdout", output):
+            result = stopwatch.timeit("sum", sum, [1, 2], 3)
+        self.assertEqual(result, 6)
+        name, duration = output.getvalue().split()
+        self.assertEqual(name, "sum")
+        self.assertTrue(duration.endswith("s"))
+        self.assertGreaterEqual(float(duration[:-1]), 0)
@@ -1,6 +1,15 @@
+import random
+import time
+from threading import Thread
 from unittest import TestCase
 
-from ycyc.ycollections.heap import Heap, HeapIsEmpty
+import mock
+
+from ycyc.ycollections import heap as heap_module
+from ycyc.ycollections.heap import (
+    Heap, HeapIsEmpty, KeyHeap, IndexedPriorityQueue,
+    ThreadSafetyHeap, ConcurrentHeap, ShardedHeap,
+)
 
 
 class TestHeap(TestCase):
@@ -109,3 +118,354 @@ class TestHeap(TestCase):
             [i.value for i in heap],
             [4, 1, 0, 3, 2]
         )
+
+
+class TestKeyHeap(TestCase):
+    PriorityTask = TestHeap.PriorityTask
+
+    def test_usage(self):
+        values = [2, 3, 1, 17, 19, 100, 25, 17, 36]
+        heap = KeyHeap(values)
+        self.assertEqual(len(heap), 9)
+        self.assertEqual(heap[0], 1)
+        self.assertListEqual(list(heap), sorted(values))
+        self.assertListEqual(heap.headn(3), [1, 2, 3])
+        self.assertListEqual(heap.tailn(3), [25, 36, 100])
+        self.assertListEqual(
+            list(KeyHeap(values, reverse=True)), sorted(values, reverse=True),
+        )
+        self.assertListEqual(
+            list(KeyHeap(values, cmp_attrs=["real"])), sorted(values),
+        )
+        self.assertListEqual(
+            KeyHeap(values, reverse=True).tailn(3), [3, 2, 1],
+        )
+
+        heap = KeyHeap([3, 1, 2])
+        self.assertEqual(1, heap.edge_out(4))
+        heap.push(0)
+        self.assertListEqual(
+            [heap.pop() for _ in range(len(heap))], [0, 2, 3, 4],
+        )
+        with self.assertRaises(HeapIsEmpty):
+            heap.pop()
+
+    def test_reverse_keys(self):
+        words = ["b", "a", "c", "aa"]
+        self.assertListEqual(
+            list(KeyHeap(words, reverse=True)), sorted(words, reverse=True),
+        )
+        self.assertListEqual(
+            list(KeyHeap(words, reverse=True, key=len)), ["aa", "b", "a", "c"],
+        )
+        self.assertListEqual(
+            list(KeyHeap(words, key=lambda x: x[::-1])),
+            sorted(words, key=lambda x: x[::-1]),
+        )
+
+    def test_cmp_attrs(self):
+        tasks = [
+            self.PriorityTask(p, v)
+            for v, p in enumerate([5, 8, 3, 4, 9, 5])
+        ]
+        heap = KeyHeap(tasks, cmp_attrs=["priority"])
+        self.assertListEqual([i.value for i in heap], [2, 3, 0, 5, 1, 4])
+        heap = KeyHeap(tasks, cmp_attrs=["priority"], reverse=True)
+        self.assertListEqual([i.value for i in heap], [4, 1, 0, 5, 3, 2])
+
+
+class TestIndexedPriorityQueue(TestCase):
+
+    def assert_heap_valid(self, queue):
+        for pos, entry in enumerate(queue.data):
+            self.assertEqual(queue.positions[entry[2]], pos)
+            if pos:
+                self.assertFalse(entry < queue.data[(pos - 1) >> 1])
+        self.assertEqual(len(queue.positions), len(queue))
+
+    def test_usage(self):
+        queue = IndexedPriorityQueue([("a", 3), ("b", 1), ("c", 2)])
+        self.assertEqual(len(queue), 3)
+        self.assertIn("a", queue)
+        self.assertTrue(queue.contains("b"))
+        self.assertFalse(queue.contains("d"))
+        self.assertEqual(queue["a"], 3)
+        self.assertEqual(queue.peek(), ("b", 1))
+
+        queue.update_priority("a", 0)
+        self.assertEqual(queue.peek(), ("a", 0))
+        queue.update_priority("a", 5)
+        queue["d"] = 2
+        queue["b"] = 4
+        self.assertEqual(queue.remove("c"), 2)
+        self.assertNotIn("c", queue)
+        self.assert_heap_valid(queue)
+        self.assertEqual(
+            [queue.pop() for _ in range(len(queue))],
+            [("d", 2), ("b", 4), ("a", 5)],
+        )
+
+        with self.assertRaises(HeapIsEmpty):
+            queue.pop()
+        with self.assertRaises(HeapIsEmpty):
+            queue.peek()
+        with self.assertRaises(KeyError):
+            queue.remove("a")
+        with self.assertRaises(KeyError):
+            queue.update_priority("a", 1)
+        queue.push("a", 1)
+        with self.assertRaises(ValueError):
+            queue.push("a", 1)
+        with self.assertRaises(ValueError):
+            IndexedPriorityQueue([("a", 1), ("a", 2)])
+
+    def test_reverse(self):
+        queue = IndexedPriorityQueue(
+            [("a", 3), ("b", 1), ("c", 3)], reverse=True,
+        )
+        queue.update_priority("b", 4)
+        self.assertEqual(
+            [queue.pop() for _ in range(len(queue))],
+            [("b", 4), ("a", 3), ("c", 3)],
+        )
+        queue = IndexedPriorityQueue([("a", "x"), ("b", "y")], reverse=True)
+        self.assertEqual(queue.pop(), ("b", "y"))
+
+    def test_random_operations(self):
+        rand = random.Random(5)
+        queue = IndexedPriorityQueue()
+        expected = {}
+        for _ in range(2000):
+            op = rand.random()
+            item = rand.randint(0, 50)
+            if op < 0.4:
+                expected[item] = rand.randint(0, 100)
+                queue[item] = expected[item]
+            elif op < 0.6 and item in expected:
+                self.assertEqual(queue.remove(item), expected.pop(item))
+            elif op < 0.8 and expected:
+                item, priority = queue.pop()
+                self.assertEqual(priority, min(expected.values()))
+                self.assertEqual(expected.pop(item), priority)
+            self.assertEqual(len(queue), len(expected))
+        self.assert_heap_valid(queue)
+
+    def test_dijkstra(self):
+        graph = {
+            "a": {"b": 7, "c": 9, "f": 14},
+            "b": {"a": 7, "c": 10, "d": 15},
+            "c": {"a": 9, "b": 10, "d": 11, "f": 2},
+            "d": {"b": 15, "c": 11, "e": 6},
+            "e": {"d": 6, "f": 9},
+            "f": {"a": 14, "c": 2, "e": 9},
+        }
+        distances = {}
+        queue = IndexedPriorityQueue([("a", 0)])
+        while queue:
+            node, distance = queue.pop()
+            distances[node] = distance
+            for neighbor, weight in graph[node].items():
+                if neighbor in distances:
+                    continue
+                if neighbor not in queue or queue[neighbor] > distance + weight:
+                    queue[neighbor] = distance + weight
+        self.assertEqual(distances, {
+            "a": 0, "b": 7, "c": 9, "d": 20, "e": 20, "f": 11,
+        })
+
+
+class TestThreadSafetyHeap(TestCase):
+
+    def test_usage(self):
+        heap = ThreadSafetyHeap([3, 1, 2])
+        self.assertListEqual(list(heap), [1, 2, 3])
+        self.assertListEqual(heap.headn(2), [1, 2])
+        self.assertListEqual(heap.tailn(2), [2, 3])
+        self.assertEqual(heap[0], 1)
+
+    def test_sorted_values_locked(self):
+        heap = ThreadSafetyHeap([3, 1, 2])
+        heap.siftup_lock = mock.MagicMock()
+        self.assertListEqual(heap.sorted_values(), [1, 2, 3])
+        self.assertTrue(heap.siftup_lock.__enter__.called)
+
+
+class TestConcurrentHeap(TestCase):
+
+    def test_usage(self):
+        heap = ConcurrentHeap([5, 3])
+        heap.push(4)
+        heap.push_many([1, 2])
+        heap.push_many([])
+        self.assertEqual(len(heap), 5)
+        self.assertEqual(heap[0], 1)
+        self.assertEqual(heap.peek_entry()[2], 1)
+        self.assertListEqual(list(heap), [1, 2, 3, 4, 5])
+        self.assertListEqual(heap.tailn(2), [4, 5])
+        self.assertEqual(heap.edge_out(6), 1)
+        self.assertEqual(heap.pop(), 2)
+        self.assertListEqual(heap.pop_many(2), [3, 4])
+        self.assertListEqual(heap.pop_many(5), [5, 6])
+        self.assertIsNone(heap.peek_entry())
+
+        with self.assertRaises(HeapIsEmpty):
+            heap.pop(block=False)
+        with self.assertRaises(HeapIsEmpty):
+            heap.pop(timeout=0.01)
+        with self.assertRaises(HeapIsEmpty):
+            heap.pop_many(3, timeout=0.01)
+        with self.assertRaises(HeapIsEmpty):
+            heap.edge_out(1)
+
+        heap.push_many(range(100, 0, -1))
+        self.assertListEqual(heap.pop_many(3), [1, 2, 3])
+
+    def test_blocking_pop(self):
+        heap = ConcurrentHeap(reverse=True)
+        results = []
+
+        def consume():
+            results.append(heap.pop(timeout=5))
+            results.append(heap.pop_many(10, timeout=5))
+
+        thread = Thread(target=consume)
+        thread.start()
+        time.sleep(0.05)
+        heap.push(1)
+        time.sleep(0.05)
+        heap.push_many([2, 3])
+        thread.join(5)
+        self.assertEqual(results, [1, [3, 2]])
+
+    def test_threads(self):
+        heap = ConcurrentHeap()
+        results = []
+        stop = 1 << 30
+
+        def produce(start):
+            for i in range(start, start + 1000, 10):
+                heap.push_many(range(i, i + 10))
+
+        def consume():
+            while True:
+                values = heap.pop_many(16, timeout=1)
+                results.extend(i for i in values if i != stop)
+                if stop in values:
+                    # leave the other stop marks to other consumers
+                    heap.push_many([stop] * (values.count(stop) - 1))
+                    return
+
+        producers = [Thread(target=produce, args=(i * 1000,)) for i in range(4)]
+        consumers = [Thread(target=consume) for _ in range(3)]
+        for thread in producers + consumers:
+            thread.start()
+        for thread in producers:
+            thread.join()
+        heap.push_many([stop] * 3)
+        for thread in consumers:
+            thread.join()
+        self.assertEqual(sorted(results), list(range(4000)))
+
+
+class TestShardedHeap(TestCase):
+
+    def test_usage(self):
+        heap = ShardedHeap(shards=3)
+        heap.push_many([5, 3, 8, 1, 9, 2, 7])
+        heap.push(4)
+        self.assertEqual(len(heap), 8)
+        self.assertEqual(heap.pop(), 1)
+        popped = [heap.pop() for _ in range(len(heap))]
+        self.assertEqual(sorted(popped), [2, 3, 4, 5, 7, 8, 9])
+        self.assertEqual(heap.pop_many(3, block=False), [])
+        with self.assertRaises(HeapIsEmpty):
+            heap.pop(block=False)
+        with self.assertRaises(HeapIsEmpty):
+            heap.pop(timeout=0.01)
+        with self.assertRaises(ValueError):
+            ShardedHeap(shards=0)
+
+    def test_order_within_shards(self):
+        heap = ShardedHeap(shards=2, reverse=True)
+        heap.push_many(range(10))
+        first = heap.pop_many(10)
+        self.assertEqual(first, sorted(first, reverse=True))
+        self.assertEqual(first[0], 9)
+
+    def test_blocking_pop(self):
+        heap = ShardedHeap(shards=4)
+        results = []
+
+        def consume():
+            for _ in range(3):
+                results.append(heap.pop(timeout=5))
+
+        thread = Thread(target=consume)
+        thread.start()
+        for i in range(3):
+            time.sleep(0.02)
+            heap.push(i)
+        thread.join(5)
+        self.assertEqual(results, [0, 1, 2])
+
+
+class TestHeapSnapshot(TestCase):
+
+    def test_headn_cache(self):
+        heap = Heap([5, 3, 8, 1, 9, 2])
+        self.assertListEqual(heap.headn(3), [1, 2, 3])
+        with mock.patch.object(heap_module.heapq_op, "nsmallest") as nsmallest:
+            self.assertListEqual(heap.headn(2), [1, 2])
+            self.assertListEqual(heap.headn(3), [1, 2, 3])
+            self.assertFalse(nsmallest.called)
+
+        heap.push(0)
+        self.assertListEqual(heap.headn(3), [0, 1, 2])
+        heap.pop()
+        self.assertListEqual(heap.headn(4), [1, 2, 3, 5])
+        self.assertListEqual(heap.headn(10), [1, 2, 3, 5, 8, 9])
+        with mock.patch.object(heap_module.heapq_op, "nlargest") as nlargest:
+            self.assertListEqual(heap.tailn(2), [8, 9])
+            self.assertListEqual(heap.sorted_values(), [1, 2, 3, 5, 8, 9])
+            self.assertFalse(nlargest.called)
+
+        heap.sorted_values().append(100)
+        self.assertListEqual(list(heap), [1, 2, 3, 5, 8, 9])
+        heap.edge_out(4)
+        self.assertListEqual(heap.tailn(3), [5, 8, 9])
+        self.assertListEqual(heap.headn(2), [2, 3])
+
+    def test_iter_ordered(self):
+        values = list(range(1000, 0, -1))
+        heap = Heap(values, reverse=True)
+        iterator = heap.iter_ordered()
+        self.assertEqual([next(iterator) for _ in range(3)], [1000, 999, 998])
+        heap.pop()
+        self.assertEqual(next(iterator), 997)
+        self.assertEqual(len(heap.data), 999)
+        self.assertListEqual(list(heap), list(range(999, 0, -1)))
+
+        heap = ThreadSafetyHeap([3, 1, 2])
+        self.assertListEqual(list(heap.iter_ordered()), [1, 2, 3])
+
+    def test_equal_values_order(self):
+        Task = TestHeap.PriorityTask
+        tasks = [Task(i % 3, i) for i in range(30)]
+        random.Random(0).shuffle(tasks)
+
+        def values_of(items):
+            return [(i.priority, i.value) for i in items]
+
+        def new_heap():
+            return Heap(tasks, cmp_attrs=["priority"])
+
+        expected = values_of(new_heap().sorted_values())
+        self.assertListEqual(values_of(new_heap().iter_ordered()), expected)
+        self.assertListEqual(values_of(new_heap()), expected)
+        for n in (1, 5, 10, 11, 29, 30):
+            self.assertListEqual(
+                values_of(new_heap().headn(n)), expected[:n],
+            )
+            self.assertListEqual(
+                values_of(new_heap().tailn(n)), expected[-n:],
+            )
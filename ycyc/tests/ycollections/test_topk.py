@@ -0,0 +1,98 @@
+import pickle
+import random
+from unittest import TestCase
+
+from ycyc.ycollections.topk import TopK
+
+
+def second_item(value):
+    return value[1]
+
+
+class TestTopK(TestCase):
+    class PriorityTask(object):
+        def __init__(self, priority, value):
+            self.priority = priority
+            self.value = value
+
+    def test_usage(self):
+        topk = TopK(3)
+        self.assertEqual(topk.sorted(), [])
+        self.assertTrue(topk.push(5))
+        self.assertTrue(topk.push(1))
+        self.assertTrue(topk.push(3))
+        self.assertFalse(topk.push(0))
+        self.assertTrue(topk.push(4))
+        self.assertEqual(len(topk), 3)
+        self.assertEqual(topk.sorted(), [5, 4, 3])
+        self.assertEqual(list(topk), [5, 4, 3])
+
+        topk.update(range(100), batch_size=7)
+        self.assertEqual(topk.sorted(), [99, 98, 97])
+        topk.clear()
+        self.assertEqual(len(topk), 0)
+
+        with self.assertRaises(ValueError):
+            TopK(0)
+
+    def test_smallest(self):
+        rand = random.Random(1)
+        values = [rand.random() for _ in range(1000)]
+        topk = TopK(10, largest=False)
+        topk.update(values, batch_size=100)
+        self.assertEqual(topk.sorted(), sorted(values)[:10])
+
+        words = ["b", "a", "d", "c"]
+        topk = TopK(2, largest=False)
+        for word in words:
+            topk.push(word)
+        self.assertEqual(topk.sorted(), ["a", "b"])
+
+    def test_ties(self):
+        values = [("a", 1), ("b", 2), ("c", 2), ("d", 2), ("e", 1)]
+        topk = TopK(2, key=second_item)
+        for value in values:
+            topk.push(value)
+        self.assertEqual(topk.sorted(), [("b", 2), ("c", 2)])
+
+        topk = TopK(2, key=second_item)
+        topk.update(values)
+        self.assertEqual(topk.sorted(), [("b", 2), ("c", 2)])
+
+        topk = TopK(2, key=second_item, largest=False)
+        topk.update(values)
+        self.assertEqual(topk.sorted(), [("a", 1), ("e", 1)])
+
+    def test_cmp_attrs(self):
+        tasks = [
+            self.PriorityTask(p, v)
+            for v, p in enumerate([5, 8, 3, 4, 9, 5])
+        ]
+        topk = TopK(3, cmp_attrs=["priority"])
+        topk.update(tasks)
+        self.assertEqual([i.value for i in topk.sorted()], [4, 1, 0])
+        topk = TopK(3, cmp_attrs=["priority"], largest=False)
+        for task in tasks:
+            topk.push(task)
+        self.assertEqual([i.value for i in topk.sorted()], [2, 3, 0])
+
+    def test_merge(self):
+        rand = random.Random(2)
+        values = [rand.randint(0, 10 ** 6) for _ in range(10000)]
+        parts = [TopK(20) for _ in range(4)]
+        for i, topk in enumerate(parts):
+            topk.update(values[i::4])
+        merged = TopK(20).merge(*parts)
+        self.assertEqual(merged.sorted(), sorted(values, reverse=True)[:20])
+
+        with self.assertRaises(ValueError):
+            TopK(3).merge(TopK(3, largest=False))
+
+    def test_pickle(self):
+        topk = TopK(3, key=second_item)
+        topk.update([("a", 1), ("b", 3), ("c", 3), ("d", 2)])
+        loaded = pickle.loads(pickle.dumps(topk))
+        self.assertEqual(loaded.sorted(), [("b", 3), ("c", 3), ("d", 2)])
+        self.assertEqual(loaded.k, 3)
+        self.assertTrue(loaded.push(("e", 4)))
+        self.assertEqual(loaded.sorted(), [("e", 4), ("b", 3), ("c", 3)])
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
+import sys
 import time
 
 
@@ -38,3 +39,18 @@ class Stopwatch(object):
 
     def __exit__(self, typ, val, trbk):
         self.enable = False
+
+
+def timeit(name, func, *args, **kwargs):
+    """
+    Call func in a Stopwatch and write the name and duration to stdout,
+    used by the benchmark scripts.
+
+    :param name: name to report
+    :param func: function to call with args and kwargs
+    :return: result of func
+    """
+    with Stopwatch() as stopwatch:
+        result = func(*args, **kwargs)
+    sys.stdout.write("%-40s %10.4fs\n" % (name, stopwatch.duration))
+    return result
@@ -1,5 +1,8 @@
-from threading import RLock
+from itertools import count
+from numbers import Real
+from threading import Condition, Lock, RLock
 import heapq as heapq_op
+import time
 
 from ycyc.base.iterutils import getattrs
 
@@ -54,6 +57,9 @@ class Heap(object):
         self.cmp_attrs = cmp_attrs
         self.reverse = reverse
         heapq_op.heapify(self.data)
+        # sorted head and tail values are cached until the next mutation
+        self.mutations = 0
+        self.snapshots = {}
 
     def compare_items(self, item1, item2):
         val1 = getattrs(item1.value, self.cmp_attrs)
@@ -70,32 +76,104 @@ class Heap(object):
         return item.value
 
     def __iter__(self):
-        return iter(self.headn(len(self.data)))
+        return self.iter_ordered()
 
     def push(self, value):
         item = HeapItem(value, self)
         heapq_op.heappush(self.data, item)
+        self.mutations += 1
 
     def pop(self):
         if not self.data:
             raise HeapIsEmpty()
         item = heapq_op.heappop(self.data)
+        self.mutations += 1
         return item.value
 
     def edge_out(self, value):
         item = heapq_op.heapreplace(self.data, HeapItem(value, self))
+        self.mutations += 1
         return item.value
 
+    def snapshot_of(self, name, n):
+        """
+        Get the cached sorted values if they are enough.
+
+        :param name: "head" or "tail"
+        :param n: count of values wanted
+        :return: values list or None
+        """
+        snapshot = self.snapshots.get(name)
+        if snapshot is None or snapshot[0] != self.mutations:
+            return None
+        values = snapshot[1]
+        if n <= len(values) or len(values) == len(self.data):
+            return values
+        return None
+
+    def sorted_values(self):
+        """
+        :return: all the values in order, cached until the next mutation
+        """
+        values = self.snapshot_of("head", len(self.data))
+        if values is None:
+            values = [i.value for i in sorted(self.data)]
+            self.snapshots["head"] = (self.mutations, values)
+            self.snapshots["tail"] = (self.mutations, values[::-1])
+        return list(values)
+
+    def iter_ordered(self):
+        """
+        Iterate values in order lazily, by popping from a copy of heap,
+        so getting the first few values is cheap.
+        Equal values are in the same order as sorted_values.
+        """
+        values = self.snapshot_of("head", len(self.data))
+        if values is not None:
+            return iter(values)
+        return self._pop_values(self.indexed_items())
+
+    def indexed_items(self):
+        """
+        :return: (item, index) pairs of heap, equal items are ordered
+            by their positions like the stable sorted
+        """
+        # pairs of a heap are still a heap, no need to heapify
+        return [(item, index) for index, item in enumerate(self.data)]
+
+    @staticmethod
+    def _pop_values(data):
+        while data:
+            yield heapq_op.heappop(data)[0].value
+
     def headn(self, n):
-        return [
-            i.value for i in heapq_op.nsmallest(n, self.data)
-        ]
+        values = self.snapshot_of("head", n)
+        if values is None:
+            if n >= len(self.data):
+                self.sorted_values()
+                values = self.snapshots["head"][1]
+            else:
+                values = [
+                    i.value for i in heapq_op.nsmallest(n, self.data)
+                ]
+                self.snapshots["head"] = (self.mutations, values)
+        return values[:n]
 
     def tailn(self, n):
-        values = [
-            i.value for i in heapq_op.nlargest(n, self.data)
-        ]
-        return values[::-1]
+        values = self.snapshot_of("tail", n)
+        if values is None:
+            if n >= len(self.data):
+                self.sorted_values()
+                values = self.snapshots["tail"][1]
+            else:
+                # the tail snapshot is sorted_values reversed, so equal
+                # values at the larger positions come first
+                values = [
+                    i[0].value
+                    for i in heapq_op.nlargest(n, self.indexed_items())
+                ]
+                self.snapshots["tail"] = (self.mutations, values)
+        return values[:n][::-1]
 
 
 class ThreadSafetyHeap(Heap):
@@ -114,3 +192,499 @@ class ThreadSafetyHeap(Heap):
     def edge_out(self, *args, **kwargs):
         with self.siftup_lock:
             return super(ThreadSafetyHeap, self).edge_out(*args, **kwargs)
+
+    def headn(self, *args, **kwargs):
+        with self.siftup_lock:
+            return super(ThreadSafetyHeap, self).headn(*args, **kwargs)
+
+    def tailn(self, *args, **kwargs):
+        with self.siftup_lock:
+            return super(ThreadSafetyHeap, self).tailn(*args, **kwargs)
+
+    def __getitem__(self, *args, **kwargs):
+        with self.siftup_lock:
+            return super(ThreadSafetyHeap, self).__getitem__(*args, **kwargs)
+
+    def iter_ordered(self, *args, **kwargs):
+        with self.siftup_lock:
+            return super(ThreadSafetyHeap, self).iter_ordered(*args, **kwargs)
+
+    def sorted_values(self, *args, **kwargs):
+        with self.siftup_lock:
+            return super(ThreadSafetyHeap, self).sorted_values(*args, **kwargs)
+
+
+class ReversedKey(object):
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.key)
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __gt__(self, other):
+        return self.key < other.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __ne__(self, other):
+        return self.key != other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+def reversed_key(key):
+    """
+    Make the key compared in reversed order, real numbers are negated.
+    """
+    if isinstance(key, Real):
+        return -key
+    return ReversedKey(key)
+
+
+class KeyHeap(object):
+    """
+    Heap stored (key, seq, value) tuples, the key is computed once when
+    pushing, so heapq compares native tuples instead of calling back.
+    Values with the same key are popped in the pushing order.
+    Reversed heap negates the real number keys, and wraps the others
+    into ReversedKey.
+    """
+
+    def __init__(self, iterable=(), cmp_attrs=(), reverse=False, key=None):
+        """
+        :param iterable: initial values
+        :param cmp_attrs: attrs of value to compare
+        :param reverse: pop the largest first
+        :param key: function to get the key of value, instead of cmp_attrs
+        """
+        self.cmp_attrs = cmp_attrs
+        self.reverse = reverse
+        self.key = key
+        self.counter = count()
+        self.data = [self.entry_of(i) for i in iterable]
+        heapq_op.heapify(self.data)
+
+    def key_of(self, value):
+        if self.key is not None:
+            key = self.key(value)
+        else:
+            key = getattrs(value, self.cmp_attrs)
+
+        return reversed_key(key) if self.reverse else key
+
+    def entry_of(self, value):
+        return (self.key_of(value), next(self.counter), value)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return self.data[index][2]
+
+    def __iter__(self):
+        return iter(self.headn(len(self.data)))
+
+    def push(self, value):
+        heapq_op.heappush(self.data, self.entry_of(value))
+
+    def pop(self):
+        if not self.data:
+            raise HeapIsEmpty()
+        return heapq_op.heappop(self.data)[2]
+
+    def edge_out(self, value):
+        return heapq_op.heapreplace(self.data, self.entry_of(value))[2]
+
+    def headn(self, n):
+        return [i[2] for i in heapq_op.nsmallest(n, self.data)]
+
+    def tailn(self, n):
+        values = [i[2] for i in heapq_op.nlargest(n, self.data)]
+        return values[::-1]
+
+
+class IndexedPriorityQueue(object):
+    """
+    Addressable priority queue of hashable items, the position of each
+    item in the heap is tracked, so that updating the priority, removing
+    and checking an item are O(log n) or O(1).
+    Items with the same priority are popped in the pushing order.
+    Example:
+    >>> queue = IndexedPriorityQueue([("a", 3), ("b", 1)])
+    >>> queue.update_priority("a", 0)
+    >>> queue.pop()
+    ('a', 0)
+    """
+
+    def __init__(self, items=(), reverse=False):
+        """
+        :param items: initial (item, priority) pairs
+        :param reverse: pop the item with the largest priority first
+        """
+        self.reverse = reverse
+        self.counter = count()
+        # entry: [key, seq, item, priority]
+        self.data = []
+        self.positions = {}
+        for item, priority in items:
+            if item in self.positions:
+                raise ValueError("item existed: %r" % (item,))
+            self.positions[item] = len(self.data)
+            self.data.append(self.entry_of(item, priority))
+        for pos in reversed(range(len(self.data) // 2)):
+            self._sift_down(pos)
+
+    def entry_of(self, item, priority, seq=None):
+        key = reversed_key(priority) if self.reverse else priority
+        if seq is None:
+            seq = next(self.counter)
+        return [key, seq, item, priority]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def contains(self, item):
+        return item in self.positions
+
+    def __getitem__(self, item):
+        return self.priority_of(item)
+
+    def __setitem__(self, item, priority):
+        if item in self.positions:
+            self.update_priority(item, priority)
+        else:
+            self.push(item, priority)
+
+    def priority_of(self, item):
+        """
+        :param item: item in queue
+        :return: priority of item
+        """
+        return self.data[self.positions[item]][3]
+
+    def _less(self, i, j):
+        # seq is unique, so item and priority would never be compared
+        return self.data[i] < self.data[j]
+
+    def _swap(self, i, j):
+        data = self.data
+        data[i], data[j] = data[j], data[i]
+        self.positions[data[i][2]] = i
+        self.positions[data[j][2]] = j
+
+    def _sift_up(self, pos):
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if not self._less(pos, parent):
+                break
+            self._swap(pos, parent)
+            pos = parent
+        return pos
+
+    def _sift_down(self, pos):
+        size = len(self.data)
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and self._less(child + 1, child):
+                child += 1
+            if not self._less(child, pos):
+                break
+            self._swap(pos, child)
+            pos = child
+        return pos
+
+    def push(self, item, priority):
+        """
+        Push a new item.
+
+        :param item: hashable item not in queue
+        :param priority: priority of item
+        """
+        if item in self.positions:
+            raise ValueError("item existed: %r" % (item,))
+        pos = len(self.data)
+        self.data.append(self.entry_of(item, priority))
+        self.positions[item] = pos
+        self._sift_up(pos)
+
+    def peek(self):
+        """
+        :return: (item, priority) of the top
+        """
+        if not self.data:
+            raise HeapIsEmpty()
+        entry = self.data[0]
+        return entry[2], entry[3]
+
+    def pop(self):
+        """
+        :return: (item, priority) of the top
+        """
+        if not self.data:
+            raise HeapIsEmpty()
+        return self._remove_at(0)
+
+    def remove(self, item):
+        """
+        Remove an item.
+
+        :param item: item in queue
+        :return: priority of item
+        """
+        return self._remove_at(self.positions[item])[1]
+
+    def _remove_at(self, pos):
+        last = len(self.data) - 1
+        if pos != last:
+            self._swap(pos, last)
+        entry = self.data.pop()
+        del self.positions[entry[2]]
+        if pos != last:
+            self._sift_down(self._sift_up(pos))
+        return entry[2], entry[3]
+
+    def update_priority(self, item, priority):
+        """
+        Change the priority of an item, it could be increased or decreased.
+
+        :param item: item in queue
+        :param priority: new priority
+        """
+        pos = self.positions[item]
+        self.data[pos] = self.entry_of(item, priority, self.data[pos][1])
+        self._sift_down(self._sift_up(pos))
+
+
+class ConcurrentHeap(KeyHeap):
+    """
+    Thread safety KeyHeap like a priority Queue, pop could wait for
+    values, and the bulk operations acquire the lock only once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(ConcurrentHeap, self).__init__(*args, **kwargs)
+        self.not_empty = Condition(Lock())
+
+    def __iter__(self):
+        return iter(self.headn(len(self.data)))
+
+    def __getitem__(self, index):
+        with self.not_empty:
+            return super(ConcurrentHeap, self).__getitem__(index)
+
+    def push(self, value):
+        entry = self.entry_of(value)
+        with self.not_empty:
+            heapq_op.heappush(self.data, entry)
+            self.not_empty.notify()
+
+    def push_many(self, values):
+        """
+        Push values with one lock acquisition.
+
+        :param values: iterable values
+        """
+        entries = [self.entry_of(i) for i in values]
+        if not entries:
+            return
+        with self.not_empty:
+            if len(entries) > len(self.data):
+                self.data.extend(entries)
+                heapq_op.heapify(self.data)
+            else:
+                for entry in entries:
+                    heapq_op.heappush(self.data, entry)
+            self.not_empty.notify(len(entries))
+
+    def _wait(self, block, timeout):
+        # must be called with not_empty acquired
+        if not block:
+            if not self.data:
+                raise HeapIsEmpty()
+            return
+        if timeout is None:
+            while not self.data:
+                self.not_empty.wait()
+            return
+        deadline = time.time() + timeout
+        while not self.data:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise HeapIsEmpty()
+            self.not_empty.wait(remaining)
+
+    def pop(self, block=True, timeout=None):
+        """
+        Pop the top value.
+
+        :param block: wait for a value if the heap is empty
+        :param timeout: max seconds to wait, None means forever
+        :return: value
+        """
+        with self.not_empty:
+            self._wait(block, timeout)
+            return heapq_op.heappop(self.data)[2]
+
+    def pop_many(self, n, block=True, timeout=None):
+        """
+        Pop at most n values with one lock acquisition,
+        waiting only for the first one.
+
+        :param n: max count of values
+        :param block: wait for a value if the heap is empty
+        :param timeout: max seconds to wait, None means forever
+        :return: value list
+        """
+        with self.not_empty:
+            self._wait(block, timeout)
+            return [
+                heapq_op.heappop(self.data)[2]
+                for _ in range(min(n, len(self.data)))
+            ]
+
+    def peek_entry(self):
+        """
+        :return: (key, seq, value) of the top, None if empty
+        """
+        with self.not_empty:
+            return self.data[0] if self.data else None
+
+    def edge_out(self, value):
+        entry = self.entry_of(value)
+        with self.not_empty:
+            if not self.data:
+                raise HeapIsEmpty()
+            return heapq_op.heapreplace(self.data, entry)[2]
+
+    def headn(self, n):
+        with self.not_empty:
+            return super(ConcurrentHeap, self).headn(n)
+
+    def tailn(self, n):
+        with self.not_empty:
+            return super(ConcurrentHeap, self).tailn(n)
+
+
+class ShardedHeap(object):
+    """
+    N ConcurrentHeap shards for many producers, pushes are spread over
+    shards in turn so producers rarely wait for the same lock, and pop
+    takes the best top of shards, so the global order is approximate.
+    """
+
+    def __init__(self, shards=4, cmp_attrs=(), reverse=False, key=None):
+        """
+        :param shards: count of sub heaps
+        :param cmp_attrs: attrs of value to compare
+        :param reverse: pop the largest first
+        :param key: function to get the key of value, instead of cmp_attrs
+        """
+        if shards <= 0:
+            raise ValueError("shards must be positive: %s" % shards)
+        counter = count()
+        self.shards = []
+        for _ in range(shards):
+            shard = ConcurrentHeap(cmp_attrs=cmp_attrs, reverse=reverse, key=key)
+            # share the seq so values of same key keep the pushing order
+            shard.counter = counter
+            self.shards.append(shard)
+        self.turns = count()
+        self.waiting = 0
+        self.not_empty = Condition(Lock())
+
+    def __len__(self):
+        return sum(len(i) for i in self.shards)
+
+    def _notify(self, n=1):
+        if self.waiting:
+            with self.not_empty:
+                self.not_empty.notify(n)
+
+    def push(self, value):
+        shard = self.shards[next(self.turns) % len(self.shards)]
+        shard.push(value)
+        self._notify()
+
+    def push_many(self, values):
+        """
+        Push values, they are spread over shards in chunks.
+
+        :param values: iterable values
+        """
+        values = list(values)
+        size = len(self.shards)
+        start = next(self.turns)
+        for i, shard in enumerate(self.shards):
+            shard.push_many(values[(i + start) % size::size])
+        self._notify(len(values))
+
+    def _pop_once(self, n):
+        tops = []
+        for shard in self.shards:
+            entry = shard.peek_entry()
+            if entry is not None:
+                tops.append((entry[:2], shard))
+        tops.sort(key=lambda x: x[0])
+        for _, shard in tops:
+            try:
+                return shard.pop_many(n, block=False)
+            except HeapIsEmpty:
+                # popped by others after peeking
+                continue
+        return []
+
+    def pop_many(self, n, block=True, timeout=None):
+        """
+        Pop at most n values from the shard of the best top.
+
+        :param n: max count of values
+        :param block: wait for a value if the heap is empty
+        :param timeout: max seconds to wait, None means forever
+        :return: value list
+        """
+        values = self._pop_once(n)
+        if values or not block:
+            return values
+
+        deadline = None if timeout is None else time.time() + timeout
+        with self.not_empty:
+            self.waiting += 1
+            try:
+                while True:
+                    values = self._pop_once(n)
+                    if values:
+                        return values
+                    if deadline is None:
+                        self.not_empty.wait()
+                        continue
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return values
+                    self.not_empty.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+    def pop(self, block=True, timeout=None):
+        """
+        Pop the best top value of shards.
+
+        :param block: wait for a value if the heap is empty
+        :param timeout: max seconds to wait, None means forever
+        :return: value
+        """
+        values = self.pop_many(1, block, timeout)
+        if not values:
+            raise HeapIsEmpty()
+        return values[0]
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+from itertools import count, islice
+import heapq as heapq_op
+
+from ycyc.base.iterutils import getattrs
+from ycyc.ycollections.heap import reversed_key
+
+
+class TopK(object):
+    """
+    Keep the k largest(or smallest) values of a stream in a bounded
+    heap of (key, seq, value), the worst kept value is on the top so that
+    it could be replaced quickly. When values are the same, the former
+    one is kept.
+    Example:
+    >>> topk = TopK(3)
+    >>> topk.update(range(100))
+    >>> topk.sorted()
+    [99, 98, 97]
+    """
+    BatchSize = 65536
+
+    def __init__(self, k, cmp_attrs=(), key=None, largest=True):
+        """
+        :param k: count of values to keep
+        :param cmp_attrs: attrs of value to compare
+        :param key: function to get the key of value, instead of cmp_attrs
+        :param largest: keep the largest values, otherwise the smallest
+        """
+        if k <= 0:
+            raise ValueError("k must be positive: %s" % k)
+        self.k = k
+        self.cmp_attrs = cmp_attrs
+        self.key = key
+        self.largest = largest
+        self.counter = count()
+        self.data = []
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.sorted())
+
+    def key_of(self, value):
+        if self.key is not None:
+            return self.key(value)
+        return getattrs(value, self.cmp_attrs)
+
+    def entry_of(self, value):
+        key = self.key_of(value)
+        if not self.largest:
+            key = reversed_key(key)
+        # negative seq puts the later one on top to be replaced first
+        return (key, -next(self.counter), value)
+
+    def push(self, value):
+        """
+        Push a value, it will be dropped if not better than all the kept.
+
+        :param value: value
+        :return: True if the value is kept
+        """
+        data = self.data
+        entry = self.entry_of(value)
+        if len(data) < self.k:
+            heapq_op.heappush(data, entry)
+            return True
+        if data[0][0] < entry[0]:
+            heapq_op.heapreplace(data, entry)
+            return True
+        return False
+
+    def _select(self, values):
+        select = heapq_op.nlargest if self.largest else heapq_op.nsmallest
+        if self.key is None and not self.cmp_attrs:
+            # plain values are compared by heapq directly, e.g. numbers
+            return select(self.k, values)
+        return select(self.k, values, key=self.key_of)
+
+    def update(self, values, batch_size=None):
+        """
+        Ingest an iterable in batches, each batch is selected by heapq
+        before pushing, so most of the values are only compared once.
+
+        :param values: iterable values
+        :param batch_size: count of values in a batch
+        """
+        batch_size = batch_size or self.BatchSize
+        values = iter(values)
+        while True:
+            batch = list(islice(values, batch_size))
+            if not batch:
+                break
+            self.update_batch(batch)
+
+    def update_batch(self, batch):
+        """
+        Ingest a batch of values.
+
+        :param batch: value list
+        """
+        for value in self._select(batch):
+            self.push(value)
+
+    def merge(self, *others):
+        """
+        Merge the partial results of other TopK.
+
+        :param others: TopK of the same k and comparison
+        :return: self
+        """
+        for other in others:
+            if other.largest != self.largest:
+                raise ValueError("can not merge TopK of different order")
+            self.update_batch(other.sorted())
+        return self
+
+    def sorted(self):
+        """
+        :return: kept values, the best first
+        """
+        return [i[2] for i in sorted(self.data, reverse=True)]
+
+    def clear(self):
+        del self.data[:]
+
+    def __getstate__(self):
+        # key must be picklable, such as a module level function
+        return {
+            "k": self.k,
+            "cmp_attrs": self.cmp_attrs,
+            "key": self.key,
+            "largest": self.largest,
+            "values": self.sorted(),
+        }
+
+    def __setstate__(self, state):
+        values = state.pop("values")
+        self.__init__(**state)
+        for value in values:
+            self.push(value)